@@ -0,0 +1,10 @@
+from .builder import Builder
+from .deps import ImportEntry, ImportGraph, ImportIndex
+from .ignore import IgnoreRules
+from .manifest import BuildManifest, FileEntry, ManifestDiff
+from .pipeline import IOPool
+from .remote import DirectoryRemote, HttpRemote, RemoteCache, RemoteError
+from .scanner import SourceTree
+from .store import ArtifactFile, ArtifactStore, artifact_key
+from .sync import prune_dir, remove_outputs
+from .watcher import InotifyWatcher, PollingWatcher, create_watcher
@@ -0,0 +1,563 @@
+import concurrent.futures
+import logging
+import shutil
+from pathlib import Path
+
+from ..core import Config, ConfigSnapshot
+from ..core.trace import Tracer
+from .compiler import (
+    check_module,
+    compiler_version,
+    init_worker,
+    run_compiler,
+    runs_in_process,
+)
+from .deps import ImportGraph, ImportIndex
+from .manifest import BuildManifest, FileEntry, Outputs
+from .pipeline import IOPool, io_workers
+from .remote import RemoteCache
+from .scheduler import BuildScheduler, resolve_jobs
+from .scanner import SourceTree
+from .store import ArtifactFile, ArtifactStore, artifact_key
+from .sync import place_file, prune_dir, remove_outputs
+
+logger = logging.getLogger("plg-sdk")
+
+
+def _paths(outputs: Outputs) -> set[str]:
+    return {
+        path
+        for by_module in outputs.values()
+        for paths in by_module.values()
+        for path in paths
+    }
+
+
+def _staged(staging: Path) -> list[str]:
+    return [
+        p.relative_to(staging).as_posix()
+        for p in sorted(staging.rglob("*"))
+        if p.is_file()
+    ]
+
+
+def _batches(files: list[str], jobs: int) -> list[list[str]]:
+    # Батчей больше чем воркеров, чтобы долгий батч не держал остальных
+    count = min(len(files), jobs * 4 if jobs > 1 else 1)
+    return [files[i::count] for i in range(count)]
+
+
+class Builder:
+    @staticmethod
+    def pool(
+        jobs: int,
+        snapshot: ConfigSnapshot,
+    ) -> concurrent.futures.ProcessPoolExecutor:
+        # Пул, переживающий несколько сборок. После смены конфига его надо пересоздать
+        return concurrent.futures.ProcessPoolExecutor(
+            jobs,
+            initializer=init_worker,
+            initargs=(snapshot,),
+        )
+
+    @staticmethod
+    def store(snapshot: ConfigSnapshot) -> ArtifactStore | None:
+        if snapshot.cache_size_mb <= 0:
+            return None
+
+        return ArtifactStore(
+            Config.sdk_path() / "store",
+            snapshot.cache_size_mb * 1024 * 1024,
+        )
+
+    @staticmethod
+    def staging_dir() -> Path:
+        return Config.sdk_path() / "tmp/build"
+
+    @classmethod
+    def build(
+        cls,
+        full: bool = False,
+        jobs: int | None = None,
+        executor: concurrent.futures.Executor | None = None,
+        modules: set[str] | frozenset[str] | None = None,
+        changed: set[str] | None = None,
+    ) -> bool:
+        # modules - модули, чьи артефакты невалидны после смены конфига (ConfigChange).
+        # Они собираются целиком, остальные только по изменённым файлам.
+        # changed - пути относительно source_dir от наблюдателя в режиме watch:
+        # папки и файлы вне них скан не перечитывает. None - полный скан
+        snapshot = Config.snapshot()
+        source_dir = snapshot.source_dir
+        out_dir = snapshot.out_dir
+
+        if not source_dir.is_dir():
+            logger.error(f"PATHS.source_dir не найдена: {source_dir}")
+            return False
+
+        clean = snapshot.clean_before
+        store = cls.store(snapshot)
+
+        jobs = resolve_jobs(jobs, snapshot)
+        # Что идёт внахлёст:
+        #   скан       - обход папок с stat/хэшами файлов в потоках io
+        #   компиляция - с восстановлением из кэша и записью готовых батчей в io
+        # Компиляция стартует только после скана: набор файлов к сборке
+        # (зависимые по графу импортов) и ключи артефактов (digest'ы всех
+        # транзитивных импортов) известны лишь по полному манифесту.
+        # Очереди io ограничены
+        io = IOPool(io_workers(jobs))
+
+        # Манифест помнит, что каждый исходник положил в out_dir: вывод удалённых
+        # исходников и модулей убирается, clean_before дочищает всё остальное
+        failed: set[str] = set()
+        produced: Outputs = {}
+        staging_root = cls.staging_dir()
+        shutil.rmtree(staging_root, ignore_errors=True)
+        remote = RemoteCache.from_snapshot(snapshot) if store is not None else None
+
+        try:
+            with Tracer.span("build.scan"):
+                old, old_digest, old_outputs = BuildManifest.load()
+                tree = SourceTree.load(source_dir)
+                new = BuildManifest.scan(
+                    source_dir, old, io, tree, None if full else changed
+                )
+                tree.save()
+                logger.debug(
+                    f"Папок прочитано: {tree.listed}, взято из кэша: {tree.reused}"
+                )
+
+            # Без списка модулей не известно что именно поменялось в конфиге
+            if old_digest != snapshot.digest and modules is None:
+                if old:
+                    logger.debug("Конфиг сборки изменился, полная пересборка")
+
+                full = True
+
+            diff = BuildManifest.diff(old, new)
+            graph = ImportGraph({})
+            # Граф нужен и для инкрементальной сборки, и для ключей артефактов
+            if not full or store is not None:
+                with Tracer.span("build.graph", files=len(new)):
+                    graph = cls._import_graph(snapshot, new, diff.removed)
+
+            if full:
+                dirty = set(new)
+
+            else:
+                dirty = (diff.added | diff.changed) | graph.dependents(diff.dirty)
+                dirty &= new.keys()
+
+            files = sorted(dirty)
+            work = {m: files for m in snapshot.modules}
+            for module in (modules or set()) & work.keys():
+                work[module] = sorted(new)
+
+            scheduled = {m: set(files) for m, files in work.items()}
+
+            logger.debug(
+                f"Файлов в source_dir: {len(new)}\n"
+                f"К сборке          : {len(files)}\n"
+                f"Потоков сборки    : {jobs}"
+            )
+
+            keys: dict[str, dict[str, bytes]] = {}
+            if store is not None:
+                with Tracer.span("build.keys"):
+                    keys = {
+                        m: cls._artifact_keys(m, work[m], snapshot, new, graph)
+                        for m in work
+                        if work[m]
+                    }
+
+                work = cls._restore(store, work, keys, out_dir, io, produced, remote)
+
+            batches: dict[str, list[str]] = {}
+            if any(work.values()):
+                out_dir.mkdir(parents=True, exist_ok=True)
+                with Tracer.span("build.compile"):
+                    failed, batches = cls._compile(
+                        work,
+                        snapshot,
+                        jobs,
+                        executor,
+                        io,
+                        store,
+                        keys,
+                        remote,
+                    )
+
+            # Дописываем хвост очереди записи
+            with Tracer.span("build.write"):
+                errors = io.close()
+
+            for key, err in errors.items():
+                logger.error(f"Не удалось записать вывод {key}\n{err}")
+                failed.update(batches.get(key, (key,)))
+
+            for key in batches:
+                module = key.split(":")[1]
+                for rel, paths in io.results.get(key, {}).items():
+                    produced.setdefault(rel, {})[module] = tuple(paths)
+
+            outputs = cls._outputs(
+                snapshot, new, old_outputs, scheduled, produced, failed
+            )
+            with Tracer.span("build.prune"):
+                if clean:
+                    removed = prune_dir(out_dir, _paths(outputs))
+
+                else:
+                    removed = remove_outputs(
+                        out_dir, _paths(old_outputs) - _paths(outputs)
+                    )
+
+            if removed:
+                logger.debug(f"Из out_dir удалено устаревших файлов: {removed}")
+
+        finally:
+            io.close()
+            shutil.rmtree(staging_root, ignore_errors=True)
+            if remote is not None:
+                with Tracer.span("build.remote.flush"):
+                    remote.close()
+
+        if failed:
+            # Упавшим файлам затираем digest, чтобы следующий запуск их пересобрал.
+            # Из манифеста не выкидываем: их старый вывод всё ещё лежит в out_dir
+            new = {
+                rel: FileEntry(rel, 0, 0, bytes(16)) if rel in failed else entry
+                for rel, entry in new.items()
+            }
+
+        BuildManifest.save(new, snapshot.digest, outputs)
+
+        if store is not None:
+            with Tracer.span("build.evict"):
+                freed = store.evict()
+
+            if freed:
+                logger.debug(f"Из кэша артефактов вытеснено {freed / 1048576:.1f} МБ")
+
+        return not failed
+
+    @staticmethod
+    def _outputs(
+        snapshot: ConfigSnapshot,
+        entries: dict[str, FileEntry],
+        old: Outputs,
+        scheduled: dict[str, set[str]],
+        produced: Outputs,
+        failed: set[str],
+    ) -> Outputs:
+        # Что каждый исходник держит в out_dir после сборки. Пересобранный модулем
+        # файл заменяет его старый вывод, упавший сохраняет старый.
+        # Удалённые исходники и выключенные модули сюда не попадают
+        modules = set(snapshot.modules)
+        out: Outputs = {}
+        for rel in entries:
+            by_module = {
+                m: paths for m, paths in old.get(rel, {}).items() if m in modules
+            }
+            if rel not in failed:
+                for module, files in scheduled.items():
+                    if rel in files:
+                        by_module[module] = produced.get(rel, {}).get(module, ())
+
+            if by_module:
+                out[rel] = by_module
+
+        return out
+
+    @staticmethod
+    def _import_graph(
+        snapshot: ConfigSnapshot,
+        entries: dict[str, FileEntry],
+        removed: set[str],
+    ) -> ImportGraph:
+        # Индекс импортов живёт в .plg-sdk/cache, разбираются только изменённые файлы
+        providers, token = ImportIndex.load_providers(
+            snapshot.modules,
+            {m: compiler_version(m) for m in snapshot.modules},
+        )
+        index = ImportIndex.load(providers, token)
+        before = len(index.entries)
+        parsed = index.update(snapshot.source_dir, entries)
+        if parsed or before != len(index.entries):
+            index.save()
+
+        logger.debug(f"Импорты: разобрано {parsed} из {len(entries)}")
+        # Удалённые файлы участвуют в резолве, иначе их зависимые не пересоберутся
+        return index.graph(set(entries) | removed)
+
+    # region artifact store
+    @staticmethod
+    def _artifact_keys(
+        module: str,
+        files: list[str],
+        snapshot: ConfigSnapshot,
+        entries: dict[str, FileEntry],
+        graph: ImportGraph,
+    ) -> dict[str, bytes]:
+        version = compiler_version(module)
+        return {
+            rel: artifact_key(
+                module,
+                version,
+                snapshot.artifact_digest,
+                rel,
+                entries[rel].digest,
+                (
+                    entries[dep].digest
+                    for dep in graph.closure(rel)
+                    if dep in entries
+                ),
+            )
+            for rel in files
+        }
+
+    @staticmethod
+    def _restore(
+        store: ArtifactStore,
+        work: dict[str, list[str]],
+        keys: dict[str, dict[str, bytes]],
+        out_dir: Path,
+        io: IOPool,
+        produced: Outputs,
+        remote: RemoteCache | None = None,
+    ) -> dict[str, list[str]]:
+        # Совпавшие артефакты уходят в очередь записи, на компиляцию идёт остаток.
+        # Локальные промахи одним заходом спрашиваем у общего кэша
+        misses: dict[str, list[str]] = {m: [] for m in work}
+        hits = 0
+
+        def _hit(module: str, rel: str, artifact: list[ArtifactFile], source: str):
+            io.submit(rel, store.materialize, artifact, out_dir)
+            produced.setdefault(rel, {})[module] = tuple(f.path for f in artifact)
+            Tracer.instant(rel, "cache", module=module, result=source)
+
+        with Tracer.span("build.restore.local"):
+            items = [(m, rel) for m, files in work.items() for rel in files]
+            found = io.map(lambda item: store.get(keys[item[0]][item[1]]), items)
+            for (module, rel), artifact in zip(items, found):
+                if artifact is None:
+                    misses[module].append(rel)
+                    continue
+
+                _hit(module, rel, artifact, "hit")
+                hits += 1
+
+        remote_hits = 0
+        if remote is not None:
+            restored: set[tuple[str, str]] = set()
+            with Tracer.span("build.restore.remote"):
+                # Каждый пакет проверяется и раскладывается сразу по приходу
+                wanted = {
+                    keys[module][rel]: (module, rel)
+                    for module, files in misses.items()
+                    for rel in files
+                }
+                for key, data in remote.fetch(wanted):
+                    artifact = store.import_bundle(key, data)
+                    if artifact is None:
+                        continue
+
+                    module, rel = wanted[key]
+                    _hit(module, rel, artifact, "remote hit")
+                    restored.add((module, rel))
+
+            remote_hits = len(restored)
+            misses = {
+                m: [rel for rel in files if (m, rel) not in restored]
+                for m, files in misses.items()
+            }
+
+        if Tracer.enabled():
+            for module, files in misses.items():
+                for rel in files:
+                    Tracer.instant(rel, "cache", module=module, result="miss")
+
+        if hits:
+            logger.debug(f"Взято из кэша артефактов: {hits}")
+
+        if remote_hits:
+            logger.debug(f"Взято из общего кэша: {remote_hits}")
+
+        return misses
+
+    @staticmethod
+    def _attribute(staged: list[str], batch: list[str]) -> dict[str, list[str]]:
+        # Какой исходник породил какой файл, компилятор не сообщает.
+        # Считаем что путь вывода заканчивается путём исходника без расширения
+        # (pkg/a.py -> lua/<ns>/pkg/a.lua). Остальное относим ко всем файлам батча
+        stems = sorted(
+            ((rel.rsplit(".", 1)[0], rel) for rel in batch),
+            key=lambda t: -len(t[0]),
+        )
+        out: dict[str, list[str]] = {rel: [] for rel in batch}
+
+        for path in staged:
+            base = path.rsplit(".", 1)[0]
+            owner = next(
+                (
+                    rel
+                    for stem, rel in stems
+                    if base == stem or base.endswith("/" + stem)
+                ),
+                None,
+            )
+
+            if owner is not None:
+                out[owner].append(path)
+                continue
+
+            for rel in batch:
+                out[rel].append(path)
+
+        return out
+
+    @classmethod
+    def _ingest(
+        cls,
+        store: ArtifactStore,
+        staging: Path,
+        batch: list[str],
+        keys: dict[str, bytes],
+        out_dir: Path,
+        remote: RemoteCache | None = None,
+    ) -> dict[str, list[str]]:
+        # Исполняется в потоке записи. Возвращает пути в out_dir по исходникам
+        placed: dict[str, list[str]] = {}
+        for rel, outputs in cls._attribute(_staged(staging), batch).items():
+            artifact = store.put(keys[rel], {o: staging / o for o in outputs})
+            store.materialize(artifact, out_dir)
+            placed[rel] = [f.path for f in artifact]
+
+            if remote is not None:
+                bundle = store.export(keys[rel])
+                if bundle is not None:
+                    remote.push(keys[rel], bundle)
+
+        # Временная папка батча не копится до конца сборки
+        shutil.rmtree(staging, ignore_errors=True)
+        return placed
+
+    @classmethod
+    def _place_staged(
+        cls,
+        staging: Path,
+        batch: list[str],
+        out_dir: Path,
+    ) -> dict[str, list[str]]:
+        # Без стора: вывод батча раскладывается в out_dir как есть
+        staged = _staged(staging)
+        for rel in staged:
+            place_file(staging / rel, out_dir / rel)
+
+        shutil.rmtree(staging, ignore_errors=True)
+        return cls._attribute(staged, batch)
+
+    # endregion
+
+    @classmethod
+    def _compile(
+        cls,
+        work: dict[str, list[str]],
+        snapshot: ConfigSnapshot,
+        jobs: int,
+        executor: concurrent.futures.Executor | None,
+        io: IOPool,
+        store: ArtifactStore | None = None,
+        keys: dict[str, dict[str, bytes]] | None = None,
+        remote: RemoteCache | None = None,
+    ) -> tuple[set[str], dict[str, list[str]]]:
+        # Батчи пишут во временные папки, а не прямо в out_dir: так известно,
+        # какой исходник что породил, а упавший батч не оставляет полувывода.
+        # Готовый батч сразу уходит в очередь записи, пока пул компилирует следующие.
+        # Возвращает упавшие файлы и батчи по ключам юнитов
+        scheduler = BuildScheduler(
+            jobs,
+            executor,
+            initializer=init_worker,
+            initargs=(snapshot,),
+        )
+        batches: dict[str, list[str]] = {}
+        staging: dict[str, Path] = {}
+        staging_root = cls.staging_dir()
+        failed: set[str] = set()
+
+        for module, files in work.items():
+            if not files:
+                continue
+
+            if runs_in_process(module, snapshot):
+                logger.debug(f"Модуль {module} собирает внутри процессов сборки")
+
+            else:
+                logger.debug(f"Модуль {module} запускается отдельным процессом на батч")
+
+            module_key = f"module:{module}"
+            scheduler.add(module_key, check_module, module)
+
+            for i, batch in enumerate(_batches(files, jobs)):
+                key = f"compile:{module}:{i}"
+                batches[key] = batch
+
+                # Батч пишет в свою временную папку, оттуда вывод раскладывается
+                # по артефактам стора и в out_dir
+                out_dir = staging[key] = staging_root / f"{module}-{i}"
+                out_dir.mkdir(parents=True)
+
+                scheduler.add(
+                    key,
+                    run_compiler,
+                    module,
+                    batch,
+                    snapshot.full_digest,
+                    str(out_dir),
+                    deps=(module_key,),
+                )
+
+        def _on_result(key: str, result: tuple[bool, str] | None) -> None:
+            batch = batches.get(key)
+            if batch is None or result is None:
+                return
+
+            ok, output = result
+            if not ok:
+                logger.error(output)
+                failed.update(batch)
+                return
+
+            if output:
+                logger.debug(output)
+
+            if store is not None and keys is not None:
+                module = key.split(":")[1]
+                io.submit(
+                    key,
+                    cls._ingest,
+                    store,
+                    staging[key],
+                    batch,
+                    keys[module],
+                    snapshot.out_dir,
+                    remote,
+                )
+
+            else:
+                io.submit(
+                    key, cls._place_staged, staging[key], batch, snapshot.out_dir
+                )
+
+        result = scheduler.run(_on_result)
+
+        for key, err in result.errors.items():
+            logger.error(f"{key}: {err}")
+            failed.update(batches.get(key, ()))
+
+        for key in result.skipped:
+            failed.update(batches.get(key, ()))
+
+        return failed, batches
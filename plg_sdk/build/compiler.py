@@ -0,0 +1,193 @@
+import contextlib
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import traceback
+from collections.abc import Callable
+from importlib.metadata import EntryPoint, entry_points
+from pathlib import Path
+
+from ..core import Config, ConfigSnapshot
+from ..modules.local_index import LocalIndex
+
+# Точки входа модулей, которые умеют собирать внутри процесса сборки.
+# Имя точки - имя модуля, значение - compile(source_dir, out_dir, files) -> str | None.
+# Возвращённая строка и stdout идут в лог, исключение - ошибка батча
+ENTRY_POINT_GROUP = "plg_sdk.compilers"
+
+CompileFn = Callable[[Path, Path, list[str]], str | None]
+
+
+def compiler_modules(snapshot: ConfigSnapshot | None = None) -> list[str]:
+    return list((snapshot or Config.snapshot()).modules)
+
+
+def compiler_version(module: str) -> str:
+    # Версия модуля входит в ключ артефакта.
+    # У модуля без dist-info (лежит в PYTHONPATH) берём путь и mtime его файла
+    version = LocalIndex.version(module)
+    if version is not None:
+        return version
+
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        return ""
+
+    try:
+        return f"dev:{spec.origin}:{os.stat(spec.origin).st_mtime_ns}"
+
+    except OSError:
+        return f"dev:{spec.origin}"
+
+
+# Функции ниже исполняются в процессах пула сборки.
+# Логгер там не настроен, поэтому всё что нужно показать возвращается наружу
+
+# Снимок конфига приезжает в воркер один раз через initializer пула,
+# задачи несут только его digest
+_snapshot: ConfigSnapshot | None = None
+
+
+def init_worker(snapshot: ConfigSnapshot) -> None:
+    global _snapshot
+    _snapshot = snapshot
+
+
+def worker_snapshot(digest: bytes) -> ConfigSnapshot:
+    # digest - full_digest: смена любого поля, а не только влияющих на вывод
+    if _snapshot is None or _snapshot.full_digest != digest:
+        raise RuntimeError("Снимок конфига в воркере устарел, пул нужно пересоздать")
+
+    return _snapshot
+
+
+# region runners
+# Модуль импортируется один раз на процесс и дальше получает батчи вызовом функции.
+# Без точки входа или с BUILD.isolated модуль запускается отдельным процессом
+_entry_points: dict[str, EntryPoint] | None = None
+_runners: dict[str, CompileFn] = {}
+
+
+def _entry_point(module: str) -> EntryPoint | None:
+    global _entry_points
+    if _entry_points is None:
+        _entry_points = {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+    return _entry_points.get(module)
+
+
+def runs_in_process(module: str, snapshot: ConfigSnapshot) -> bool:
+    return not snapshot.isolated and _entry_point(module) is not None
+
+
+def _runner(module: str) -> CompileFn | None:
+    runner = _runners.get(module)
+    if runner is None:
+        ep = _entry_point(module)
+        if ep is None:
+            return None
+
+        runner = _runners[module] = ep.load()
+
+    return runner
+
+
+def _run_in_process(
+    module: str,
+    runner: CompileFn,
+    snapshot: ConfigSnapshot,
+    files: list[str],
+    out_dir: str,
+) -> tuple[bool, str]:
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            result = runner(snapshot.source_dir, Path(out_dir), list(files))
+
+    except SystemExit as err:
+        # Модуль, написанный как CLI, может завершаться через sys.exit
+        if err.code not in (0, None):
+            return False, (
+                f"Модуль {module} завершился с кодом {err.code}\n"
+                f"{out.getvalue().strip()}"
+            )
+
+        result = None
+
+    except Exception:
+        return False, (
+            f"Модуль {module} завершился с ошибкой\n"
+            f"{traceback.format_exc().strip()}"
+        )
+
+    return True, (out.getvalue() + (result or "")).strip()
+
+
+def _run_subprocess(
+    module: str,
+    snapshot: ConfigSnapshot,
+    files: list[str],
+    out_dir: str,
+) -> tuple[bool, str]:
+    # Контракт модуля: python -m <module> --source <dir> --out <dir> <файлы...>
+    # Файлы передаются относительно source_dir, модуль сам решает что из них ему нужно
+    cmd = [
+        sys.executable,
+        "-m",
+        module,
+        "--source",
+        str(snapshot.source_dir),
+        "--out",
+        out_dir,
+        *files,
+    ]
+
+    try:
+        proc = subprocess.run(cmd, check=False, capture_output=True, text=True)
+
+    except Exception as err:
+        return False, f"Не удалось запустить модуль {module}\n{err}"
+
+    if proc.returncode != 0:
+        return False, (
+            f"Модуль {module} завершился с кодом {proc.returncode}\n"
+            f"{proc.stderr.strip()}"
+        )
+
+    return True, proc.stdout.strip()
+
+
+# endregion
+
+
+def check_module(module: str) -> None:
+    if importlib.util.find_spec(module) is None:
+        raise ModuleNotFoundError(f"Модуль {module} не установлен")
+
+
+def run_compiler(
+    module: str,
+    files: list[str],
+    digest: bytes,
+    out_dir: str,
+) -> tuple[bool, str]:
+    # out_dir - временная папка батча, если сборка идёт через стор артефактов
+    snapshot = worker_snapshot(digest)
+    if snapshot.isolated:
+        return _run_subprocess(module, snapshot, files, out_dir)
+
+    try:
+        runner = _runner(module)
+
+    except Exception:
+        return False, (
+            f"Не удалось загрузить модуль {module}\n"
+            f"{traceback.format_exc().strip()}"
+        )
+
+    if runner is None:
+        return _run_subprocess(module, snapshot, files, out_dir)
+
+    return _run_in_process(module, runner, snapshot, files, out_dir)
@@ -0,0 +1,436 @@
+import ast
+import hashlib
+import logging
+import os
+import re
+import struct
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from pathlib import Path
+
+from ..core import Config
+from .manifest import FileEntry
+
+logger = logging.getLogger("plg-sdk")
+
+# Точки входа, через которые модуль-компилятор сообщает зависимости,
+# которых не видно по импортам (include lua, ресурсы и т.п.).
+# Имя точки - имя модуля, значение - edges(rel, data) -> пути относительно source_dir
+ENTRY_POINT_GROUP = "plg_sdk.deps"
+
+EdgesFn = Callable[[str, bytes], Iterable[str]]
+
+# Начало строки с import/from ... import. Остаток инструкции добирается
+# по скобкам и переносам, разбирается только он, а не весь файл
+_IMPORT_LINE_RE = re.compile(
+    rb"^[ \t]*(?:from[ \t]+[\w.]+[ \t]*(?:import\b|\\)|import[ \t]+\w)",
+    re.MULTILINE,
+)
+_IMPORT_WORD_RE = re.compile(rb"\bimport\b")
+
+
+# region module resolve
+def _package_parts(rel: str) -> list[str]:
+    # Для pkg/sub/mod.py и pkg/sub/__init__.py пакет один и тот же - pkg.sub
+    return rel.split("/")[:-1]
+
+
+def _module_files(dotted: str, files: set[str]) -> set[str]:
+    out = set()
+    parts = dotted.split(".")
+
+    # import a.b.c исполняет a/__init__.py, a/b/__init__.py и сам a/b/c
+    for i in range(1, len(parts) + 1):
+        base = "/".join(parts[:i])
+        for candidate in (f"{base}.py", f"{base}/__init__.py"):
+            if candidate in files:
+                out.add(candidate)
+
+    return out
+
+
+def _imported_modules(rel: str, tree: ast.AST) -> set[str]:
+    out = set()
+    package = _package_parts(rel)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                out.add(alias.name)
+
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    continue
+
+                base = package[: len(package) - (node.level - 1)]
+                module = ".".join(base + ([node.module] if node.module else []))
+
+            else:
+                module = node.module or ""
+
+            if module:
+                out.add(module)
+
+            # from pkg import sub - sub может оказаться подмодулем
+            for alias in node.names:
+                if alias.name != "*":
+                    out.add(f"{module}.{alias.name}" if module else alias.name)
+
+    return out
+
+
+# endregion
+
+
+# region import parse
+def _line_end(data: bytes, pos: int) -> int:
+    end = data.find(b"\n", pos)
+    return len(data) if end < 0 else end
+
+
+def _import_statements(data: bytes) -> bytes | None:
+    # Вырезает инструкции импорта в один модуль без отступов.
+    # None - в файле есть import, который так не найти (после if/; внутри строк),
+    # тогда файл разбирается целиком
+    out: list[bytes] = []
+    end = 0
+    for m in _IMPORT_LINE_RE.finditer(data):
+        start = m.start()
+        if start < end:
+            # Продолжение уже взятой инструкции
+            continue
+
+        end = _line_end(data, start)
+        depth = data.count(b"(", start, end) - data.count(b")", start, end)
+        while depth > 0 or data[start:end].rstrip().endswith(b"\\"):
+            if end >= len(data):
+                break
+
+            stop = _line_end(data, end + 1)
+            depth += data.count(b"(", end, stop) - data.count(b")", end, stop)
+            end = stop
+
+        out.append(data[start:end].lstrip())
+
+    code = b"\n".join(out)
+    if len(_IMPORT_WORD_RE.findall(code)) != len(_IMPORT_WORD_RE.findall(data)):
+        return None
+
+    return code
+
+
+def parse_imports(rel: str, data: bytes) -> set[str]:
+    # Абсолютные имена модулей, которые импортирует файл
+    code = _import_statements(data)
+    tree = None
+    if code is not None:
+        try:
+            tree = ast.parse(code, filename=rel)
+
+        except (SyntaxError, ValueError):
+            tree = None
+
+    if tree is None:
+        try:
+            tree = ast.parse(data, filename=rel)
+
+        except (SyntaxError, ValueError) as err:
+            # Битый файл всё равно уйдёт в компилятор, пусть ошибку покажет он
+            logger.debug(f"Не удалось разобрать импорты {rel}\n{err}")
+            return set()
+
+    return _imported_modules(rel, tree)
+
+
+# endregion
+
+
+def file_imports(source_dir: Path, rel: str, files: set[str]) -> set[str]:
+    out = set()
+    for module in parse_imports(rel, (source_dir / rel).read_bytes()):
+        out |= _module_files(module, files)
+
+    out.discard(rel)
+    return out
+
+
+def build_graph(
+    source_dir: Path,
+    files: set[str],
+    known: set[str] | None = None,
+) -> dict[str, set[str]]:
+    # known - множество для резолва импортов. Туда стоит класть и удалённые файлы,
+    # иначе импорты удалённого модуля потеряются и его зависимые не пересоберутся
+    known = files if known is None else known
+    return {
+        rel: file_imports(source_dir, rel, known)
+        for rel in files
+        if rel.endswith(".py")
+    }
+
+
+def reverse_graph(graph: dict[str, set[str]]) -> dict[str, set[str]]:
+    reverse: dict[str, set[str]] = {}
+    for rel, imports in graph.items():
+        for dep in imports:
+            reverse.setdefault(dep, set()).add(rel)
+
+    return reverse
+
+
+def dependents(
+    graph: dict[str, set[str]],
+    roots: set[str],
+    reverse: dict[str, set[str]] | None = None,
+) -> set[str]:
+    if reverse is None:
+        reverse = reverse_graph(graph)
+
+    out = set()
+    stack = list(roots)
+    while stack:
+        rel = stack.pop()
+        for parent in reverse.get(rel, ()):
+            if parent not in out and parent not in roots:
+                out.add(parent)
+                stack.append(parent)
+
+    return out
+
+
+def imports_closure(graph: dict[str, set[str]], rel: str) -> set[str]:
+    out = set()
+    stack = list(graph.get(rel, ()))
+    while stack:
+        dep = stack.pop()
+        if dep in out or dep == rel:
+            continue
+
+        out.add(dep)
+        stack.extend(graph.get(dep, ()))
+
+    return out
+
+
+class ImportGraph:
+    # Граф файл -> файлы, которые он импортирует, и обратный к нему.
+    # Обратный строится один раз на сборку
+    __slots__ = ("imports", "_reverse")
+
+    def __init__(self, imports: dict[str, set[str]]):
+        self.imports = imports
+        self._reverse: dict[str, set[str]] | None = None
+
+    @property
+    def reverse(self) -> dict[str, set[str]]:
+        if self._reverse is None:
+            self._reverse = reverse_graph(self.imports)
+
+        return self._reverse
+
+    def dependents(self, roots: set[str]) -> set[str]:
+        return dependents(self.imports, roots, self.reverse)
+
+    def closure(self, rel: str) -> set[str]:
+        return imports_closure(self.imports, rel)
+
+
+@dataclass(slots=True, frozen=True)
+class ImportEntry:
+    digest: bytes  # digest содержимого из манифеста
+    modules: tuple[str, ...]  # абсолютные имена импортов, ещё не привязанные к файлам
+    edges: tuple[str, ...]  # пути, объявленные модулями-компиляторами
+
+
+class ImportIndex:
+    MAGIC = b"PLGI"
+    VERSION = 1
+
+    # Импорты хранятся именами модулей, а не путями: резолв зависит от набора
+    # файлов и дёшев, а разбор нужен только файлам с новым digest.
+
+    # HEADER:
+    #   4 bytes    magic (PLGI)
+    #   uint16 LE  version
+    #   uint32 LE  entries_len
+    #   16 bytes   digest набора провайдеров рёбер (модуль + версия)
+
+    # BODY (repeat entries_len):
+    #   uint16 LE  path_len
+    #   16 bytes   digest файла
+    #   uint32 LE  modules_len
+    #   uint32 LE  edges_len
+    #   bytes      path (utf-8, posix)
+    #   bytes      modules (utf-8, через \n)
+    #   bytes      edges (utf-8, через \n)
+
+    _HEADER = struct.Struct("<4sHI16s")
+    _ENTRY = struct.Struct("<H16sII")
+
+    def __init__(
+        self,
+        entries: dict[str, ImportEntry] | None = None,
+        providers: dict[str, EdgesFn] | None = None,
+        token: bytes = b"\0" * 16,
+    ):
+        self.entries = entries or {}
+        self.providers = providers or {}
+        self.token = token
+
+    @staticmethod
+    def path() -> Path:
+        return Config.sdk_path() / "cache/import_graph.bin"
+
+    # region providers
+    @staticmethod
+    def load_providers(
+        modules: Iterable[str],
+        versions: dict[str, str],
+    ) -> tuple[dict[str, EdgesFn], bytes]:
+        wanted = set(modules)
+        providers: dict[str, EdgesFn] = {}
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name not in wanted:
+                continue
+
+            try:
+                providers[ep.name] = ep.load()
+
+            except Exception as err:
+                logger.warning(f"Не удалось загрузить зависимости модуля {ep.name}\n{err}")
+
+        # Новая версия компилятора может объявлять другие рёбра - индекс сбрасывается
+        h = hashlib.blake2b(digest_size=16)
+        for name in sorted(providers):
+            h.update(f"{name}={versions.get(name, '')}\0".encode())
+
+        return providers, h.digest()
+
+    # endregion
+
+    # region io
+    @classmethod
+    def load(
+        cls,
+        providers: dict[str, EdgesFn] | None = None,
+        token: bytes = b"\0" * 16,
+    ) -> "ImportIndex":
+        index = cls(providers=providers, token=token)
+
+        try:
+            data = cls.path().read_bytes()
+
+        except OSError:
+            return index
+
+        if len(data) < cls._HEADER.size:
+            return index
+
+        magic, version, count, saved_token = cls._HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION or saved_token != token:
+            return index
+
+        entries: dict[str, ImportEntry] = {}
+        pos = cls._HEADER.size
+        for _ in range(count):
+            if pos + cls._ENTRY.size > len(data):
+                return index
+
+            path_len, digest, modules_len, edges_len = cls._ENTRY.unpack_from(data, pos)
+            pos += cls._ENTRY.size
+
+            end = pos + path_len + modules_len + edges_len
+            if end > len(data):
+                return index
+
+            rel = data[pos : pos + path_len].decode("utf-8")
+            pos += path_len
+            modules = data[pos : pos + modules_len].decode("utf-8")
+            pos += modules_len
+            edges = data[pos:end].decode("utf-8")
+            pos = end
+
+            entries[rel] = ImportEntry(
+                digest,
+                tuple(modules.split("\n")) if modules else (),
+                tuple(edges.split("\n")) if edges else (),
+            )
+
+        index.entries = entries
+        return index
+
+    def save(self) -> None:
+        path = self.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        chunks = [
+            self._HEADER.pack(self.MAGIC, self.VERSION, len(self.entries), self.token)
+        ]
+        for rel, entry in self.entries.items():
+            path_b = rel.encode("utf-8")
+            modules_b = "\n".join(entry.modules).encode("utf-8")
+            edges_b = "\n".join(entry.edges).encode("utf-8")
+            chunks.append(
+                self._ENTRY.pack(len(path_b), entry.digest, len(modules_b), len(edges_b))
+            )
+            chunks += (path_b, modules_b, edges_b)
+
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(chunks))
+        os.replace(tmp, path)
+
+    # endregion
+
+    def _entry(self, source_dir: Path, rel: str, digest: bytes) -> ImportEntry:
+        try:
+            data = (source_dir / rel).read_bytes()
+
+        except OSError as err:
+            logger.debug(f"Не удалось прочитать {rel}\n{err}")
+            return ImportEntry(digest, (), ())
+
+        modules = parse_imports(rel, data) if rel.endswith(".py") else set()
+
+        edges: set[str] = set()
+        for name, fn in self.providers.items():
+            try:
+                edges.update(fn(rel, data))
+
+            except Exception as err:
+                logger.warning(f"Модуль {name} не смог объявить зависимости {rel}\n{err}")
+
+        return ImportEntry(digest, tuple(sorted(modules)), tuple(sorted(edges)))
+
+    def update(self, source_dir: Path, files: dict[str, FileEntry]) -> int:
+        # Перечитываются только файлы, чей digest не совпал с индексом.
+        # Возвращает число разобранных файлов
+        parsed = 0
+        entries: dict[str, ImportEntry] = {}
+        for rel, file in files.items():
+            entry = self.entries.get(rel)
+            if entry is None or entry.digest != file.digest:
+                entry = self._entry(source_dir, rel, file.digest)
+                parsed += 1
+
+            entries[rel] = entry
+
+        self.entries = entries
+        return parsed
+
+    def graph(self, known: set[str] | None = None) -> ImportGraph:
+        # known - как в build_graph: удалённые файлы тоже участвуют в резолве
+        known = set(self.entries) if known is None else known
+        imports: dict[str, set[str]] = {}
+        for rel, entry in self.entries.items():
+            out: set[str] = set()
+            for module in entry.modules:
+                out |= _module_files(module, known)
+
+            out.update(e for e in entry.edges if e in known)
+            out.discard(rel)
+            if out or rel.endswith(".py"):
+                imports[rel] = out
+
+        return ImportGraph(imports)
@@ -0,0 +1,164 @@
+import hashlib
+import re
+from pathlib import Path
+
+IGNORE_FILE = ".plgignore"
+
+
+# region translate
+def _translate(pattern: str) -> str:
+    # Тело регулярки для одного шаблона в духе gitignore.
+    # *  - что угодно кроме /, ? - один символ кроме /, [...] - класс,
+    # **/ - любые папки (в том числе ни одной), /** - всё внутри
+    out: list[str] = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                if at_start and pattern.startswith("**/", i):
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+
+                if at_start and i + 2 == n:
+                    out.append(".*")
+                    i += 2
+                    continue
+
+                # ** посреди имени ведёт себя как *
+                i += 1
+
+            out.append("[^/]*")
+
+        elif c == "?":
+            out.append("[^/]")
+
+        elif c == "[":
+            # ] сразу после [ или [! - обычный символ класса
+            start = i + 2 if pattern[i + 1 : i + 2] in ("!", "^") else i + 1
+            end = pattern.find("]", start + 1)
+            if end < 0:
+                out.append(re.escape(c))
+
+            else:
+                body = pattern[start:end].replace("\\", "\\\\")
+                if start > i + 1:
+                    body = "^" + body
+
+                out.append("[" + body + "]")
+                i = end
+
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+
+        else:
+            out.append(re.escape(c))
+
+        i += 1
+
+    return "".join(out)
+
+
+def _parse_line(line: str) -> tuple[str, bool, bool] | None:
+    # (регулярка, отрицание, только папки) или None для пустых строк и комментариев
+    line = line.rstrip("\n").rstrip("\r")
+    # Хвостовые пробелы обрезаются, если не экранированы
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+
+    line = stripped
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+
+    elif line.startswith("\\"):
+        # \# и \! - буквальные символы в начале имени
+        line = line[1:] if line[1:2] in ("#", "!") else line
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # Шаблон со / в начале или середине привязан к корню, иначе ищется на любой глубине
+    anchored = "/" in line
+    line = line.lstrip("/")
+
+    body = _translate(line)
+    prefix = "" if anchored else "(?:.*/)?"
+    return f"{prefix}{body}", negate, dir_only
+
+
+# endregion
+
+
+class IgnoreRules:
+    # Шаблоны .plgignore, собранные в регулярки один раз.
+    # Подряд идущие шаблоны одного вида склеиваются в одну регулярку,
+    # проверка идёт с конца: выигрывает последний совпавший, как в git
+
+    __slots__ = ("_groups", "digest")
+
+    def __init__(self, lines: list[str] | None = None):
+        groups: list[tuple[bool, bool, list[str]]] = []
+        for line in lines or ():
+            parsed = _parse_line(line)
+            if parsed is None:
+                continue
+
+            regex, negate, dir_only = parsed
+            if groups and groups[-1][:2] == (negate, dir_only):
+                groups[-1][2].append(regex)
+
+            else:
+                groups.append((negate, dir_only, [regex]))
+
+        self._groups = [
+            (negate, dir_only, re.compile("(?:" + "|".join(rx) + ")\\Z"))
+            for negate, dir_only, rx in reversed(groups)
+        ]
+        data = "\n".join(lines or ()).encode("utf-8")
+        self.digest = hashlib.blake2b(data, digest_size=16).digest()
+
+    @classmethod
+    def load(cls, source_dir: Path) -> "IgnoreRules":
+        try:
+            text = (source_dir / IGNORE_FILE).read_text(encoding="utf-8")
+
+        except FileNotFoundError:
+            return cls()
+
+        return cls(text.splitlines())
+
+    def __bool__(self) -> bool:
+        return bool(self._groups)
+
+    def ignored(self, rel: str, is_dir: bool = False) -> bool:
+        # rel - posix путь относительно source_dir. Родители не проверяются:
+        # обход и так не заходит в исключённые папки
+        for negate, dir_only, regex in self._groups:
+            if dir_only and not is_dir:
+                continue
+
+            if regex.match(rel):
+                return not negate
+
+        return False
+
+    def ignored_path(self, rel: str, is_dir: bool = False) -> bool:
+        # С проверкой родителей: файл внутри исключённой папки исключён,
+        # даже если его имя отдельно разрешено
+        parts = rel.split("/")
+        for i in range(1, len(parts)):
+            if self.ignored("/".join(parts[:i]), True):
+                return True
+
+        return self.ignored(rel, is_dir)
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..core import Config
+from .pipeline import IOPool
+from .scanner import SourceTree
+
+
+@dataclass(slots=True, frozen=True)
+class FileEntry:
+    path: str  # posix путь относительно source_dir
+    size: int
+    mtime_ns: int
+    digest: bytes
+
+
+@dataclass(slots=True)
+class ManifestDiff:
+    added: set[str]
+    changed: set[str]
+    removed: set[str]
+
+    @property
+    def dirty(self) -> set[str]:
+        return self.added | self.changed | self.removed
+
+
+# исходник -> модуль -> пути в out_dir, которые он породил
+Outputs = dict[str, dict[str, tuple[str, ...]]]
+
+
+def file_digest(path: Path) -> bytes:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).digest()
+
+
+class BuildManifest:
+    MAGIC = b"PLGB"
+    VERSION = 3
+
+    # Структура бинарника.
+
+    # HEADER:
+    #   4 bytes    magic (PLGB)
+    #   uint16 LE  version
+    #   uint32 LE  entries_len
+    #   16 bytes   ConfigSnapshot.digest конфига, с которым собирали
+
+    # BODY (repeat entries_len):
+    #   uint16 LE  path_len
+    #   uint64 LE  size
+    #   int64 LE   mtime_ns
+    #   16 bytes   blake2b digest
+    #   uint32 LE  outputs_len
+    #   bytes      path (utf-8, posix)
+    #   bytes      outputs: строки "<module>\t<путь в out_dir>" через \n
+
+    _HEADER = struct.Struct("<4sHI16s")
+    _ENTRY = struct.Struct("<HQq16sI")
+
+    @classmethod
+    def path(cls) -> Path:
+        return Config.sdk_path() / "cache/build_manifest.bin"
+
+    @classmethod
+    def load(cls) -> tuple[dict[str, FileEntry], bytes, Outputs]:
+        # (записи, digest конфига, что каждый исходник положил в out_dir)
+        path = cls.path()
+        if not path.exists():
+            return {}, b"", {}
+
+        data = path.read_bytes()
+        if len(data) < cls._HEADER.size:
+            return {}, b"", {}
+
+        magic, version, count, config_digest = cls._HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            return {}, b"", {}
+
+        entries: dict[str, FileEntry] = {}
+        outputs: Outputs = {}
+        pos = cls._HEADER.size
+        for _ in range(count):
+            if pos + cls._ENTRY.size > len(data):
+                return {}, b"", {}
+
+            path_len, size, mtime_ns, digest, out_len = cls._ENTRY.unpack_from(
+                data, pos
+            )
+            pos += cls._ENTRY.size
+
+            if pos + path_len + out_len > len(data):
+                return {}, b"", {}
+
+            rel = data[pos : pos + path_len].decode("utf-8")
+            pos += path_len
+            lines = data[pos : pos + out_len].decode("utf-8")
+            pos += out_len
+
+            entries[rel] = FileEntry(rel, size, mtime_ns, digest)
+            if lines:
+                by_module: dict[str, list[str]] = {}
+                for line in lines.split("\n"):
+                    module, _, out = line.partition("\t")
+                    by_module.setdefault(module, []).append(out)
+
+                outputs[rel] = {m: tuple(paths) for m, paths in by_module.items()}
+
+        return entries, config_digest, outputs
+
+    @classmethod
+    def save(
+        cls,
+        entries: dict[str, FileEntry],
+        config_digest: bytes = b"",
+        outputs: Outputs | None = None,
+    ) -> None:
+        path = cls.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        outputs = outputs or {}
+
+        chunks = [
+            cls._HEADER.pack(cls.MAGIC, cls.VERSION, len(entries), config_digest)
+        ]
+        for entry in entries.values():
+            path_b = entry.path.encode("utf-8")
+            out_b = "\n".join(
+                f"{module}\t{out}"
+                for module, paths in outputs.get(entry.path, {}).items()
+                for out in paths
+            ).encode("utf-8")
+            chunks.append(
+                cls._ENTRY.pack(
+                    len(path_b), entry.size, entry.mtime_ns, entry.digest, len(out_b)
+                )
+            )
+            chunks += (path_b, out_b)
+
+        # Пишем во временный файл, чтобы прерванная сборка не оставила битый манифест
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(chunks))
+        os.replace(tmp, path)
+
+    @classmethod
+    def scan(
+        cls,
+        source_dir: Path,
+        previous: dict[str, FileEntry],
+        io: IOPool | None = None,
+        tree: SourceTree | None = None,
+        changed: set[str] | None = None,
+    ) -> dict[str, FileEntry]:
+        # io - пул потоков сборки: stat и хэширование идут в нём, пока обход
+        # папок продолжается. На сетевых дисках это основная часть времени скана.
+        # tree - обход с .plgignore и кэшем листингов, changed - подсказки наблюдателя
+        if tree is None:
+            tree = SourceTree(source_dir)
+
+        entries: dict[str, FileEntry] = {}
+
+        def _pending() -> Iterator[str]:
+            for rel, maybe_changed in tree.walk(changed):
+                old = previous.get(rel)
+                # Наблюдатель не видел событий по файлу - даже stat не нужен
+                if old is not None and not maybe_changed:
+                    entries[rel] = old
+                    continue
+
+                yield rel
+
+        def _entry(rel: str) -> FileEntry | None:
+            full = source_dir / rel
+            try:
+                st = full.stat()
+
+            except FileNotFoundError:
+                # Удалён между листингом папки и stat
+                return None
+
+            # size + mtime совпали - контент не перечитываем
+            old = previous.get(rel)
+            if (
+                old is not None
+                and old.size == st.st_size
+                and old.mtime_ns == st.st_mtime_ns
+            ):
+                return old
+
+            return FileEntry(rel, st.st_size, st.st_mtime_ns, file_digest(full))
+
+        pending = _pending()
+        results = io.map(_entry, pending) if io is not None else map(_entry, pending)
+        for entry in results:
+            if entry is not None:
+                entries[entry.path] = entry
+
+        # Файлы без stat попали в entries раньше остальных - порядок по путям
+        return dict(sorted(entries.items()))
+
+    @staticmethod
+    def diff(old: dict[str, FileEntry], new: dict[str, FileEntry]) -> ManifestDiff:
+        added = new.keys() - old.keys()
+        removed = old.keys() - new.keys()
+        changed = {
+            rel
+            for rel, entry in new.items()
+            if rel in old and old[rel].digest != entry.digest
+        }
+
+        return ManifestDiff(set(added), changed, set(removed))
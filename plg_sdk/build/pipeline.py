@@ -0,0 +1,79 @@
+import collections
+import concurrent.futures
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, TypeVar
+
+from ..core.trace import Tracer
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def io_workers(jobs: int) -> int:
+    # Потоки под диск и сеть упираются в латентность, а не в CPU,
+    # поэтому их чуть больше чем процессов сборки, но немного
+    return max(2, min(8, jobs * 2))
+
+
+class IOPool:
+    # Стадия ввода-вывода сборки: чтение при скане и запись результатов,
+    # пока процессы пула компилируют следующие батчи.
+    # Очередь ограничена: submit ждёт, когда в полёте limit задач,
+    # так что сборка не убегает вперёд диска и память не растёт с проектом
+
+    def __init__(self, workers: int, limit: int | None = None):
+        self.workers = max(1, workers)
+        self.limit = limit or self.workers * 4
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            self.workers,
+            thread_name_prefix="plg-io",
+        )
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._errors: dict[str, BaseException] = {}
+        self._lock = threading.Lock()
+        # Не None результаты submit по ключам, читать после close()
+        self.results: dict[str, Any] = {}
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        # Как Executor.map, но items забираются лениво, а в полёте не больше limit.
+        # Результаты идут в порядке items
+        pending: collections.deque[concurrent.futures.Future[R]] = collections.deque()
+        for item in items:
+            pending.append(self._pool.submit(fn, item))
+            if len(pending) >= self.limit:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+    @staticmethod
+    def _run(key: str, fn: Callable[..., Any], args: tuple[Any, ...]) -> Any:
+        with Tracer.span(key, "io"):
+            return fn(*args)
+
+    def submit(self, key: str, fn: Callable[..., Any], *args: Any) -> None:
+        # Ошибка задачи не всплывает сразу, а копится под key до close()
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._run, key, fn, args)
+
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda f: self._done(key, f))
+
+    def _done(self, key: str, future: concurrent.futures.Future) -> None:
+        self._slots.release()
+        err = future.exception()
+        with self._lock:
+            if err is not None:
+                self._errors.setdefault(key, err)
+
+            elif future.result() is not None:
+                self.results[key] = future.result()
+
+    def close(self) -> dict[str, BaseException]:
+        self._pool.shutdown(wait=True)
+        return dict(self._errors)
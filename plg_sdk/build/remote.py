@@ -0,0 +1,288 @@
+import concurrent.futures
+import http.client
+import logging
+import os
+import threading
+import urllib.parse
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from ..core import ConfigSnapshot
+
+logger = logging.getLogger("plg-sdk")
+
+
+class RemoteError(Exception):
+    pass
+
+
+# region backends
+class DirectoryRemote:
+    # Общая папка (NFS, SMB, volume в CI). Раскладка как у objects в сторе
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: bytes) -> Path:
+        name = key.hex()
+        return self.root / name[:2] / name
+
+    def get(self, key: bytes) -> bytes | None:
+        try:
+            return self._path(key).read_bytes()
+
+        except FileNotFoundError:
+            return None
+
+        except OSError as err:
+            raise RemoteError(str(err)) from err
+
+    def put(self, key: bytes, data: bytes) -> None:
+        path = self._path(key)
+        # Уникальное имя: в одну папку могут писать несколько машин сразу
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+        except OSError as err:
+            tmp.unlink(missing_ok=True)
+            raise RemoteError(str(err)) from err
+
+    def close(self) -> None:
+        pass
+
+
+class HttpRemote:
+    # GET/PUT <base>/<key hex>. Подходит любой сервер, который умеет
+    # отдавать и принимать файлы (nginx с dav, bazel-remote и т.п.).
+    # Одно keep-alive соединение на поток
+    def __init__(self, base_url: str, timeout: float = 5):
+        url = urllib.parse.urlsplit(base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"Некорректный адрес кэша: {base_url}")
+
+        self._https = url.scheme == "https"
+        self._host = url.hostname
+        self._port = url.port
+        self._prefix = url.path.rstrip("/")
+        self._timeout = timeout
+        self._local = threading.local()
+        self._conns: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._https:
+                conn_cls = http.client.HTTPSConnection
+
+            else:
+                conn_cls = http.client.HTTPConnection
+
+            conn = conn_cls(self._host, self._port, timeout=self._timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _request(
+        self,
+        method: str,
+        key: bytes,
+        body: bytes | None = None,
+    ) -> tuple[int, bytes]:
+        path = f"{self._prefix}/{key.hex()}"
+        headers = {"Connection": "keep-alive"}
+        if body is not None:
+            headers["Content-Type"] = "application/octet-stream"
+
+        # Сервер мог закрыть простаивающее соединение - одна попытка на переподключение
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                return resp.status, resp.read()
+
+            except (
+                http.client.RemoteDisconnected,
+                http.client.CannotSendRequest,
+                ConnectionResetError,
+                BrokenPipeError,
+            ) as err:
+                self._drop()
+                if attempt:
+                    raise RemoteError(str(err)) from err
+
+            except (OSError, http.client.HTTPException) as err:
+                self._drop()
+                raise RemoteError(str(err)) from err
+
+        raise RuntimeError("unreachable")
+
+    def get(self, key: bytes) -> bytes | None:
+        status, body = self._request("GET", key)
+        if status == 404:
+            return None
+
+        if status != 200:
+            raise RemoteError(f"HTTP {status} на GET {key.hex()}")
+
+        return body
+
+    def put(self, key: bytes, data: bytes) -> None:
+        status, _ = self._request("PUT", key, data)
+        if status not in (200, 201, 204):
+            raise RemoteError(f"HTTP {status} на PUT {key.hex()}")
+
+    def close(self) -> None:
+        # Соединения живут в потоках пула, закрываем все разом
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+
+            self._conns.clear()
+
+        self._local = threading.local()
+
+
+# endregion
+
+
+class RemoteCache:
+    # Общий кэш артефактов поверх бэкенда.
+    # Любая ошибка выключает кэш до конца процесса: сборка продолжается локально,
+    # а не ждёт таймаут на каждом файле
+
+    def __init__(
+        self,
+        backend: DirectoryRemote | HttpRemote,
+        push: bool = True,
+        workers: int = 8,
+    ):
+        self.backend = backend
+        self.push_enabled = push
+        self._workers = workers
+        self._disabled = False
+        self._pool: concurrent.futures.ThreadPoolExecutor | None = None
+        self._pending: list[concurrent.futures.Future] = []
+        # push зовут потоки записи сборки
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ConfigSnapshot) -> "RemoteCache | None":
+        url = snapshot.remote_cache
+        if not url:
+            return None
+
+        if url.startswith(("http://", "https://")):
+            backend = HttpRemote(url, snapshot.remote_timeout)
+
+        else:
+            if url.startswith("file://"):
+                url = urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+
+            backend = DirectoryRemote(Path(url).expanduser().resolve())
+
+        return cls(backend, snapshot.remote_push)
+
+    @property
+    def available(self) -> bool:
+        return not self._disabled
+
+    def _executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    self._workers,
+                    thread_name_prefix="plg-remote",
+                )
+
+            return self._pool
+
+    def _fail(self, err: BaseException) -> None:
+        if not self._disabled:
+            self._disabled = True
+            logger.warning(f"Общий кэш недоступен, собираем локально\n{err}")
+
+    def fetch(self, keys: Iterable[bytes]) -> Iterator[tuple[bytes, bytes]]:
+        # Пакеты отдаются по мере прихода, а не копятся в памяти все сразу.
+        # В полёте не больше 2 * workers запросов: пока вызывающий раскладывает
+        # пришедший пакет, следующие не качаются впрок
+        keys = list(keys)
+        if self._disabled or not keys:
+            return
+
+        def _get(key: bytes) -> bytes | None:
+            if self._disabled:
+                return None
+
+            try:
+                return self.backend.get(key)
+
+            except RemoteError as err:
+                self._fail(err)
+                return None
+
+        pool = self._executor()
+        todo = iter(keys)
+        running: dict[concurrent.futures.Future, bytes] = {}
+        try:
+            while True:
+                while len(running) < self._workers * 2 and not self._disabled:
+                    key = next(todo, None)
+                    if key is None:
+                        break
+
+                    running[pool.submit(_get, key)] = key
+
+                if not running:
+                    return
+
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    key = running.pop(future)
+                    data = future.result()
+                    if data is not None:
+                        yield key, data
+
+        finally:
+            for future in running:
+                future.cancel()
+
+    def push(self, key: bytes, data: bytes) -> None:
+        # Отправка в фоне, сборка ждёт её только в close()
+        if self._disabled or not self.push_enabled:
+            return
+
+        def _put() -> None:
+            if self._disabled:
+                return
+
+            try:
+                self.backend.put(key, data)
+
+            except RemoteError as err:
+                self._fail(err)
+
+        self._pending.append(self._executor().submit(_put))
+
+    def close(self) -> None:
+        concurrent.futures.wait(self._pending)
+        self._pending.clear()
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+        self.backend.close()
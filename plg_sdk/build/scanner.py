@@ -0,0 +1,237 @@
+import hashlib
+import os
+import struct
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..core import Config
+from .ignore import IGNORE_FILE, IgnoreRules
+
+# Папка, изменённая позже этого порога до начала скана, не кэшируется:
+# в тот же тик mtime в неё могли добавить файл, и mtime бы не сдвинулся
+_RACY_NS = 2_000_000_000
+
+
+@dataclass(slots=True, frozen=True)
+class DirEntry:
+    mtime_ns: int  # -1 - листинг не доверять, перечитать в следующий раз
+    files: tuple[str, ...]
+    dirs: tuple[str, ...]
+
+
+class SourceTree:
+    # Обход source_dir через os.scandir с .plgignore и кэшем листингов папок.
+    # mtime папки меняется только при создании, удалении и переименовании
+    # записей в ней, поэтому совпавший mtime - тот же список имён без readdir.
+    # Содержимое файлов проверяет манифест по size + mtime
+
+    MAGIC = b"PLGT"
+    VERSION = 1
+
+    # HEADER:
+    #   4 bytes    magic (PLGT)
+    #   uint16 LE  version
+    #   uint32 LE  dirs_len
+    #   16 bytes   digest правил .plgignore
+    #   16 bytes   digest пути source_dir
+
+    # BODY (repeat dirs_len):
+    #   uint16 LE  path_len ("" - сам source_dir)
+    #   int64 LE   mtime_ns
+    #   uint32 LE  files_len
+    #   uint32 LE  dirs_len
+    #   bytes      path (utf-8, posix)
+    #   bytes      имена файлов (utf-8, через \n)
+    #   bytes      имена папок (utf-8, через \n)
+
+    _HEADER = struct.Struct("<4sHI16s16s")
+    _ENTRY = struct.Struct("<HqII")
+
+    def __init__(
+        self,
+        source_dir: Path,
+        rules: IgnoreRules | None = None,
+        dirs: dict[str, DirEntry] | None = None,
+    ):
+        self.source_dir = source_dir
+        self.rules = rules if rules is not None else IgnoreRules.load(source_dir)
+        self.dirs = dirs or {}
+        # Статистика последнего обхода
+        self.listed = 0
+        self.reused = 0
+
+    @staticmethod
+    def path() -> Path:
+        return Config.sdk_path() / "cache/source_tree.bin"
+
+    def _root_digest(self) -> bytes:
+        data = str(self.source_dir).encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    # region io
+    @classmethod
+    def load(cls, source_dir: Path) -> "SourceTree":
+        # Кэш сбрасывается при смене source_dir или правил .plgignore
+        tree = cls(source_dir)
+
+        try:
+            data = cls.path().read_bytes()
+
+        except OSError:
+            return tree
+
+        if len(data) < cls._HEADER.size:
+            return tree
+
+        magic, version, count, rules, root = cls._HEADER.unpack_from(data, 0)
+        if (
+            magic != cls.MAGIC
+            or version != cls.VERSION
+            or rules != tree.rules.digest
+            or root != tree._root_digest()
+        ):
+            return tree
+
+        dirs: dict[str, DirEntry] = {}
+        pos = cls._HEADER.size
+        for _ in range(count):
+            if pos + cls._ENTRY.size > len(data):
+                return tree
+
+            path_len, mtime_ns, files_len, dirs_len = cls._ENTRY.unpack_from(data, pos)
+            pos += cls._ENTRY.size
+
+            end = pos + path_len + files_len + dirs_len
+            if end > len(data):
+                return tree
+
+            rel = data[pos : pos + path_len].decode("utf-8")
+            pos += path_len
+            files = data[pos : pos + files_len].decode("utf-8")
+            pos += files_len
+            subdirs = data[pos:end].decode("utf-8")
+            pos = end
+
+            dirs[rel] = DirEntry(
+                mtime_ns,
+                tuple(files.split("\n")) if files else (),
+                tuple(subdirs.split("\n")) if subdirs else (),
+            )
+
+        tree.dirs = dirs
+        return tree
+
+    def save(self) -> None:
+        path = self.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        chunks = [
+            self._HEADER.pack(
+                self.MAGIC,
+                self.VERSION,
+                len(self.dirs),
+                self.rules.digest,
+                self._root_digest(),
+            )
+        ]
+        for rel, entry in self.dirs.items():
+            path_b = rel.encode("utf-8")
+            files_b = "\n".join(entry.files).encode("utf-8")
+            dirs_b = "\n".join(entry.dirs).encode("utf-8")
+            chunks.append(
+                self._ENTRY.pack(len(path_b), entry.mtime_ns, len(files_b), len(dirs_b))
+            )
+            chunks += (path_b, files_b, dirs_b)
+
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(chunks))
+        os.replace(tmp, path)
+
+    # endregion
+
+    def _listing(
+        self,
+        rel_dir: str,
+        cached: DirEntry | None,
+        touched: set[str] | None,
+        start_ns: int,
+    ) -> DirEntry | None:
+        # None - папки больше нет
+        if cached is not None and touched is not None and rel_dir not in touched:
+            # Наблюдатель не видел событий внутри - даже stat не нужен
+            self.reused += 1
+            return cached
+
+        full = self.source_dir / rel_dir
+        try:
+            mtime_ns = os.stat(full).st_mtime_ns
+
+        except OSError:
+            return None
+
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            self.reused += 1
+            return cached
+
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        files: list[str] = []
+        dirs: list[str] = []
+        try:
+            with os.scandir(full) as it:
+                for entry in it:
+                    rel = prefix + entry.name
+                    if not rel_dir and entry.name == IGNORE_FILE:
+                        continue
+
+                    # Как os.walk: в симлинки на папки не заходим
+                    is_dir = entry.is_dir()
+                    if is_dir and entry.is_symlink():
+                        continue
+
+                    if self.rules and self.rules.ignored(rel, is_dir):
+                        continue
+
+                    (dirs if is_dir else files).append(entry.name)
+
+        except OSError:
+            return None
+
+        if mtime_ns >= start_ns - _RACY_NS:
+            mtime_ns = -1
+
+        self.listed += 1
+        return DirEntry(mtime_ns, tuple(sorted(files)), tuple(sorted(dirs)))
+
+    def walk(self, changed: set[str] | None = None) -> Iterator[tuple[str, bool]]:
+        # (путь файла, мог ли он измениться).
+        # changed - пути, о которых сообщил наблюдатель в режиме watch.
+        # С ним папки вне этих путей не трогаются вовсе, а файлы вне changed
+        # считаются неизменными. None - проверяется всё дерево
+        start_ns = time.time_ns()
+        touched: set[str] | None = None
+        if changed is not None:
+            touched = {""}
+            for rel in changed:
+                parts = rel.split("/")
+                touched.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+        old = self.dirs
+        self.dirs = {}
+        self.listed = self.reused = 0
+
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            entry = self._listing(rel_dir, old.get(rel_dir), touched, start_ns)
+            if entry is None:
+                continue
+
+            self.dirs[rel_dir] = entry
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            for name in entry.files:
+                rel = prefix + name
+                yield rel, changed is None or rel in changed
+
+            stack.extend(prefix + name for name in reversed(entry.dirs))
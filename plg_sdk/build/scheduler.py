@@ -0,0 +1,227 @@
+import concurrent.futures
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from ..core import Config, ConfigSnapshot
+from ..core.trace import Tracer, now_us, traced_call
+
+logger = logging.getLogger("plg-sdk")
+
+
+def resolve_jobs(
+    jobs: int | None = None,
+    snapshot: ConfigSnapshot | None = None,
+) -> int:
+    if jobs is not None:
+        return max(1, jobs)
+
+    if not (snapshot or Config.snapshot()).parallel:
+        return 1
+
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+
+    return max(1, os.cpu_count() or 1)
+
+
+@dataclass(slots=True)
+class WorkUnit:
+    key: str
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    deps: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class ScheduleResult:
+    results: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, BaseException] = field(default_factory=dict)
+    skipped: set[str] = field(default_factory=set)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.skipped
+
+
+class BuildScheduler:
+    def __init__(
+        self,
+        jobs: int = 1,
+        executor: concurrent.futures.Executor | None = None,
+        initializer: Callable[..., Any] | None = None,
+        initargs: tuple[Any, ...] = (),
+    ):
+        # executor передаётся снаружи, когда пул должен пережить одну сборку (watch).
+        # initializer применяется к своему пулу и к инлайн режиму
+        self.jobs = max(1, jobs)
+        self._executor = executor
+        self._initializer = initializer
+        self._initargs = initargs
+        self._units: dict[str, WorkUnit] = {}
+
+    def add(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        deps: tuple[str, ...] = (),
+    ) -> None:
+        if key in self._units:
+            raise ValueError(f"Юнит {key} уже добавлен")
+
+        self._units[key] = WorkUnit(key, fn, args, deps)
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    # region DAG
+    def _graph(self) -> tuple[dict[str, int], dict[str, list[str]]]:
+        indegree = {key: 0 for key in self._units}
+        children: dict[str, list[str]] = {key: [] for key in self._units}
+
+        for unit in self._units.values():
+            for dep in unit.deps:
+                if dep not in self._units:
+                    raise ValueError(f"Юнит {unit.key} зависит от неизвестного {dep}")
+
+                indegree[unit.key] += 1
+                children[dep].append(unit.key)
+
+        # Кан на копии, чтобы поймать цикл до запуска чего-либо
+        left = dict(indegree)
+        ready = [key for key, n in left.items() if n == 0]
+        seen = 0
+        while ready:
+            key = ready.pop()
+            seen += 1
+            for child in children[key]:
+                left[child] -= 1
+                if left[child] == 0:
+                    ready.append(child)
+
+        if seen != len(self._units):
+            cycle = sorted(key for key, n in left.items() if n > 0)
+            raise ValueError(f"Цикл в графе сборки: {', '.join(cycle)}")
+
+        return indegree, children
+
+    def _skip(
+        self,
+        key: str,
+        children: dict[str, list[str]],
+        out: ScheduleResult,
+    ) -> None:
+        stack = list(children[key])
+        while stack:
+            child = stack.pop()
+            if child in out.skipped:
+                continue
+
+            out.skipped.add(child)
+            stack.extend(children[child])
+
+    # endregion
+
+    def _call(self, unit: WorkUnit) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        # С трейсом юнит оборачивается и сам сообщает когда реально начал и закончил
+        if Tracer.enabled():
+            return traced_call, (unit.fn, *unit.args)
+
+        return unit.fn, unit.args
+
+    def run(
+        self,
+        on_result: Callable[[str, Any], None] | None = None,
+    ) -> ScheduleResult:
+        # on_result(key, result) зовётся сразу по готовности юнита, пока остальные
+        # ещё считаются. Если он блокируется, новые юниты не выдаются - это и есть
+        # обратное давление от медленной записи
+        indegree, children = self._graph()
+        out = ScheduleResult()
+        ready = [key for key, n in indegree.items() if n == 0]
+        queued: dict[str, float] = {}
+
+        def _done(key: str, result: Any = None, err: BaseException | None = None):
+            if err is not None:
+                Tracer.instant(key, "error", error=str(err))
+                out.errors[key] = err
+                self._skip(key, children, out)
+                return
+
+            if Tracer.enabled():
+                result, start, end, pid = result
+                Tracer.worker(pid)
+                Tracer.complete(
+                    key,
+                    "unit",
+                    start,
+                    end,
+                    pid=pid,
+                    tid=pid,
+                    wait_ms=round((start - queued[key]) / 1000, 3),
+                )
+
+            out.results[key] = result
+            if on_result is not None:
+                on_result(key, result)
+
+            for child in children[key]:
+                indegree[child] -= 1
+                if indegree[child] == 0 and child not in out.skipped:
+                    ready.append(child)
+
+        # Один поток - без пула, незачем платить за старт процессов
+        if self.jobs == 1 and self._executor is None:
+            if self._initializer is not None:
+                self._initializer(*self._initargs)
+
+            while ready:
+                unit = self._units[ready.pop(0)]
+                queued[unit.key] = now_us()
+                fn, args = self._call(unit)
+                try:
+                    _done(unit.key, fn(*args))
+
+                except Exception as err:
+                    _done(unit.key, err=err)
+
+            return out
+
+        own_pool = self._executor is None
+        pool = self._executor or concurrent.futures.ProcessPoolExecutor(
+            self.jobs,
+            initializer=self._initializer,
+            initargs=self._initargs,
+        )
+
+        try:
+            running: dict[concurrent.futures.Future, str] = {}
+
+            while ready or running:
+                while ready:
+                    unit = self._units[ready.pop(0)]
+                    queued[unit.key] = now_us()
+                    fn, args = self._call(unit)
+                    running[pool.submit(fn, *args)] = unit.key
+
+                done, _ = concurrent.futures.wait(
+                    running,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    key = running.pop(future)
+                    err = future.exception()
+                    if err is not None:
+                        _done(key, err=err)
+
+                    else:
+                        _done(key, future.result())
+
+        finally:
+            if own_pool:
+                pool.shutdown(cancel_futures=True)
+
+        return out
@@ -0,0 +1,426 @@
+import hashlib
+import os
+import shutil
+import struct
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath, PureWindowsPath
+
+from .manifest import file_digest
+from .sync import place_file
+
+
+@dataclass(slots=True, frozen=True)
+class ArtifactFile:
+    path: str  # posix путь относительно out_dir
+    digest: bytes  # blake2b содержимого, он же имя блоба
+    size: int
+
+
+def _safe_path(rel: str) -> bool:
+    # Путь из записи идёт в out_dir / path. Записи приходят и из общего кэша,
+    # поэтому абсолютные пути, .. и прочее, что выводит за out_dir, - это брак.
+    # Windows-разделители и диски тоже: на windows они сработали бы
+    posix = PurePosixPath(rel)
+    return (
+        bool(rel)
+        and "\\" not in rel
+        and not posix.is_absolute()
+        and not PureWindowsPath(rel).drive
+        and all(part not in ("", ".", "..") for part in rel.split("/"))
+    )
+
+
+def artifact_key(
+    module: str,
+    module_version: str,
+    config_digest: bytes,
+    path: str,
+    source_digest: bytes,
+    deps: Iterable[bytes] = (),
+) -> bytes:
+    # Путь входит в ключ: от него зависят пути вывода, а одинаковые файлы
+    # (пустые __init__.py) иначе делили бы один артефакт.
+    # deps - digest'ы файлов, которые исходник импортирует (транзитивно).
+    # Без них зависимый файл достал бы из кэша вывод, собранный против старого импорта
+    h = hashlib.blake2b(digest_size=16)
+    for part in (module, module_version, path):
+        h.update(part.encode("utf-8") + b"\0")
+
+    h.update(config_digest)
+    h.update(source_digest)
+    for dep in sorted(deps):
+        h.update(dep)
+
+    return h.digest()
+
+
+class ArtifactStore:
+    # Контентно-адресуемое хранилище артефактов сборки.
+
+    # objects/<aa>/<digest>  - блобы, имя = blake2b содержимого
+    # artifacts/<key>        - список файлов одного артефакта
+    # size.bin               - сколько байт занимают блобы
+    # mtime записи артефакта - время последнего использования, по нему идёт LRU
+
+    MAGIC = b"PLGA"
+    VERSION = 1
+
+    # Структура записи артефакта.
+
+    # HEADER:
+    #   4 bytes    magic (PLGA)
+    #   uint16 LE  version
+    #   uint32 LE  files_len
+
+    # BODY (repeat files_len):
+    #   uint16 LE  path_len
+    #   uint64 LE  size
+    #   16 bytes   blake2b digest
+    #   bytes      path (utf-8, posix)
+
+    _HEADER = struct.Struct("<4sHI")
+    _ENTRY = struct.Struct("<HQ16s")
+
+    # Пакет для общего кэша: запись артефакта и блобы одним куском.
+
+    # HEADER:
+    #   4 bytes    magic (PLGR)
+    #   uint16 LE  version
+    #   uint32 LE  record_len
+    # BODY:
+    #   bytes      запись артефакта (см. выше)
+    #   bytes      блобы подряд в порядке записи
+
+    BUNDLE_MAGIC = b"PLGR"
+    _BUNDLE = struct.Struct("<4sHI")
+
+    # Счётчик размера, чтобы не обходить весь стор на каждой сборке.
+
+    # size.bin:
+    #   4 bytes    magic (PLGS)
+    #   uint16 LE  version
+    #   uint64 LE  байт в блобах
+    # Два потока, записавшие один блоб одновременно, посчитают его дважды.
+    # Завышенный счётчик только раньше запустит полный обход, а тот его поправит
+
+    SIZE_MAGIC = b"PLGS"
+    _SIZE = struct.Struct("<4sHQ")
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._objects = root / "objects"
+        self._artifacts = root / "artifacts"
+        self._size_file = root / "size.bin"
+        self._added = 0
+        self._lock = threading.Lock()
+
+    def _blob(self, digest: bytes) -> Path:
+        name = digest.hex()
+        return self._objects / name[:2] / name
+
+    def _record(self, key: bytes) -> Path:
+        return self._artifacts / key.hex()
+
+    # region size index
+    def _load_size(self) -> int | None:
+        try:
+            data = self._size_file.read_bytes()
+
+        except OSError:
+            return None
+
+        if len(data) != self._SIZE.size:
+            return None
+
+        magic, version, total = self._SIZE.unpack(data)
+        if magic != self.SIZE_MAGIC or version != self.VERSION:
+            return None
+
+        return total
+
+    def _save_size(self, total: int) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp(self._size_file)
+        tmp.write_bytes(self._SIZE.pack(self.SIZE_MAGIC, self.VERSION, total))
+        os.replace(tmp, self._size_file)
+
+    def _grow(self, size: int) -> None:
+        with self._lock:
+            self._added += size
+
+    def size(self) -> int | None:
+        # Байт в блобах по счётчику. None - счётчика нет, нужен prune
+        total = self._load_size()
+        if total is None:
+            return None
+
+        with self._lock:
+            return total + self._added
+
+    # endregion
+
+    @staticmethod
+    def _tmp(path: Path) -> Path:
+        # Стор пишут потоки записи сборки, одинаковый блоб может прийти из двух сразу
+        return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    # region records
+    @classmethod
+    def _pack(cls, files: list[ArtifactFile]) -> bytes:
+        chunks = [cls._HEADER.pack(cls.MAGIC, cls.VERSION, len(files))]
+        for f in files:
+            path_b = f.path.encode("utf-8")
+            chunks.append(cls._ENTRY.pack(len(path_b), f.size, f.digest))
+            chunks.append(path_b)
+
+        return b"".join(chunks)
+
+    @classmethod
+    def _unpack(cls, data: bytes) -> list[ArtifactFile] | None:
+        if len(data) < cls._HEADER.size:
+            return None
+
+        magic, version, count = cls._HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            return None
+
+        files: list[ArtifactFile] = []
+        pos = cls._HEADER.size
+        for _ in range(count):
+            if pos + cls._ENTRY.size > len(data):
+                return None
+
+            path_len, size, digest = cls._ENTRY.unpack_from(data, pos)
+            pos += cls._ENTRY.size
+            if pos + path_len > len(data):
+                return None
+
+            rel = data[pos : pos + path_len].decode("utf-8")
+            if not _safe_path(rel):
+                return None
+
+            files.append(ArtifactFile(rel, digest, size))
+            pos += path_len
+
+        return files
+
+    # endregion
+
+    def get(self, key: bytes) -> list[ArtifactFile] | None:
+        record = self._record(key)
+        try:
+            files = self._unpack(record.read_bytes())
+
+        except FileNotFoundError:
+            return None
+
+        if files is None or not all(self._blob(f.digest).exists() for f in files):
+            return None
+
+        # Отметка использования для LRU
+        try:
+            os.utime(record)
+
+        except OSError:
+            pass
+
+        return files
+
+    def put(self, key: bytes, outputs: dict[str, Path]) -> list[ArtifactFile]:
+        # outputs - путь в out_dir -> файл во временной папке
+        files: list[ArtifactFile] = []
+        for rel, src in sorted(outputs.items()):
+            files.append(self.add_blob(src, rel))
+
+        self._write_record(key, self._pack(files))
+        return files
+
+    def _write_record(self, key: bytes, data: bytes) -> None:
+        self._artifacts.mkdir(parents=True, exist_ok=True)
+        record = self._record(key)
+        tmp = self._tmp(record)
+        tmp.write_bytes(data)
+        os.replace(tmp, record)
+
+    def add_blob(self, src: Path, rel: str) -> ArtifactFile:
+        digest = file_digest(src)
+        size = src.stat().st_size
+        blob = self._blob(digest)
+
+        if blob.exists():
+            return ArtifactFile(rel, digest, size)
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp(blob)
+        tmp.unlink(missing_ok=True)
+        try:
+            # Временная папка лежит рядом со стором, обычно хватает ссылки
+            os.link(src, tmp)
+
+        except OSError:
+            shutil.copyfile(src, tmp)
+
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, blob)
+        self._grow(size)
+        return ArtifactFile(rel, digest, size)
+
+    # region bundles
+    def export(self, key: bytes) -> bytes | None:
+        try:
+            record = self._record(key).read_bytes()
+
+        except FileNotFoundError:
+            return None
+
+        files = self._unpack(record)
+        if files is None:
+            return None
+
+        chunks = [self._BUNDLE.pack(self.BUNDLE_MAGIC, self.VERSION, len(record))]
+        chunks.append(record)
+        try:
+            for f in files:
+                chunks.append(self._blob(f.digest).read_bytes())
+
+        except FileNotFoundError:
+            return None
+
+        return b"".join(chunks)
+
+    def import_bundle(self, key: bytes, data: bytes) -> list[ArtifactFile] | None:
+        # Содержимое чужой машины проверяется по хэшам, битый пакет - промах
+        if len(data) < self._BUNDLE.size:
+            return None
+
+        magic, version, record_len = self._BUNDLE.unpack_from(data, 0)
+        if magic != self.BUNDLE_MAGIC or version != self.VERSION:
+            return None
+
+        pos = self._BUNDLE.size
+        record = data[pos : pos + record_len]
+        files = self._unpack(record)
+        if files is None:
+            return None
+
+        pos += record_len
+        blobs: list[tuple[ArtifactFile, bytes]] = []
+        for f in files:
+            blob = data[pos : pos + f.size]
+            pos += f.size
+            if hashlib.blake2b(blob, digest_size=16).digest() != f.digest:
+                return None
+
+            blobs.append((f, blob))
+
+        for f, blob in blobs:
+            path = self._blob(f.digest)
+            if path.exists():
+                continue
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._tmp(path)
+            tmp.write_bytes(blob)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, path)
+            self._grow(f.size)
+
+        self._write_record(key, record)
+        return files
+
+    # endregion
+
+    def materialize(self, files: Iterable[ArtifactFile], out_dir: Path) -> int:
+        # Возвращает сколько файлов реально записано.
+        # Пути уже проверены в _unpack, здесь - на случай ArtifactFile из кода
+        files = list(files)
+        for f in files:
+            if not _safe_path(f.path):
+                raise ValueError(f"Путь артефакта выходит за out_dir: {f.path}")
+
+        return sum(
+            place_file(self._blob(f.digest), out_dir / f.path, f.digest)
+            for f in files
+        )
+
+    def evict(self) -> int:
+        # Дёшево на каждой сборке: счётчик + добавленное за сборку.
+        # Обход стора только когда счётчик вылез за max_bytes или его нет
+        with self._lock:
+            added, self._added = self._added, 0
+
+        total = self._load_size()
+        if total is not None and total + added <= self.max_bytes:
+            if added:
+                self._save_size(total + added)
+
+            return 0
+
+        return self.prune()
+
+    def prune(self) -> int:
+        # Выкидываем давно не использованные артефакты, пока блобы,
+        # на которые они ссылаются, не влезут в max_bytes. Потом удаляем сироты
+        # и записываем настоящий размер в счётчик
+        with self._lock:
+            self._added = 0
+
+        if not self._artifacts.is_dir():
+            self._save_size(0)
+            return 0
+
+        records: list[tuple[int, Path, list[ArtifactFile]]] = []
+        for entry in os.scandir(self._artifacts):
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+
+            path = Path(entry.path)
+            files = self._unpack(path.read_bytes())
+            if files is None:
+                path.unlink(missing_ok=True)
+                continue
+
+            records.append((entry.stat().st_mtime_ns, path, files))
+
+        records.sort(key=lambda r: r[0], reverse=True)
+
+        live: dict[bytes, int] = {}
+        total = 0
+        full = False
+        for _, path, files in records:
+            extra = {f.digest: f.size for f in files if f.digest not in live}
+            size = sum(extra.values())
+
+            # Всё что старше первого не влезшего тоже уходит
+            if full or total + size > self.max_bytes:
+                full = True
+                path.unlink(missing_ok=True)
+                continue
+
+            live.update(extra)
+            total += size
+
+        freed = 0
+        if self._objects.is_dir():
+            for bucket in os.scandir(self._objects):
+                if not bucket.is_dir():
+                    continue
+
+                for blob in os.scandir(bucket.path):
+                    try:
+                        digest = bytes.fromhex(blob.name)
+
+                    except ValueError:
+                        digest = b""
+
+                    if digest in live:
+                        continue
+
+                    freed += blob.stat().st_size
+                    os.unlink(blob.path)
+
+        self._save_size(total)
+        return freed
@@ -0,0 +1,142 @@
+import os
+import shutil
+import stat
+import threading
+from pathlib import Path
+
+from .manifest import file_digest
+
+try:
+    import fcntl
+
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl FICLONE из linux/fs.h: копия файла через общие экстенты (btrfs, xfs).
+# После первого отказа ФС больше не пробуем
+_FICLONE = 0x40049409
+_reflink = fcntl is not None
+
+_TMP_SUFFIX = ".plg-tmp"
+
+
+def clone_file(src: Path, dst: Path) -> None:
+    # reflink -> копия. hardlink нельзя: блоб стора стал бы тем же файлом,
+    # что и вывод, и любая запись в out_dir на месте испортила бы кэш
+    global _reflink
+    if _reflink:
+        try:
+            with src.open("rb") as s, dst.open("wb") as d:
+                fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())  # pyright: ignore[reportOptionalMemberAccess]
+
+            return
+
+        except OSError:
+            _reflink = False
+            dst.unlink(missing_ok=True)
+
+    shutil.copyfile(src, dst)
+
+
+def _writable(path: Path) -> None:
+    # Старые сборки клали в out_dir hardlink'и на read-only блобы.
+    # На windows такой файл нельзя ни заменить, ни удалить
+    try:
+        mode = os.stat(path).st_mode
+
+    except OSError:
+        return
+
+    if not mode & stat.S_IWRITE:
+        os.chmod(path, mode | stat.S_IWRITE)
+
+
+def _same(src: Path, dst: Path, digest: bytes | None) -> bool:
+    try:
+        # Тот же inode - hardlink на блоб от старой сборки, его надо развязать
+        if os.path.samefile(src, dst):
+            return False
+
+        if src.stat().st_size != dst.stat().st_size:
+            return False
+
+    except OSError:
+        return False
+
+    return file_digest(dst) == (digest if digest is not None else file_digest(src))
+
+
+def place_file(src: Path, dst: Path, digest: bytes | None = None) -> bool:
+    # Кладёт src в dst, если байты отличаются. True - файл был записан.
+    # Через временное имя: в out_dir не бывает полузаписанных файлов
+    if _same(src, dst, digest):
+        return False
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    # Общий вывод (runtime модуля) могут класть несколько потоков записи сразу
+    tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}{_TMP_SUFFIX}")
+    tmp.unlink(missing_ok=True)
+    clone_file(src, tmp)
+    _writable(dst)
+    os.replace(tmp, dst)
+    return True
+
+
+def prune_dir(out_dir: Path, keep: set[str] | dict[str, object]) -> int:
+    # Удаляет из out_dir всё, чего нет в keep, и опустевшие папки.
+    # Возвращает число удалённых файлов
+    if not out_dir.is_dir():
+        return 0
+
+    removed = 0
+    for root, dirs, files in os.walk(out_dir, topdown=False):
+        root_path = Path(root)
+
+        for name in files:
+            path = root_path / name
+            if path.relative_to(out_dir).as_posix() in keep:
+                continue
+
+            _writable(path)
+            path.unlink(missing_ok=True)
+            removed += 1
+
+        for name in dirs:
+            try:
+                (root_path / name).rmdir()
+
+            except OSError:
+                # Не пустая
+                pass
+
+    return removed
+
+
+def remove_outputs(out_dir: Path, paths: set[str]) -> int:
+    # Удаляет перечисленные файлы из out_dir и опустевшие после них папки.
+    # Возвращает число удалённых файлов
+    removed = 0
+    parents: set[Path] = set()
+    for rel in paths:
+        path = out_dir / rel
+        try:
+            _writable(path)
+            path.unlink()
+
+        except FileNotFoundError:
+            continue
+
+        removed += 1
+        parents.update(p for p in path.parents if p != out_dir and out_dir in p.parents)
+
+    # Глубокие папки первыми, чтобы родитель успел опустеть
+    for parent in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+        try:
+            parent.rmdir()
+
+        except OSError:
+            # Не пустая
+            pass
+
+    return removed
+
@@ -0,0 +1,246 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from .ignore import IgnoreRules
+
+logger = logging.getLogger("plg-sdk")
+
+
+def _ignored(rules: IgnoreRules | None, root: Path, path: Path, is_dir: bool) -> bool:
+    # Родители не проверяются: в исключённые папки наблюдатели не заходят
+    if not rules or path == root:
+        return False
+
+    return rules.ignored(path.relative_to(root).as_posix(), is_dir)
+
+
+class PollingWatcher:
+    def __init__(
+        self,
+        root: Path,
+        interval: float = 0.5,
+        ignore: IgnoreRules | None = None,
+    ):
+        self.root = root
+        self.interval = interval
+        self.ignore = ignore
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        out = {}
+        for dirpath, dirs, files in os.walk(self.root):
+            base = Path(dirpath)
+            dirs[:] = [
+                d for d in dirs if not _ignored(self.ignore, self.root, base / d, True)
+            ]
+            for name in files:
+                if _ignored(self.ignore, self.root, base / name, False):
+                    continue
+
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+
+                except OSError:
+                    continue
+
+                out[path] = (st.st_size, st.st_mtime_ns)
+
+        return out
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            state = self._snapshot()
+            changed = {
+                Path(p)
+                for p in (state.keys() ^ self._state.keys())
+                | {p for p, v in state.items() if self._state.get(p, v) != v}
+            }
+            self._state = state
+            if changed:
+                return changed
+
+            if deadline is None:
+                time.sleep(self.interval)
+                continue
+
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return set()
+
+            time.sleep(min(self.interval, left))
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    _IN_MODIFY = 0x00000002
+    _IN_ATTRIB = 0x00000004
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_FROM = 0x00000040
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _IN_DELETE = 0x00000200
+    _IN_DELETE_SELF = 0x00000400
+    _IN_Q_OVERFLOW = 0x00004000
+    _IN_IGNORED = 0x00008000
+    _IN_ISDIR = 0x40000000
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+
+    _MASK = (
+        _IN_MODIFY
+        | _IN_ATTRIB
+        | _IN_CLOSE_WRITE
+        | _IN_MOVED_FROM
+        | _IN_MOVED_TO
+        | _IN_CREATE
+        | _IN_DELETE
+        | _IN_DELETE_SELF
+    )
+
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path, ignore: IgnoreRules | None = None):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.root = root
+        self.ignore = ignore
+
+        self._fd = self._libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self._wd: dict[int, Path] = {}
+        try:
+            self._add_tree(root)
+
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(
+            self._fd,
+            os.fsencode(path),
+            self._MASK,
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+
+        self._wd[wd] = path
+
+    def _add_tree(self, root: Path) -> None:
+        # На исключённые папки watch не вешаем: лимит max_user_watches общий
+        self._add_watch(root)
+        for dirpath, dirs, _ in os.walk(root):
+            base = Path(dirpath)
+            dirs[:] = [
+                d for d in dirs if not _ignored(self.ignore, self.root, base / d, True)
+            ]
+            for name in dirs:
+                try:
+                    self._add_watch(base / name)
+
+                except FileNotFoundError:
+                    # Подпапка удалена посреди обхода
+                    continue
+
+    def _watch_new_dir(self, path: Path, changed: set[Path]) -> None:
+        # Временные папки редакторов и git checkout успевают исчезнуть
+        # раньше, чем мы повесим watch. Такую папку просто пропускаем
+        try:
+            self._add_tree(path)
+            # Файлы могли появиться до того как мы повесили watch
+            for dirpath, dirs, files in os.walk(path):
+                sub = Path(dirpath)
+                dirs[:] = [
+                    d for d in dirs if not _ignored(self.ignore, self.root, sub / d, True)
+                ]
+                changed.update(
+                    sub / f
+                    for f in files
+                    if not _ignored(self.ignore, self.root, sub / f, False)
+                )
+
+        except OSError as err:
+            logger.debug(f"Папка пропала до установки watch: {path}\n{err}")
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+
+            except BlockingIOError:
+                break
+
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, name_len = self._EVENT.unpack_from(data, pos)
+                pos += self._EVENT.size
+                name = data[pos : pos + name_len].rstrip(b"\0")
+                pos += name_len
+
+                if mask & self._IN_Q_OVERFLOW:
+                    # Очередь ядра переполнилась - считаем изменённым всё дерево
+                    changed.add(self.root)
+                    continue
+
+                if mask & self._IN_IGNORED:
+                    self._wd.pop(wd, None)
+                    continue
+
+                base = self._wd.get(wd)
+                if base is None:
+                    continue
+
+                path = base / os.fsdecode(name) if name else base
+                is_dir = bool(mask & self._IN_ISDIR)
+                if _ignored(self.ignore, self.root, path, is_dir):
+                    continue
+
+                changed.add(path)
+
+                created = mask & (self._IN_CREATE | self._IN_MOVED_TO)
+                if is_dir and created:
+                    self._watch_new_dir(path, changed)
+
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(
+    root: Path,
+    poll: bool = False,
+    ignore: IgnoreRules | None = None,
+) -> InotifyWatcher | PollingWatcher:
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, ignore)
+
+        except (OSError, AttributeError) as err:
+            # Нет inotify в libc, кончился лимит max_user_watches и т.д.
+            logger.debug(f"inotify недоступен, переходим на опрос\n{err}")
+
+    return PollingWatcher(root, ignore=ignore)
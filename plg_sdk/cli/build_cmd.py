@@ -0,0 +1,27 @@
+import concurrent.futures
+import logging
+import time
+
+from ..build import Builder
+
+logger = logging.getLogger("plg-sdk")
+
+
+def build_cmd(
+    full: bool = False,
+    jobs: int | None = None,
+    executor: concurrent.futures.Executor | None = None,
+    modules: set[str] | frozenset[str] | None = None,
+    changed: set[str] | None = None,
+) -> bool:
+    start = time.perf_counter()
+    ok = Builder.build(full, jobs, executor, modules, changed)
+    elapsed = time.perf_counter() - start
+
+    if ok:
+        logger.info(f"Сборка завершена за {elapsed:.2f}с")
+
+    else:
+        logger.error(f"Сборка завершилась с ошибками за {elapsed:.2f}с")
+
+    return ok
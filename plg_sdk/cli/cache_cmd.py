@@ -0,0 +1,25 @@
+import logging
+import time
+
+from ..build import Builder
+from ..core import Config
+
+logger = logging.getLogger("plg-sdk")
+
+
+def cache_prune_cmd() -> bool:
+    # Полный обход стора: LRU до BUILD.cache_size_mb, сироты, пересчёт размера
+    store = Builder.store(Config.snapshot())
+    if store is None:
+        logger.info("Кэш артефактов выключен (BUILD.cache_size_mb = 0)")
+        return True
+
+    start = time.perf_counter()
+    freed = store.prune()
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Кэш артефактов проверен за {elapsed:.2f}с\n"
+        f"Освобождено: {freed / (1 << 20):.1f} МБ\n"
+        f"Занято     : {(store.size() or 0) / (1 << 20):.1f} МБ"
+    )
+    return True
@@ -42,6 +42,12 @@ def _cast_default(type_name: str, value: Any) -> Any:
 
         raise TypeError(f"Invalid bool default: {value}")
 
+    if type_name == "int":
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError(f"Invalid int default: {value}")
+
+        return value
+
     if type_name == "path":
         if isinstance(value, str):
             return Path(value)
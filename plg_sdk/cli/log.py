@@ -0,0 +1,45 @@
+import logging
+
+from colorama import Fore, Style, init
+
+
+# region Logger and color
+class AlignedColorFormatter(logging.Formatter):
+    COLORS = {
+        "DEBUG": Fore.CYAN,
+        "INFO": Fore.GREEN,
+        "WARNING": Fore.YELLOW,
+        "ERROR": Fore.RED,
+        "CRITICAL": Fore.MAGENTA + Style.BRIGHT,
+    }
+
+    def __init__(self, fmt=None, datefmt=None, level_width=8):
+        super().__init__(fmt, datefmt)
+        self.level_width = level_width
+
+    def format(self, record):
+        if not isinstance(record.msg, str):
+            record.msg = str(record.msg)
+
+        levelname = record.levelname
+        color = self.COLORS.get(levelname, "")
+        padded_level = f"{color}{levelname:<{self.level_width}}{Style.RESET_ALL}"
+
+        if "\n" in record.msg:
+            lines = record.msg.splitlines()
+            record.msg = ("\n" + " " * (self.level_width + 3)).join(lines)
+
+        record.levelname = padded_level
+        return super().format(record)
+
+
+def setup_logger(logger: logging.Logger) -> None:
+    init(autoreset=True)
+
+    ch = logging.StreamHandler()
+    formatter = AlignedColorFormatter("[%(levelname)s] %(message)s")
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+
+# endregion
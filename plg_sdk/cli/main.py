@@ -1,57 +1,20 @@
 import argparse
 import logging
 import sys
-from importlib.metadata import PackageNotFoundError, version
-
-from colorama import Fore, Style, init
-
-from ..core import Config, ConfigValidator
-from .init_cmd import init_cmd
-
-init(autoreset=True)
-
-
-# region Logger and color
-class AlignedColorFormatter(logging.Formatter):
-    COLORS = {
-        "DEBUG": Fore.CYAN,
-        "INFO": Fore.GREEN,
-        "WARNING": Fore.YELLOW,
-        "ERROR": Fore.RED,
-        "CRITICAL": Fore.MAGENTA + Style.BRIGHT,
-    }
-
-    def __init__(self, fmt=None, datefmt=None, level_width=8):
-        super().__init__(fmt, datefmt)
-        self.level_width = level_width
-
-    def format(self, record):
-        if not isinstance(record.msg, str):
-            record.msg = str(record.msg)
-
-        levelname = record.levelname
-        color = self.COLORS.get(levelname, "")
-        padded_level = f"{color}{levelname:<{self.level_width}}{Style.RESET_ALL}"
-
-        if "\n" in record.msg:
-            lines = record.msg.splitlines()
-            record.msg = ("\n" + " " * (self.level_width + 3)).join(lines)
-
-        record.levelname = padded_level
-        return super().format(record)
 
+# Всё тяжёлое (colorama, конфиг, сборка, модули) импортируется только
+# внутри веток команд. version и --help не должны трогать ни схему, ни toml
 
 logger = logging.getLogger("plg-sdk")
 logger.setLevel(logging.DEBUG)
 
-ch = logging.StreamHandler()
-formatter = AlignedColorFormatter("[%(levelname)s] %(message)s")
-ch.setFormatter(formatter)
-logger.addHandler(ch)
-# endregion
+# Команды, которым нужен разобранный конфиг
+_CONFIG_CMDS = {"config-validate", "build", "watch", "pack", "cache-prune"}
 
 
 def _verison() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
     try:
         return version("plg-sdk")
 
@@ -72,6 +35,11 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Включить режим отладки",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Записать трейс выполнения в .plg-sdk/traces (chrome://tracing, Perfetto)",
+    )
     # endregion
 
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -97,11 +65,95 @@ def _build_parser() -> argparse.ArgumentParser:
     sub.add_parser("config-validate", help="Вызывает валидацию конфига")
     # endregion
 
+    # region build cmd
+    build_cmd = sub.add_parser(
+        "build",
+        help="Инкрементально собирает файлы из PATHS.source_dir",
+    )
+    build_cmd.add_argument(
+        "-f",
+        "--full",
+        action="store_true",
+        help="Игнорирует манифест и пересобирает все файлы",
+    )
+    build_cmd.add_argument(
+        "-U",
+        "--update",
+        action="store_true",
+        help="Проверить версии модулей в индексе и обновить устаревшие",
+    )
+    build_cmd.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Количество процессов сборки. По умолчанию число ядер, 1 при BUILD.parallel = false",
+    )
+    # endregion
+
+    # region watch cmd
+    watch_cmd = sub.add_parser(
+        "watch",
+        help="Следит за PATHS.source_dir и пересобирает изменённые файлы",
+    )
+    watch_cmd.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Количество процессов сборки. По умолчанию число ядер, 1 при BUILD.parallel = false",
+    )
+    watch_cmd.add_argument(
+        "-U",
+        "--update",
+        action="store_true",
+        help="Проверить версии модулей в индексе и обновить устаревшие",
+    )
+    watch_cmd.add_argument(
+        "--poll",
+        action="store_true",
+        help="Опрашивать файлы вместо inotify",
+    )
+    # endregion
+
+    # region pack cmd
+    pack_cmd = sub.add_parser(
+        "pack",
+        help="Упаковывает PATHS.out_dir и PACK.assets в .gma аддон",
+    )
+    pack_cmd.add_argument(
+        "-f",
+        "--full",
+        action="store_true",
+        help="Игнорирует старый архив и записывает все файлы заново",
+    )
+    # endregion
+
+    # region cache-prune cmd
+    sub.add_parser(
+        "cache-prune",
+        help="Полностью проверяет кэш артефактов и вытесняет лишнее сверх BUILD.cache_size_mb",
+    )
+    # endregion
+
     return parser
 
 
 def _validate_config(final_msg: bool = False) -> None:
-    ConfigValidator.validate()
+    from ..core import ConfigValidator
+    from ..core.trace import Tracer
+
+    with Tracer.span("config.validate"):
+        ConfigValidator.validate()
+    if logger.isEnabledFor(logging.DEBUG):
+        timings = sorted(ConfigValidator.timings().items(), key=lambda t: -t[1])
+        logger.debug(
+            "Правила конфига:\n"
+            + "\n".join(f"{t * 1000:7.3f}мс  {name}" for name, t in timings[:5])
+        )
+
     for war_log in ConfigValidator.warnings():
         logger.warning(war_log)
 
@@ -120,36 +172,120 @@ def _validate_config(final_msg: bool = False) -> None:
             logger.info("Всё в порядке\nOwO")
 
 
+def _sync_modules(update: bool = False) -> None:
+    # Без --update только доустанавливаем отсутствующие модули, без сети
+    from ..build.compiler import compiler_modules
+    from ..modules.module_manager import ModuleManager
+
+    ModuleManager.setup_modules(set(compiler_modules()))
+    if not ModuleManager.sync_modules(update):
+        logger.warning("Не удалось обновить модули, продолжаем с установленными")
+
+
+def _write_profile(cmd: str) -> None:
+    from ..core import Config
+    from ..core.trace import Tracer
+
+    path = Tracer.save(Config.sdk_path() / "traces", cmd)
+
+    lines = [f"Трейс записан: {path}", "Открыть: ui.perfetto.dev или chrome://tracing"]
+    for title, cat in (("Этапы", "sdk"), ("Самые долгие юниты", "unit")):
+        spans = Tracer.slowest(10, cat)
+        if not spans:
+            continue
+
+        lines.append("")
+        lines.append(f"{title}:")
+        for name, _, dur in spans:
+            lines.append(f"{dur / 1000:10.1f}мс  {name}")
+
+    logger.info("\n".join(lines))
+
+
 def main() -> None:
     parser = _build_parser()
     args = parser.parse_args()
-    Config.init()
 
-    if args.debug:
-        Config.set("config.plg-sdk.debug", True)
+    if args.cmd == "version":
+        print(_verison())
+        sys.exit(0)
 
-    logger.setLevel(
-        logging.DEBUG if Config.get("config.plg-sdk.debug", False) else logging.INFO
-    )
-    logger.debug(
-        "plg-sdk\n"
-        f"Version     : {_verison()}\n"
-        f"DataPath    : {Config.sdk_path()}\n"
-        f"ConfigFile  : {Config.config_file()}\n"
-        f"ResourcePath: {Config.resource_path()}"
-    )
+    from .log import setup_logger
+
+    setup_logger(logger)
+    logger.setLevel(logging.DEBUG if args.debug else logging.INFO)
+
+    if args.profile:
+        from ..core.trace import Tracer
+
+        Tracer.enable()
+
+    if args.cmd in _CONFIG_CMDS:
+        from ..core import Config
+        from ..core.trace import Tracer
+
+        with Tracer.span("config.load"):
+            Config.init()
+        if args.debug:
+            Config.override("config.plg-sdk.debug", True)
+
+        logger.setLevel(
+            logging.DEBUG if Config.get("config.plg-sdk.debug", False) else logging.INFO
+        )
+        logger.debug(
+            "plg-sdk\n"
+            f"Version     : {_verison()}\n"
+            f"DataPath    : {Config.sdk_path()}\n"
+            f"ConfigFile  : {Config.config_file()}\n"
+            f"ResourcePath: {Config.resource_path()}"
+        )
 
     try:
         match args.cmd:
             case "init":
-                init_cmd(_verison(), args.no_comments)
+                from .init_cmd import init_cmd
 
-            case "version":
-                print(_verison())
+                init_cmd(_verison(), args.no_comments)
 
             case "config-validate":
                 _validate_config(True)
 
+            case "build":
+                _validate_config()
+                _sync_modules(args.update)
+
+                from .build_cmd import build_cmd
+
+                if not build_cmd(args.full, args.jobs):
+                    logger.error("Exit code 2")
+                    sys.exit(2)
+
+            case "watch":
+                _validate_config()
+                _sync_modules(args.update)
+
+                from .watch_cmd import watch_cmd
+
+                watch_cmd(args.jobs, args.poll)
+
+            case "pack":
+                _validate_config()
+
+                from .pack_cmd import pack_cmd
+
+                if not pack_cmd(args.full):
+                    logger.error("Exit code 2")
+                    sys.exit(2)
+
+            case "cache-prune":
+                _validate_config()
+
+                from .cache_cmd import cache_prune_cmd
+
+                if not cache_prune_cmd():
+                    logger.error("Exit code 2")
+                    sys.exit(2)
+
             case _:
                 pass
 
@@ -163,3 +299,11 @@ def main() -> None:
         logger.error(str(err), exc_info=True)
         logger.error("Exit code 3")
         sys.exit(3)
+
+    finally:
+        if args.profile:
+            _write_profile(args.cmd)
+
+
+if __name__ == "__main__":
+    main()
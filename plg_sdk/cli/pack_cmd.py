@@ -0,0 +1,33 @@
+import logging
+import time
+
+from ..pack import Packer, PackError
+
+logger = logging.getLogger("plg-sdk")
+
+_MODES = {
+    "actual": "архив актуален",
+    "patch": "изменённые файлы переписаны на месте",
+    "rebuild": "архив пересобран из старого",
+    "full": "архив записан целиком",
+}
+
+
+def pack_cmd(full: bool = False) -> bool:
+    start = time.perf_counter()
+    try:
+        stats = Packer.pack(full)
+
+    except PackError as err:
+        logger.error(f"Упаковка не удалась\n{err}")
+        return False
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Упаковка завершена за {elapsed:.2f}с: {_MODES[stats.mode]}\n"
+        f"Файлов           : {stats.files}\n"
+        f"Прочитано заново : {stats.streamed}\n"
+        f"Взято из архива  : {stats.copied}\n"
+        f"Размер           : {stats.size / (1 << 20):.1f} МБ"
+    )
+    return True
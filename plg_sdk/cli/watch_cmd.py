@@ -0,0 +1,137 @@
+import logging
+import tomllib
+from pathlib import Path
+
+from ..build import Builder, IgnoreRules, create_watcher
+from ..build.ignore import IGNORE_FILE
+from ..build.scheduler import resolve_jobs
+from ..core import Config, ConfigChange, ConfigValidator
+from .build_cmd import build_cmd
+
+logger = logging.getLogger("plg-sdk")
+
+
+def _reload_config() -> ConfigChange | None:
+    # Любая ошибка в новом конфиге - лог и работа на прежнем
+    try:
+        change = Config.reload()
+
+    except tomllib.TOMLDecodeError as err:
+        logger.error(f"Не удалось разобрать конфиг\n{err}")
+        return None
+
+    except (ValueError, TypeError) as err:
+        logger.error(f"Некорректное значение в конфиге, оставлен прежний\n{err}")
+        return None
+
+    if change is None:
+        return None
+
+    logger.debug("Изменены ключи:\n" + "\n".join(sorted(change.keys)))
+    ConfigValidator.validate(change.keys)
+
+    for war_log in ConfigValidator.warnings():
+        logger.warning(war_log)
+
+    for err_log in ConfigValidator.errors():
+        logger.error(err_log)
+
+    if ConfigValidator.errors():
+        logger.error("Конфиг не прошёл проверку, оставлен прежний")
+        Config.revert()
+        ConfigValidator.validate(change.keys)
+        return None
+
+    return change
+
+
+def _hints(changed: set[Path], source_dir: Path) -> set[str] | None:
+    # Пути событий относительно source_dir для скана.
+    # None - событие по всему дереву (переполнение очереди inotify)
+    hints = set()
+    for path in changed:
+        if path == source_dir:
+            return None
+
+        try:
+            hints.add(path.relative_to(source_dir).as_posix())
+
+        except ValueError:
+            return None
+
+    return hints
+
+
+def watch_cmd(
+    jobs: int | None = None,
+    poll: bool = False,
+    debounce: float = 0.05,
+) -> None:
+    # Конфиг уже разобран в main, пул процессов живёт всю сессию.
+    # Пересобираем только по событиям файловой системы
+    jobs = resolve_jobs(jobs)
+    executor = Builder.pool(jobs, Config.snapshot()) if jobs > 1 else None
+
+    source_dir = Config.snapshot().source_dir
+    source_dir.mkdir(parents=True, exist_ok=True)
+    rules = IgnoreRules.load(source_dir)
+    watcher = create_watcher(source_dir, poll, rules)
+
+    logger.info(f"Слежу за {source_dir} ({type(watcher).__name__})")
+
+    try:
+        build_cmd(False, jobs, executor)
+
+        while True:
+            changed = watcher.wait(0.5)
+
+            change = _reload_config()
+            if change is not None:
+                if change.source_moved:
+                    watcher.close()
+                    source_dir = change.after.source_dir
+                    source_dir.mkdir(parents=True, exist_ok=True)
+                    rules = IgnoreRules.load(source_dir)
+                    watcher = create_watcher(source_dir, poll, rules)
+
+                # Воркеры держат старый снимок конфига. Сравниваем снимки целиком:
+                # isolated не входит в digest, но читается в воркерах
+                if executor is not None and change.before != change.after:
+                    executor.shutdown(cancel_futures=True)
+                    executor = Builder.pool(jobs, change.after)
+
+                if change.rebuild:
+                    logger.info(
+                        "Конфиг изменён, пересобираю: "
+                        + ", ".join(sorted(change.modules))
+                    )
+                    build_cmd(change.source_moved, jobs, executor, change.modules)
+                    continue
+
+                logger.info("Конфиг изменён, сборку не затрагивает")
+
+            if not changed:
+                continue
+
+            # Редакторы пишут файл в несколько приёмов, собираем всю пачку событий
+            while more := watcher.wait(debounce):
+                changed |= more
+
+            logger.debug(
+                "Изменения:\n"
+                + "\n".join(str(p) for p in sorted(changed)[:20])
+            )
+            hints = _hints(changed, source_dir)
+            if hints is not None and IGNORE_FILE in hints:
+                # Новые правила: наблюдатель заново расставляет watch, скан полный
+                watcher.close()
+                rules = IgnoreRules.load(source_dir)
+                watcher = create_watcher(source_dir, poll, rules)
+                hints = None
+
+            build_cmd(False, jobs, executor, changed=hints)
+
+    finally:
+        watcher.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
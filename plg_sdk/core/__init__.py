@@ -1 +1,4 @@
 from .config import Config, ConfigValidator
+from .rules import Rule, RuleRegistry, RuleResult
+from .snapshot import ConfigChange, ConfigSnapshot
+from .trace import Tracer
@@ -1,133 +1,204 @@
-import json
-import re
+import hashlib
+import sys
 import tomllib
+from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
-from .pep440 import canonicalize
+from .rules import RuleRegistry, RuleResult
+from .schema import CompiledSchema, ConfigSchema, cast_value
+from .snapshot import ConfigChange, ConfigSnapshot
 
 
 class ConfigValidator:
-    _errors: list[str] = []
-    _warnings: list[str] = []
+    # Правила лежат в RuleRegistry и объявляют ключи, которые читают.
+    # При перечитывании конфига перепроверяются только правила,
+    # чьи ключи изменились, результаты остальных остаются как были
+    _results: dict[str, RuleResult] = {}
 
     @classmethod
     def validate(
         cls,
+        changed: Iterable[str] | None = None,
+        workers: int = 1,
     ) -> None:
-        cls._errors = []
-        cls._warnings = []
-
-        # MODULES.allowed
-        allowed = list(Config.get("config.modules.allowed", []))  # pyright: ignore[reportArgumentType]
-        all_modules = list(Config.get("all_modules", []))  # pyright: ignore[reportArgumentType]
-
-        if "all" not in allowed:
-            for m in allowed:
-                if m not in all_modules:
-                    cls._errors.append(f'MODULES.allowed: модуль "{m}" не разрешён')
-
-        # Обязательные поля
-        required_fields = [
-            "config.project.name",
-            "config.project.author",
-            "config.project.version",
-        ]
-        for key in required_fields:
-            if Config.get(key) is None:
-                _, err_key, cfg_key = key.split(".")
-                cls._errors.append(f"{err_key.upper()}.{cfg_key} не задано")
-
-        # Проверка версии
-        ver = Config.get("config.project.version")
-        if ver is not None:
-            ver_c = canonicalize(str(ver))
-            if ver_c is None:
-                cls._errors.append("PROJECT.version не соответствует PEP440")
-
-            elif ver_c != ver:
-                cls._warnings.append(
-                    "PROJECT.version не является канонической.\n"
-                    f"Используется нормализованная версия: {ver_c}"
-                )
-
-        # Проверка namespace
-        ns = Config.get("config.project.namespace")
-
-        if ns == "%!DEFAULT!%":
-            auto_ns = (
-                str(Config.get("config.project.name"))
-                + "_"
-                + str(Config.get("config.project.author"))
-            )
-
-            if not re.fullmatch(r"[A-Za-z0-9_]+", auto_ns):
-                cls._errors.append(
-                    "PROJECT.namespace установлен в режим %!DEFAULT!%\n"
-                    "Ошибка в автоматически сформированном значении namespace\n\n"
-                    "Шаблон     : <PROJECT.name>_<PROJECT.author>\n"
-                    f"Подставлено: {auto_ns}\n"
-                    "Ожидается  : только символы [A-Za-z0-9_]"
-                )
-
-        elif isinstance(ns, str):
-            if not re.fullmatch(r"[A-Za-z0-9_]+", ns):
-                cls._errors.append(
-                    "PROJECT.namespace содержит недопустимые символы.\n"
-                    "Ожидается: только символы [A-Za-z0-9_]"
-                )
+        RuleRegistry.load_plugins(Config.snapshot().modules)
+        rules = RuleRegistry.rules()
+
+        if changed is None:
+            cls._results = {}
+            names = list(rules)
+
+        else:
+            affected = set(RuleRegistry.affected(changed))
+            names = [n for n in rules if n in affected or n not in cls._results]
+
+        cls._results.update(RuleRegistry.run(Config.get, names, workers))
+
+        # Снятые с регистрации правила больше не отчитываются
+        for name in cls._results.keys() - rules.keys():
+            del cls._results[name]
+
+    @classmethod
+    def timings(cls) -> dict[str, float]:
+        return {name: result.elapsed for name, result in cls._results.items()}
 
     @classmethod
     def warnings(cls) -> list[str]:
-        return cls._warnings
+        return [w for result in cls._results.values() for w in result.warnings]
 
     @classmethod
     def errors(cls) -> list[str]:
-        return cls._errors
+        return [e for result in cls._results.values() for e in result.errors]
+
+
+_MISSING = object()
 
 
 class Config:
-    _data: dict[str, Any] = {}
+    # Плоское хранилище: "config.plg-sdk.debug" -> значение.
+    # Ключи канонические (нижний регистр) и интернированные,
+    # вложенный вид собирается только по запросу
+    _flat: dict[str, Any] = {}
+    _canon: dict[str, str] = {}
+
+    # Состояние файла конфига на момент последней загрузки
+    _file_stat: tuple[int, int] | None = None
+    _file_digest: bytes = b""
+
+    # Значения из командной строки (-d и т.п.) поверх файла, переживают reload
+    _overrides: dict[str, Any] = {}
+    # Состояние до последнего reload, для revert
+    _previous: tuple[dict[str, Any], bytes] | None = None
 
     @classmethod
     def init(cls) -> None:
-        cls.load_default_toml_config()
-        cls.load_user_toml()
+        cls._overrides = {}
+        cls._previous = None
+        cls._file_stat = cls._config_stat()
+        cls._load(cls._read_config_bytes())
+
+    @classmethod
+    def _load(cls, data: bytes | None) -> None:
+        schema = cls.compiled_schema()
+        values = schema.defaults()
+        if data is not None:
+            values.update(cls._parse_user_toml(schema, data))
+
+        values["all_modules"] = list(schema.all_modules)
+        values.update(cls._overrides)
+
+        cls._flat = {cls._key(key): value for key, value in values.items()}
+        cls._file_digest = hashlib.blake2b(data or b"", digest_size=16).digest()
+
+    @classmethod
+    def reload(cls) -> ConfigChange | None:
+        # stat дешёвый, файл читается только если он сдвинулся.
+        # touch без изменения содержимого отсекается по хэшу.
+        # Битый toml или значение не того типа - ValueError/TypeError,
+        # при этом остаётся прежний конфиг
+        stat = cls._config_stat()
+        if stat == cls._file_stat:
+            return None
+
+        cls._file_stat = stat
+        data = cls._read_config_bytes()
+        if hashlib.blake2b(data or b"", digest_size=16).digest() == cls._file_digest:
+            return None
+
+        before_flat, before_digest = cls._flat, cls._file_digest
+        before = cls.snapshot()
+        try:
+            cls._load(data)
+            after = cls.snapshot()
+
+        except (ValueError, TypeError):
+            cls._flat, cls._file_digest = before_flat, before_digest
+            raise
+
+        cls._previous = before_flat, before_digest
+
+        keys = frozenset(
+            key
+            for key in before_flat.keys() | cls._flat.keys()
+            if before_flat.get(key, _MISSING) != cls._flat.get(key, _MISSING)
+        )
+        if not keys:
+            return None
+
+        return ConfigChange.between(keys, before, after)
+
+    @classmethod
+    def revert(cls) -> None:
+        # Откат последнего reload, например если новый конфиг не прошёл правила.
+        # Файл перечитается только после следующей правки
+        if cls._previous is not None:
+            cls._flat, cls._file_digest = cls._previous
+            cls._previous = None
+
+    @classmethod
+    def override(cls, key: str, value: Any) -> None:
+        cls._overrides[cls._key(key)] = value
+        cls.set(key, value)
 
     # region get/set
     @classmethod
-    def _resolve_path(cls, key: str):
-        if isinstance(key, str):
-            return key.split(".")
+    def _key(cls, key: str) -> str:
+        canon = cls._canon.get(key)
+        if canon is None:
+            canon = sys.intern(key.lower())
+            cls._canon[key] = canon
 
-        return [key]
+        return canon
 
     @classmethod
-    def get(cls, key: str, default=None):
-        key = key.lower()
-        parts = cls._resolve_path(key)
-        current = cls._data
+    def _subtree(cls, prefix: str) -> dict[str, Any] | None:
+        prefix += "."
+        out: dict[str, Any] = {}
 
-        for part in parts:
-            if not isinstance(current, dict) or part not in current:
-                return default
-            current = current[part]
+        for key, value in cls._flat.items():
+            if not key.startswith(prefix):
+                continue
+
+            *parents, last = key[len(prefix) :].split(".")
+            current = out
+            for part in parents:
+                current = current.setdefault(part, {})
+
+            current[last] = value
+
+        return out or None
 
-        return current
+    @classmethod
+    def get(cls, key: str, default=None):
+        value = cls._flat.get(cls._key(key), _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Не лист - отдаём вложенный вид, как раньше
+        subtree = cls._subtree(cls._key(key))
+        return default if subtree is None else subtree
 
     @classmethod
     def set(cls, key: str, value):
-        key = key.lower()
-        parts = cls._resolve_path(key)
-        current = cls._data
+        cls._flat[cls._key(key)] = value
 
-        for part in parts[:-1]:
-            if part not in current or not isinstance(current[part], dict):
-                current[part] = {}
+    @classmethod
+    def as_dict(cls) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for key, value in cls._flat.items():
+            *parents, last = key.split(".")
+            current = out
+            for part in parents:
+                current = current.setdefault(part, {})
 
-            current = current[part]
+            current[last] = value
 
-        current[parts[-1]] = value
+        return out
+
+    @classmethod
+    def snapshot(cls) -> "ConfigSnapshot":
+        return ConfigSnapshot.from_config(cls)
 
     # endregion
 
@@ -148,62 +219,51 @@ class Config:
 
     @classmethod
     def load_config_schema(cls) -> dict[str, Any]:
-        return json.loads(
-            (Path(__file__).parents[1] / "resource/config_schema.json")
-            .resolve()
-            .read_text(encoding="utf-8")
-        )
+        return ConfigSchema.raw()
+
+    @classmethod
+    def compiled_schema(cls) -> CompiledSchema:
+        return ConfigSchema.compiled()
 
     # endregion
 
     # region config file
     @staticmethod
     def _transfom_data(data: Any, data_type: str) -> Any:
-        if data == "%!NOT_SET!%":
-            return None
-
-        match data_type:
-            case "str":
-                return str(data)
+        return cast_value(data, data_type)
 
-            case "bool":
-                return bool(data)
-
-            case "path":
-                return Path(data)
+    @classmethod
+    def _config_stat(cls) -> tuple[int, int] | None:
+        try:
+            st = cls.config_file().stat()
 
-            case "array_str":
-                return list(data)
+        except FileNotFoundError:
+            return None
 
-            case _:
-                raise ValueError(
-                    f"Неизвестное значение {data_type} при трансформации {data}"
-                )
+        return st.st_size, st.st_mtime_ns
 
     @classmethod
-    def load_default_toml_config(cls) -> None:
-        schema = cls.load_config_schema()
-        cls._data["all_modules"] = schema.get("allowed_modules", [])
+    def _read_config_bytes(cls) -> bytes | None:
+        try:
+            return cls.config_file().read_bytes()
 
-        for header_key, header_values in schema.get("config", {}).items():
-            for block_key, values in header_values.items():
-                cls.set(
-                    f"config.{header_key}.{block_key}",
-                    cls._transfom_data(values["default"], values["type"]),
-                )
+        except FileNotFoundError:
+            return None
 
     @classmethod
-    def load_user_toml(cls) -> None:
-        config_path = cls.config_file()
-        if not config_path.exists():
-            return
+    def _read_user_toml(cls, schema: CompiledSchema) -> dict[str, Any]:
+        data = cls._read_config_bytes()
+        if data is None:
+            return {}
 
-        user_data = tomllib.loads(config_path.read_text(encoding="utf-8"))
-        schema = cls.load_config_schema()
+        return cls._parse_user_toml(schema, data)
 
-        schema_config: dict[str, Any] = schema.get("config", {})
+    @staticmethod
+    def _parse_user_toml(schema: CompiledSchema, data: bytes) -> dict[str, Any]:
+        user_data = tomllib.loads(data.decode("utf-8"))
+        out: dict[str, Any] = {}
 
-        for header_key, header_blocks in schema_config.items():
+        for header_key, header_blocks in schema.toml.items():
             user_header = user_data.get(header_key, {})
             if not isinstance(user_header, dict):
                 continue
@@ -212,12 +272,29 @@ class Config:
                 if block_key not in user_header:
                     continue
 
-                raw_user_value = user_header[block_key]
-                expected_type = meta["type"]
+                value = user_header[block_key]
+                try:
+                    out[meta.key] = cast_value(value, meta.type)
+
+                except (ValueError, TypeError) as err:
+                    raise ValueError(
+                        f"{header_key}.{block_key}: ожидался {meta.type}, "
+                        f"получено {value!r}"
+                    ) from err
 
-                cls.set(
-                    f"config.{header_key}.{block_key}",
-                    cls._transfom_data(raw_user_value, expected_type),
-                )
+        return out
+
+    @classmethod
+    def load_default_toml_config(cls) -> None:
+        schema = cls.compiled_schema()
+        cls.set("all_modules", list(schema.all_modules))
+
+        for key, value in schema.defaults().items():
+            cls.set(key, value)
+
+    @classmethod
+    def load_user_toml(cls) -> None:
+        for key, value in cls._read_user_toml(cls.compiled_schema()).items():
+            cls.set(key, value)
 
     # endregion
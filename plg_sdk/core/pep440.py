@@ -1,4 +1,6 @@
+import functools
 import re
+from collections.abc import Iterable
 
 # full version parser (from PEP 440)
 _VERSION_PATTERN = r"""
@@ -35,6 +37,7 @@ _VERSION_PATTERN = r"""
 _VERSION_RE = re.compile(
     r"^\s*" + _VERSION_PATTERN + r"\s*$", re.VERBOSE | re.IGNORECASE
 )
+_LOCAL_SEP_RE = re.compile(r"[-_]")
 
 
 def canonicalize(version: str) -> str | None:
@@ -88,8 +91,359 @@ def canonicalize(version: str) -> str | None:
         n = int(n) if n else 0
         out += f".dev{n}"
 
-    # local version (canonical keeps it lowercase)
+    # local version (canonical keeps it lowercase, "-" and "_" become ".")
     if g["local"]:
-        out += "+" + g["local"].replace("_", ".").lower()
+        out += "+" + _LOCAL_SEP_RE.sub(".", g["local"]).lower()
 
     return out
+
+
+# region Version
+_PRE_ORDER = {"a": 0, "b": 1, "rc": 2}
+_CANON_RE = re.compile(
+    r"^(?:(?P<epoch>[0-9]+)!)?"
+    r"(?P<release>[0-9]+(?:\.[0-9]+)*)"
+    r"(?:(?P<pre_l>a|b|rc)(?P<pre_n>[0-9]+))?"
+    r"(?:\.post(?P<post>[0-9]+))?"
+    r"(?:\.dev(?P<dev>[0-9]+))?"
+    r"(?:\+(?P<local>[a-z0-9]+(?:\.[a-z0-9]+)*))?$"
+)
+
+
+class InvalidVersion(ValueError):
+    pass
+
+
+class Version:
+    # Разобранная версия с заранее посчитанным ключом сортировки.
+    # Создавать через parse_version - он кэширует разбор
+    __slots__ = ("epoch", "release", "pre", "post", "dev", "local", "_key", "_str")
+
+    def __init__(self, version: str):
+        canon = canonicalize(version)
+        m = _CANON_RE.match(canon) if canon is not None else None
+        if m is None:
+            raise InvalidVersion(f"Версия не соответствует PEP440: {version!r}")
+
+        g = m.groupdict()
+        self.epoch = int(g["epoch"] or 0)
+        self.release = tuple(int(x) for x in g["release"].split("."))
+        self.pre = (g["pre_l"], int(g["pre_n"])) if g["pre_l"] else None
+        self.post = int(g["post"]) if g["post"] is not None else None
+        self.dev = int(g["dev"]) if g["dev"] is not None else None
+        self.local = g["local"]
+        self._str = canon
+        self._key = self._make_key()
+
+    def _make_key(self) -> tuple:
+        release = list(self.release)
+        while len(release) > 1 and release[-1] == 0:
+            release.pop()
+
+        # 1.0.dev0 < 1.0a0 < 1.0 < 1.0.post0
+        if self.pre is not None:
+            pre = (1, _PRE_ORDER[self.pre[0]], self.pre[1])
+
+        elif self.dev is not None and self.post is None:
+            pre = (0, 0, 0)
+
+        else:
+            pre = (2, 0, 0)
+
+        post = (0, 0) if self.post is None else (1, self.post)
+        dev = (1, 0) if self.dev is None else (0, self.dev)
+
+        if self.local is None:
+            local: tuple = (0,)
+
+        else:
+            local = (
+                1,
+                tuple(
+                    (1, int(part), "") if part.isdigit() else (0, 0, part)
+                    for part in self.local.split(".")
+                ),
+            )
+
+        return self.epoch, tuple(release), pre, post, dev, local
+
+    # region props
+    @property
+    def key(self) -> tuple:
+        return self._key
+
+    @property
+    def public(self) -> str:
+        return self._str.split("+", 1)[0]
+
+    @property
+    def base_version(self) -> str:
+        out = f"{self.epoch}!" if self.epoch else ""
+        return out + ".".join(str(x) for x in self.release)
+
+    @property
+    def is_prerelease(self) -> bool:
+        return self.pre is not None or self.dev is not None
+
+    @property
+    def is_postrelease(self) -> bool:
+        return self.post is not None
+
+    # endregion
+
+    # region compare
+    def __str__(self) -> str:
+        return self._str
+
+    def __repr__(self) -> str:
+        return f"<Version {self._str!r}>"
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Version):
+            return NotImplemented
+
+        return self._key == other._key
+
+    def __ne__(self, other: object) -> bool:
+        if not isinstance(other, Version):
+            return NotImplemented
+
+        return self._key != other._key
+
+    def __lt__(self, other: "Version") -> bool:
+        return self._key < other._key
+
+    def __le__(self, other: "Version") -> bool:
+        return self._key <= other._key
+
+    def __gt__(self, other: "Version") -> bool:
+        return self._key > other._key
+
+    def __ge__(self, other: "Version") -> bool:
+        return self._key >= other._key
+
+    # endregion
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_version(version: str) -> Version:
+    return Version(version)
+
+
+def version_key(version: str) -> tuple | None:
+    # Ключ сортировки по правилам PEP 440. None - версия невалидна
+    try:
+        return parse_version(version).key
+
+    except InvalidVersion:
+        return None
+
+
+# endregion
+
+
+# region Specifiers
+class InvalidSpecifier(ValueError):
+    pass
+
+
+_SPEC_RE = re.compile(r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*([^\s,;]+)\s*$")
+
+
+def _pad(release: tuple[int, ...], size: int) -> tuple[int, ...]:
+    return release + (0,) * (size - len(release))
+
+
+class Specifier:
+    __slots__ = ("op", "version", "_target", "_prefix")
+
+    def __init__(self, spec: str):
+        m = _SPEC_RE.match(spec)
+        if not m:
+            raise InvalidSpecifier(f"Некорректный спецификатор: {spec!r}")
+
+        self.op, self.version = m.groups()
+        self._prefix: tuple[int, tuple[int, ...]] | None = None
+        self._target: Version | None = None
+
+        if self.op == "===":
+            return
+
+        if self.version.endswith(".*"):
+            if self.op not in ("==", "!="):
+                raise InvalidSpecifier(f".* разрешён только с == и !=: {spec!r}")
+
+            base = parse_version(self.version[:-2])
+            if base.pre or base.post is not None or base.dev is not None:
+                raise InvalidSpecifier(f"Префикс .* только для релиза: {spec!r}")
+
+            self._prefix = (base.epoch, base.release)
+            return
+
+        try:
+            self._target = parse_version(self.version)
+
+        except InvalidVersion as err:
+            raise InvalidSpecifier(str(err)) from None
+
+        if self.op == "~=" and len(self._target.release) < 2:
+            raise InvalidSpecifier(f"~= требует минимум X.Y: {spec!r}")
+
+        if self._target.local and self.op not in ("==", "!="):
+            raise InvalidSpecifier(f"Локальная версия только с == и !=: {spec!r}")
+
+    @property
+    def prereleases(self) -> bool:
+        return self._target is not None and self._target.is_prerelease
+
+    def _match_prefix(self, v: Version) -> bool:
+        epoch, release = self._prefix  # pyright: ignore[reportOptionalSubscript]
+        return (
+            v.epoch == epoch and _pad(v.release, len(release))[: len(release)] == release
+        )
+
+    def contains(self, v: Version) -> bool:
+        op = self.op
+
+        if op == "===":
+            return str(v) == self.version
+
+        if self._prefix is not None:
+            return self._match_prefix(v) == (op == "==")
+
+        target = self._target
+        assert target is not None
+
+        # Без local в спецификаторе local кандидата не учитывается
+        cand = v if target.local else parse_version(v.public)
+
+        match op:
+            case "==":
+                return cand == target
+
+            case "!=":
+                return cand != target
+
+            case ">=":
+                return cand >= target
+
+            case "<=":
+                return cand <= target
+
+            case ">":
+                if not cand > target:
+                    return False
+
+                # >1.7 не пускает 1.7.post1, если сам спецификатор не post
+                if not target.is_postrelease and cand.is_postrelease:
+                    return cand.base_version != target.base_version
+
+                return True
+
+            case "<":
+                if not cand < target:
+                    return False
+
+                # <1.7 не пускает 1.7a1, если сам спецификатор не pre
+                if not target.is_prerelease and cand.is_prerelease:
+                    return parse_version(cand.base_version) != parse_version(
+                        target.base_version
+                    )
+
+                return True
+
+            case "~=":
+                prefix = target.release[:-1]
+                return (
+                    cand >= target
+                    and cand.epoch == target.epoch
+                    and _pad(cand.release, len(prefix))[: len(prefix)] == prefix
+                )
+
+        return False
+
+    def __str__(self) -> str:
+        return f"{self.op}{self.version}"
+
+
+class SpecifierSet:
+    __slots__ = ("specs",)
+
+    def __init__(self, specs: str = ""):
+        self.specs = tuple(
+            Specifier(part) for part in specs.split(",") if part.strip()
+        )
+
+    @property
+    def prereleases(self) -> bool:
+        return any(spec.prereleases for spec in self.specs)
+
+    def contains(
+        self,
+        version: str | Version,
+        prereleases: bool | None = None,
+    ) -> bool:
+        try:
+            v = version if isinstance(version, Version) else parse_version(version)
+
+        except InvalidVersion:
+            return False
+
+        if prereleases is None:
+            prereleases = self.prereleases
+
+        if v.is_prerelease and not prereleases:
+            return False
+
+        return all(spec.contains(v) for spec in self.specs)
+
+    def __contains__(self, version: str | Version) -> bool:
+        return self.contains(version)
+
+    def filter(
+        self,
+        versions: Iterable[str],
+        prereleases: bool | None = None,
+    ) -> list[str]:
+        # Как у pip: pre-релизы берутся, только если финальных подходящих нет
+        matched: list[str] = []
+        pre: list[str] = []
+        allow_pre = self.prereleases if prereleases is None else prereleases
+
+        for raw in versions:
+            try:
+                v = parse_version(raw)
+
+            except InvalidVersion:
+                continue
+
+            if not all(spec.contains(v) for spec in self.specs):
+                continue
+
+            if v.is_prerelease and not allow_pre:
+                pre.append(raw)
+
+            else:
+                matched.append(raw)
+
+        if not matched and prereleases is None:
+            return pre
+
+        return matched
+
+    def __str__(self) -> str:
+        return ",".join(str(spec) for spec in self.specs)
+
+
+def latest(versions: Iterable[str], specifiers: str = "") -> str | None:
+    candidates = SpecifierSet(specifiers).filter(versions)
+    if not candidates:
+        return None
+
+    return max(candidates, key=lambda v: parse_version(v).key)
+
+
+# endregion
@@ -0,0 +1,320 @@
+import concurrent.futures
+import re
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Any
+
+from .pep440 import canonicalize
+
+# Правило получает функцию чтения конфига и списки, куда складывает сообщения.
+# Config правила не импортируют, поэтому их можно гонять в потоках и на снимках
+Getter = Callable[..., Any]
+RuleFn = Callable[[Getter, list[str], list[str]], None]
+
+# Точки входа, через которые модули-компиляторы добавляют свои правила.
+# Имя точки - имя модуля, значение - register(registry)
+ENTRY_POINT_GROUP = "plg_sdk.rules"
+
+
+@dataclass(slots=True, frozen=True)
+class Rule:
+    name: str
+    keys: frozenset[str]  # ключи конфига в нижнем регистре
+    check: RuleFn
+    owner: str = "plg-sdk"
+
+
+@dataclass(slots=True, frozen=True)
+class RuleResult:
+    errors: tuple[str, ...]
+    warnings: tuple[str, ...]
+    elapsed: float  # секунды
+
+
+class RuleRegistry:
+    _rules: dict[str, Rule] = {}
+    _plugins: set[str] = set()
+
+    @classmethod
+    def register(
+        cls,
+        name: str,
+        keys: Iterable[str],
+        check: RuleFn,
+        owner: str = "plg-sdk",
+    ) -> Rule:
+        if name in cls._rules:
+            raise ValueError(f"Правило {name} уже зарегистрировано")
+
+        rule = Rule(name, frozenset(k.lower() for k in keys), check, owner)
+        cls._rules[name] = rule
+        return rule
+
+    @classmethod
+    def rule(cls, name: str, *keys: str) -> Callable[[RuleFn], RuleFn]:
+        def deco(fn: RuleFn) -> RuleFn:
+            cls.register(name, keys, fn)
+            return fn
+
+        return deco
+
+    @classmethod
+    def unregister(cls, name: str) -> None:
+        cls._rules.pop(name, None)
+
+    @classmethod
+    def rules(cls) -> dict[str, Rule]:
+        return cls._rules
+
+    @classmethod
+    def load_plugins(cls, modules: Iterable[str]) -> None:
+        # Модули импортируются только при валидации и только включённые в сборку,
+        # на старт CLI это не влияет
+        wanted = set(modules) - cls._plugins
+        if not wanted:
+            return
+
+        cls._plugins |= wanted
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name not in wanted:
+                continue
+
+            before = set(cls._rules)
+            try:
+                ep.load()(cls)
+
+            except Exception as err:
+                # Сломанный плагин не роняет валидацию, а сам становится ошибкой
+                msg = f"Не удалось загрузить правила модуля {ep.name}\n{err}"
+                cls.register(
+                    f"{ep.name}.load",
+                    (),
+                    lambda get, errors, warnings, msg=msg: errors.append(msg),
+                )
+
+            # Правила плагина помечаем владельцем, чтобы было видно чьи ошибки
+            for name in set(cls._rules) - before:
+                rule = cls._rules[name]
+                cls._rules[name] = Rule(rule.name, rule.keys, rule.check, ep.name)
+
+    @classmethod
+    def affected(cls, changed: Iterable[str]) -> list[str]:
+        changed = {k.lower() for k in changed}
+        return [n for n, r in cls._rules.items() if not changed.isdisjoint(r.keys)]
+
+    @staticmethod
+    def _run_one(rule: Rule, get: Getter) -> RuleResult:
+        errors: list[str] = []
+        warnings: list[str] = []
+        start = time.perf_counter()
+
+        try:
+            rule.check(get, errors, warnings)
+
+        except Exception as err:
+            errors.append(f"Правило {rule.name} ({rule.owner}) упало\n{err}")
+
+        return RuleResult(tuple(errors), tuple(warnings), time.perf_counter() - start)
+
+    @classmethod
+    def run(
+        cls,
+        get: Getter,
+        names: Iterable[str] | None = None,
+        workers: int = 1,
+    ) -> dict[str, RuleResult]:
+        rules = [cls._rules[n] for n in (cls._rules if names is None else names)]
+
+        if workers <= 1 or len(rules) < 2:
+            return {rule.name: cls._run_one(rule, get) for rule in rules}
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            results = pool.map(lambda rule: cls._run_one(rule, get), rules)
+            return {rule.name: result for rule, result in zip(rules, results)}
+
+
+# region built-in rules
+_NAMESPACE_RE = re.compile(r"[A-Za-z0-9_]+")
+_INSTALLERS = frozenset(("auto", "pip", "uv"))
+_URL_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]+://")
+_HTTP_RE = re.compile(r"(https?|file)://", re.IGNORECASE)
+_ADDON_TYPES = frozenset(
+    (
+        "gamemode",
+        "map",
+        "weapon",
+        "vehicle",
+        "npc",
+        "entity",
+        "tool",
+        "effects",
+        "model",
+        "servercontent",
+    )
+)
+_ADDON_TAGS = frozenset(
+    (
+        "fun",
+        "roleplay",
+        "scenic",
+        "movie",
+        "realism",
+        "cartoon",
+        "water",
+        "comic",
+        "build",
+    )
+)
+
+
+@RuleRegistry.rule("modules.allowed", "config.modules.allowed", "all_modules")
+def _check_allowed(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    allowed = list(get("config.modules.allowed", []))
+    if "all" in allowed:
+        return
+
+    all_modules = set(get("all_modules", []))
+    for m in allowed:
+        if m not in all_modules:
+            errors.append(f'MODULES.allowed: модуль "{m}" не разрешён')
+
+
+_REQUIRED = (
+    "config.project.name",
+    "config.project.author",
+    "config.project.version",
+)
+
+
+@RuleRegistry.rule("project.required", *_REQUIRED)
+def _check_required(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    for key in _REQUIRED:
+        if get(key) is None:
+            _, err_key, cfg_key = key.split(".")
+            errors.append(f"{err_key.upper()}.{cfg_key} не задано")
+
+
+@RuleRegistry.rule("project.version", "config.project.version")
+def _check_version(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    ver = get("config.project.version")
+    if ver is None:
+        return
+
+    ver_c = canonicalize(str(ver))
+    if ver_c is None:
+        errors.append("PROJECT.version не соответствует PEP440")
+
+    elif ver_c != ver:
+        warnings.append(
+            "PROJECT.version не является канонической.\n"
+            f"Используется нормализованная версия: {ver_c}"
+        )
+
+
+@RuleRegistry.rule(
+    "project.namespace",
+    "config.project.namespace",
+    "config.project.name",
+    "config.project.author",
+)
+def _check_namespace(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    ns = get("config.project.namespace")
+
+    if ns == "%!DEFAULT!%":
+        auto_ns = f"{get('config.project.name')}_{get('config.project.author')}"
+
+        if not _NAMESPACE_RE.fullmatch(auto_ns):
+            errors.append(
+                "PROJECT.namespace установлен в режим %!DEFAULT!%\n"
+                "Ошибка в автоматически сформированном значении namespace\n\n"
+                "Шаблон     : <PROJECT.name>_<PROJECT.author>\n"
+                f"Подставлено: {auto_ns}\n"
+                "Ожидается  : только символы [A-Za-z0-9_]"
+            )
+
+    elif isinstance(ns, str):
+        if not _NAMESPACE_RE.fullmatch(ns):
+            errors.append(
+                "PROJECT.namespace содержит недопустимые символы.\n"
+                "Ожидается: только символы [A-Za-z0-9_]"
+            )
+
+
+@RuleRegistry.rule("plg-sdk.installer", "config.plg-sdk.installer")
+def _check_installer(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    installer = get("config.plg-sdk.installer")
+    if installer is not None and installer not in _INSTALLERS:
+        errors.append(
+            "PLG-SDK.installer имеет недопустимое значение.\n"
+            "Ожидается: auto, pip или uv"
+        )
+
+
+@RuleRegistry.rule(
+    "plg-sdk.version_cache",
+    "config.plg-sdk.version_cache_ttl",
+    "config.plg-sdk.version_cache_stale",
+)
+def _check_version_cache(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    for key in ("version_cache_ttl", "version_cache_stale"):
+        value = get(f"config.plg-sdk.{key}")
+        if isinstance(value, int) and value < 0:
+            errors.append(f"PLG-SDK.{key} не может быть отрицательным")
+
+
+@RuleRegistry.rule("build.cache_size_mb", "config.build.cache_size_mb")
+def _check_cache_size(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    value = get("config.build.cache_size_mb")
+    if isinstance(value, int) and value < 0:
+        errors.append("BUILD.cache_size_mb не может быть отрицательным")
+
+
+@RuleRegistry.rule(
+    "cache.remote",
+    "config.cache.remote",
+    "config.cache.timeout",
+    "config.build.cache_size_mb",
+)
+def _check_remote_cache(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    remote = get("config.cache.remote")
+    if not remote:
+        return
+
+    timeout = get("config.cache.timeout")
+    if isinstance(timeout, int) and timeout < 1:
+        errors.append("CACHE.timeout должен быть не меньше 1")
+
+    if _URL_RE.match(remote) and not _HTTP_RE.match(remote):
+        errors.append(
+            "CACHE.remote: неизвестная схема адреса.\n"
+            "Ожидается: путь к папке, file://, http:// или https://"
+        )
+
+    if not get("config.build.cache_size_mb"):
+        warnings.append(
+            "CACHE.remote задан, но BUILD.cache_size_mb = 0.\n"
+            "Общий кэш работает только вместе с локальным и будет пропущен"
+        )
+
+
+@RuleRegistry.rule("pack.addon", "config.pack.type", "config.pack.tags")
+def _check_pack(get: Getter, errors: list[str], warnings: list[str]) -> None:
+    addon_type = get("config.pack.type")
+    if addon_type is not None and addon_type not in _ADDON_TYPES:
+        errors.append(
+            f'PACK.type: неизвестный тип аддона "{addon_type}".\n'
+            "Ожидается: " + ", ".join(sorted(_ADDON_TYPES))
+        )
+
+    tags = list(get("config.pack.tags", []))
+    if len(tags) > 2:
+        errors.append("PACK.tags: мастерская принимает не больше двух тегов")
+
+    for tag in tags:
+        if tag not in _ADDON_TAGS:
+            errors.append(f'PACK.tags: неизвестный тег "{tag}"')
+
+
+# endregion
@@ -0,0 +1,107 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .trace import Tracer
+
+
+def cast_value(data: Any, data_type: str) -> Any:
+    if data == "%!NOT_SET!%":
+        return None
+
+    match data_type:
+        case "str":
+            return str(data)
+
+        case "bool":
+            return bool(data)
+
+        case "int":
+            return int(data)
+
+        case "path":
+            return Path(data)
+
+        case "array_str":
+            return list(data)
+
+        case _:
+            raise ValueError(
+                f"Неизвестное значение {data_type} при трансформации {data}"
+            )
+
+
+@dataclass(slots=True, frozen=True)
+class SchemaKey:
+    key: str  # config.<header>.<name> в нижнем регистре
+    header: str  # как в toml, например PLG-SDK
+    name: str
+    type: str
+    default: Any  # уже приведённое значение
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledSchema:
+    all_modules: tuple[str, ...]
+    keys: tuple[SchemaKey, ...]
+    # header -> name -> ключ, для разбора пользовательского toml
+    toml: dict[str, dict[str, SchemaKey]]
+
+    def defaults(self) -> dict[str, Any]:
+        # Списки копируются, чтобы set/append не портил закэшированную схему
+        return {
+            k.key: list(k.default) if isinstance(k.default, list) else k.default
+            for k in self.keys
+        }
+
+
+class ConfigSchema:
+    # Схема разбирается один раз в плоский набор ключей с приведёнными дефолтами
+    # и живёт в памяти процесса. Кэша на диске нет: прочитать его стоит
+    # столько же, сколько разобрать сам config_schema.json
+
+    _raw: dict[str, Any] | None = None
+    _compiled: CompiledSchema | None = None
+
+    @staticmethod
+    def path() -> Path:
+        return (Path(__file__).parents[1] / "resource/config_schema.json").resolve()
+
+    @classmethod
+    def raw(cls) -> dict[str, Any]:
+        if cls._raw is None:
+            cls._raw = json.loads(cls.path().read_text(encoding="utf-8"))
+
+        return cls._raw
+
+    @classmethod
+    def _compile(cls, raw: dict[str, Any]) -> CompiledSchema:
+        keys: list[SchemaKey] = []
+        toml: dict[str, dict[str, SchemaKey]] = {}
+
+        for header, blocks in raw.get("config", {}).items():
+            for name, meta in blocks.items():
+                key = SchemaKey(
+                    f"config.{header}.{name}".lower(),
+                    header,
+                    name,
+                    meta["type"],
+                    cast_value(meta["default"], meta["type"]),
+                )
+                keys.append(key)
+                toml.setdefault(header, {})[name] = key
+
+        return CompiledSchema(
+            tuple(raw.get("allowed_modules", [])),
+            tuple(keys),
+            toml,
+        )
+
+    @classmethod
+    def compiled(cls) -> CompiledSchema:
+        if cls._compiled is None:
+            with Tracer.span("config.schema"):
+                cls._compiled = cls._compile(cls.raw())
+
+        return cls._compiled
@@ -0,0 +1,238 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+_FIELDS = (
+    "debug",
+    "root",
+    "source_dir",
+    "out_dir",
+    "name",
+    "author",
+    "namespace",
+    "version",
+    "parallel",
+    "clean_before",
+    "cache_size_mb",
+    "isolated",
+    "remote_cache",
+    "remote_push",
+    "remote_timeout",
+    "allowed_modules",
+    "all_modules",
+    "pack_file",
+    "pack_assets",
+    "pack_ignore",
+    "pack_type",
+    "pack_tags",
+    "pack_description",
+)
+
+# Поля, от которых зависит результат компиляции.
+# Остальные (parallel, clean_before, isolated, кэши, debug) влияют только на то,
+# как идёт сборка, pack_* - только на упаковку в .gma.
+# source_dir в ключе артефакта берётся относительно корня проекта, out_dir не
+# входит вовсе: вывод собирается во временной папке. Иначе общий кэш не
+# срабатывал бы между двумя checkout'ами одного проекта
+_ARTIFACT_FIELDS = (
+    "source_dir",
+    "name",
+    "author",
+    "namespace",
+    "version",
+    "allowed_modules",
+    "all_modules",
+)
+# digest сборки: ещё и где лежит проект и куда идёт вывод.
+# Их смена пересобирает out_dir, но артефакты в кэше остаются годными
+_BUILD_FIELDS = (*_ARTIFACT_FIELDS, "root", "out_dir")
+_MODULE_FIELDS = ("allowed_modules", "all_modules")
+
+
+def _restore(version: int, values: tuple[Any, ...]) -> "ConfigSnapshot":
+    if version != ConfigSnapshot.VERSION:
+        raise ValueError(
+            f"Снимок конфига версии {version}, ожидалась {ConfigSnapshot.VERSION}"
+        )
+
+    return ConfigSnapshot(**dict(zip(_FIELDS, values)))
+
+
+class ConfigSnapshot:
+    # Неизменяемый типизированный срез конфига для сборки.
+    # Дёшево передаётся в процессы пула, поля читаются как обычные атрибуты.
+    # digest          - стабильный между запусками хэш полей, влияющих на сборку
+    # artifact_digest - то же без привязки к расположению проекта, для ключей кэша
+    # full_digest     - все поля: снимок в воркерах пула должен совпадать целиком,
+    #                   isolated и прочее читаются там же
+    VERSION = 2
+
+    __slots__ = (*_FIELDS, "digest", "artifact_digest", "full_digest")
+
+    debug: bool
+    root: Path  # корень проекта, папка с plg-sdk-config.toml
+    source_dir: Path
+    out_dir: Path
+    name: str | None
+    author: str | None
+    namespace: str | None
+    version: str | None
+    parallel: bool
+    clean_before: bool
+    cache_size_mb: int
+    isolated: bool
+    remote_cache: str | None
+    remote_push: bool
+    remote_timeout: int
+    allowed_modules: tuple[str, ...]
+    all_modules: tuple[str, ...]
+    pack_file: Path
+    pack_assets: tuple[Path, ...]
+    pack_ignore: tuple[str, ...]
+    pack_type: str
+    pack_tags: tuple[str, ...]
+    pack_description: str
+    digest: bytes
+    artifact_digest: bytes
+    full_digest: bytes
+
+    def __init__(self, **values: Any):
+        for field in _FIELDS:
+            object.__setattr__(self, field, values[field])
+
+        object.__setattr__(self, "digest", self._digest(_BUILD_FIELDS))
+        object.__setattr__(self, "artifact_digest", self._digest(_ARTIFACT_FIELDS))
+        object.__setattr__(self, "full_digest", self._digest(_FIELDS))
+
+    def _portable(self, path: Path) -> str:
+        # Путь внутри проекта одинаков в любом checkout'е
+        try:
+            return Path(os.path.relpath(path, self.root)).as_posix()
+
+        except ValueError:
+            # Другой диск в windows
+            return str(path)
+
+    def _digest(self, fields: tuple[str, ...]) -> bytes:
+        # repr кортежей из str/bool/None стабилен, в отличие от hash().
+        # Абсолютные пути только там, где в полях есть root
+        relative = "root" not in fields
+        items = []
+        for field in fields:
+            value = getattr(self, field)
+            if isinstance(value, Path):
+                value = self._portable(value) if relative else str(value)
+
+            items.append((field, value))
+
+        data = repr(tuple(items)).encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("ConfigSnapshot неизменяем")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("ConfigSnapshot неизменяем")
+
+    def __reduce__(self):
+        # В пул уходит версия и голый кортеж значений, digest'ы считаются заново
+        return _restore, (self.VERSION, tuple(getattr(self, f) for f in _FIELDS))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ConfigSnapshot):
+            return NotImplemented
+
+        return all(getattr(self, f) == getattr(other, f) for f in _FIELDS)
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ConfigSnapshot":
+        name = config.get("config.project.name")
+        author = config.get("config.project.author")
+        namespace = config.get("config.project.namespace")
+        if namespace == "%!DEFAULT!%":
+            namespace = f"{name}_{author}"
+
+        pack_file = config.get("config.pack.out_file") or f"{name or 'addon'}.gma"
+
+        return cls(
+            debug=bool(config.get("config.plg-sdk.debug", False)),
+            root=config.config_file().parent,
+            source_dir=Path(config.get("config.paths.source_dir")).resolve(),
+            out_dir=Path(config.get("config.paths.out_dir")).resolve(),
+            name=name,
+            author=author,
+            namespace=namespace,
+            version=config.get("config.project.version"),
+            parallel=bool(config.get("config.build.parallel", True)),
+            clean_before=bool(config.get("config.build.clean_before", False)),
+            cache_size_mb=int(config.get("config.build.cache_size_mb", 0)),
+            isolated=bool(config.get("config.build.isolated", False)),
+            remote_cache=config.get("config.cache.remote") or None,
+            remote_push=bool(config.get("config.cache.push", True)),
+            remote_timeout=int(config.get("config.cache.timeout", 5)),
+            allowed_modules=tuple(config.get("config.modules.allowed", ())),
+            all_modules=tuple(config.get("all_modules", ())),
+            pack_file=Path(pack_file).resolve(),
+            pack_assets=tuple(
+                Path(p).resolve() for p in config.get("config.pack.assets", ())
+            ),
+            pack_ignore=tuple(config.get("config.pack.ignore", ())),
+            pack_type=config.get("config.pack.type") or "tool",
+            pack_tags=tuple(config.get("config.pack.tags", ())),
+            pack_description=config.get("config.pack.description") or "",
+        )
+
+    @property
+    def modules(self) -> tuple[str, ...]:
+        # Модули, которые реально участвуют в сборке
+        if "all" in self.allowed_modules:
+            return self.all_modules
+
+        return tuple(m for m in self.all_modules if m in self.allowed_modules)
+
+    def invalidated(self, other: "ConfigSnapshot") -> frozenset[str]:
+        # Модули, чьи артефакты при переходе self -> other становятся невалидными
+        if self.digest == other.digest:
+            return frozenset()
+
+        before, after = set(self.modules), set(other.modules)
+        shared = (f for f in _BUILD_FIELDS if f not in _MODULE_FIELDS)
+        if any(getattr(self, f) != getattr(other, f) for f in shared):
+            return frozenset(before | after)
+
+        # Поменялся только список модулей: новые собрать, выкинутые убрать
+        return frozenset(before ^ after)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in _FIELDS)
+        return f"ConfigSnapshot({fields})"
+
+
+@dataclass(slots=True, frozen=True)
+class ConfigChange:
+    keys: frozenset[str]  # изменённые ключи, как в Config
+    before: ConfigSnapshot
+    after: ConfigSnapshot
+    modules: frozenset[str]  # модули, чьи артефакты надо пересобрать или убрать
+
+    @classmethod
+    def between(
+        cls,
+        keys: frozenset[str],
+        before: ConfigSnapshot,
+        after: ConfigSnapshot,
+    ) -> "ConfigChange":
+        return cls(keys, before, after, before.invalidated(after))
+
+    @property
+    def rebuild(self) -> bool:
+        return bool(self.modules)
+
+    @property
+    def source_moved(self) -> bool:
+        return self.before.source_dir != self.after.source_dir
@@ -0,0 +1,161 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+_NULL = contextlib.nullcontext()
+
+
+def now_us() -> float:
+    # perf_counter монотонный и общий для процессов одной машины,
+    # поэтому времена из воркеров пула ложатся на ту же шкалу
+    return time.perf_counter_ns() / 1000
+
+
+def traced_call(fn: Any, *args: Any) -> tuple[Any, float, float, int]:
+    # Обёртка юнита сборки: вызывается в воркере, возвращает время работы наружу
+    start = now_us()
+    result = fn(*args)
+    return result, start, now_us(), os.getpid()
+
+
+class Tracer:
+    # Спаны в формате Chrome Trace Event (chrome://tracing, ui.perfetto.dev).
+    # Выключенный трейсер ничего не пишет и ничего не стоит
+    _enabled = False
+    _events: list[dict[str, Any]] = []
+    _pids: set[int] = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls) -> None:
+        cls._enabled = True
+        cls._events = []
+        cls._pids = {os.getpid()}
+        cls._meta(os.getpid(), "plg-sdk")
+
+    @classmethod
+    def disable(cls) -> None:
+        cls._enabled = False
+        cls._events = []
+        cls._pids = set()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls._enabled
+
+    @classmethod
+    def _meta(cls, pid: int, name: str) -> None:
+        cls._events.append(
+            {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": name}}
+        )
+
+    @classmethod
+    def complete(
+        cls,
+        name: str,
+        cat: str,
+        start: float,
+        end: float,
+        pid: int | None = None,
+        tid: int | None = None,
+        **args: Any,
+    ) -> None:
+        if not cls._enabled:
+            return
+
+        event = {
+            "ph": "X",
+            "name": name,
+            "cat": cat,
+            "ts": start,
+            "dur": max(0.0, end - start),
+            "pid": pid if pid is not None else os.getpid(),
+            "tid": tid if tid is not None else threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+
+        with cls._lock:
+            cls._events.append(event)
+
+    @classmethod
+    def instant(cls, name: str, cat: str, **args: Any) -> None:
+        if not cls._enabled:
+            return
+
+        event = {
+            "ph": "i",
+            "s": "t",
+            "name": name,
+            "cat": cat,
+            "ts": now_us(),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+
+        with cls._lock:
+            cls._events.append(event)
+
+    @classmethod
+    def span(cls, name: str, cat: str = "sdk", **args: Any):
+        if not cls._enabled:
+            return _NULL
+
+        return cls._span(name, cat, args)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _span(cls, name: str, cat: str, args: dict[str, Any]) -> Iterator[None]:
+        start = now_us()
+        try:
+            yield
+
+        finally:
+            cls.complete(name, cat, start, now_us(), **args)
+
+    @classmethod
+    def worker(cls, pid: int) -> None:
+        # Подпись процесса пула в трейсе, один раз на pid
+        if not cls._enabled:
+            return
+
+        with cls._lock:
+            if pid not in cls._pids:
+                cls._pids.add(pid)
+                cls._meta(pid, f"worker {pid}")
+
+    @classmethod
+    def slowest(
+        cls,
+        limit: int = 10,
+        cat: str | None = None,
+    ) -> list[tuple[str, str, float]]:
+        # (имя, категория, длительность в мкс), самые долгие первыми
+        spans = [
+            (e["name"], e["cat"], e["dur"])
+            for e in cls._events
+            if e["ph"] == "X" and (cat is None or e["cat"] == cat)
+        ]
+        spans.sort(key=lambda s: -s[2])
+        return spans[:limit]
+
+    @classmethod
+    def save(cls, directory: Path, name: str) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = directory / f"{name}-{stamp}-{os.getpid()}.json"
+
+        with cls._lock:
+            data = {"traceEvents": list(cls._events), "displayTimeUnit": "ms"}
+
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
@@ -0,0 +1,68 @@
+import shutil
+import sys
+from dataclasses import dataclass
+
+from ..core.pep440 import (
+    InvalidSpecifier,
+    InvalidVersion,
+    SpecifierSet,
+    parse_version,
+)
+
+
+@dataclass(slots=True, frozen=True)
+class InstallPlan:
+    install: tuple[str, ...]  # нет локально
+    upgrade: tuple[str, ...]  # в индексе есть версия новее
+    current: tuple[str, ...]  # ничего делать не надо
+
+    @property
+    def targets(self) -> tuple[str, ...]:
+        return self.install + self.upgrade
+
+
+def plan_install(
+    versions: dict[str, tuple[str | None, str | None]],
+    auto_install: bool = True,
+    auto_update: bool = True,
+    specifiers: dict[str, str] | None = None,
+) -> InstallPlan:
+    # specifiers - ограничения версий модулей (">=1.2,<2"). Pre-релиз из индекса
+    # ставится, только если ограничение модуля явно его разрешает
+    specifiers = specifiers or {}
+    install: list[str] = []
+    upgrade: list[str] = []
+    current: list[str] = []
+
+    for module, (local, remote) in sorted(versions.items()):
+        if local is None:
+            (install if auto_install else current).append(module)
+            continue
+
+        # Индекс не ответил - обновлять не на что
+        if remote is None or not auto_update:
+            current.append(module)
+            continue
+
+        try:
+            spec = SpecifierSet(specifiers.get(module, ""))
+            allowed = spec.filter([remote], prereleases=spec.prereleases)
+            outdated = bool(allowed) and parse_version(remote) > parse_version(local)
+
+        except (InvalidVersion, InvalidSpecifier):
+            current.append(module)
+            continue
+
+        (upgrade if outdated else current).append(module)
+
+    return InstallPlan(tuple(install), tuple(upgrade), tuple(current))
+
+
+def installer_command(backend: str = "auto") -> list[str]:
+    # uv ставит в тот же интерпретатор, что и pip, но в разы быстрее резолвит
+    if backend in ("auto", "uv"):
+        uv = shutil.which("uv")
+        if uv is not None:
+            return [uv, "pip", "install", "--python", sys.executable]
+
+    return [sys.executable, "-m", "pip", "install"]
@@ -0,0 +1,115 @@
+import os
+import re
+import sys
+import threading
+from email.parser import HeaderParser
+
+_CANONICAL_RE = re.compile(r"[-_.]+")
+
+
+def canonical_name(name: str) -> str:
+    # PEP 503
+    return _CANONICAL_RE.sub("-", name).lower()
+
+
+class LocalIndex:
+    # Индекс установленных дистрибутивов за один проход по sys.path.
+    # importlib.metadata.version на каждый модуль заново сканирует все пути,
+    # тут же строим словарь один раз и пересобираем только когда
+    # поменялся mtime какой-то из директорий (pip install/uninstall его трогает)
+
+    _index: dict[str, str] | None = None
+    _stamp: tuple[tuple[str, int], ...] = ()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _paths() -> list[str]:
+        return [p or "." for p in sys.path if os.path.isdir(p or ".")]
+
+    @classmethod
+    def _make_stamp(cls, paths: list[str]) -> tuple[tuple[str, int], ...]:
+        out = []
+        for path in paths:
+            try:
+                out.append((path, os.stat(path).st_mtime_ns))
+
+            except OSError:
+                continue
+
+        return tuple(out)
+
+    @staticmethod
+    def _read_metadata(path: str) -> tuple[str, str] | None:
+        for name in ("METADATA", "PKG-INFO"):
+            try:
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    headers = HeaderParser().parse(f, headersonly=True)
+
+            except OSError:
+                continue
+
+            if headers["Name"] and headers["Version"]:
+                return headers["Name"], headers["Version"]
+
+        return None
+
+    @classmethod
+    def _scan_dir(cls, path: str, out: dict[str, str]) -> None:
+        try:
+            entries = os.scandir(path)
+
+        except OSError:
+            return
+
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if name.endswith(".dist-info"):
+                    # {name}-{version}.dist-info, имя уже экранировано по спеке
+                    stem = name[: -len(".dist-info")]
+                    dist, sep, version = stem.rpartition("-")
+                    if not sep:
+                        continue
+
+                elif name.endswith(".egg-info"):
+                    # egg-info бывает и файлом, и с кривым именем - верим только METADATA
+                    meta = cls._read_metadata(entry.path) if entry.is_dir() else None
+                    if meta is None:
+                        continue
+
+                    dist, version = meta
+
+                else:
+                    continue
+
+                # Как и importlib - выигрывает первый путь в sys.path
+                out.setdefault(canonical_name(dist), version)
+
+    @classmethod
+    def _build(cls, paths: list[str]) -> dict[str, str]:
+        out: dict[str, str] = {}
+        for path in paths:
+            cls._scan_dir(path, out)
+
+        return out
+
+    @classmethod
+    def index(cls) -> dict[str, str]:
+        paths = cls._paths()
+        stamp = cls._make_stamp(paths)
+
+        with cls._lock:
+            if cls._index is None or stamp != cls._stamp:
+                cls._index = cls._build(paths)
+                cls._stamp = stamp
+
+            return cls._index
+
+    @classmethod
+    def version(cls, module: str) -> str | None:
+        return cls.index().get(canonical_name(module))
+
+    @classmethod
+    def invalidate(cls) -> None:
+        with cls._lock:
+            cls._index = None
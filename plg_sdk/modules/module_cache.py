@@ -1,113 +1,302 @@
+import mmap
+import os
+import struct
+import zlib
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 
 from ..core import Config
 
 
+@dataclass(slots=True, frozen=True)
+class CacheEntry:
+    version: str
+    checked_at: datetime
+    etag: str = ""
+    last_modified: str = ""
+
+
 class ModulesCache:
     NO_DATA = datetime.fromtimestamp(0, timezone.utc), {}
-    _path: Path = Config.sdk_path() / "cache/pip_modules.bin"
+    MAGIC = b"PLGM"
+    VERSION = 4
+    # None - путь берётся из Config при первом обращении, а не при импорте
+    _path: Path | None = None
 
     # Структура бинарника.
     # Может потом скажу себе спасибо когда через месяц открою этот файл
 
     # HEADER:
-    #   uint8      modules_len
+    #   4 bytes    magic (PLGM)
+    #   uint16 LE  version
+    #   uint16 LE  reserved (0)
+    #   uint32 LE  modules_len
+    #   uint32 LE  slots_len (степень двойки, >= 2 * modules_len)
     #   uint64 LE  cache_time (unix timestamp)
+    #   uint32 LE  crc32 всего что идёт после заголовка
+
+    # SLOTS (repeat slots_len):
+    #   uint32 LE  абсолютный offset записи, 0 = пустой слот
+    #   Открытая адресация: crc32(name) & (slots_len - 1), дальше линейно
 
     # BODY (repeat modules_len):
+    #   uint64 LE  checked_at (unix timestamp, когда версия была получена)
     #   uint16 LE  name_len
     #   uint16 LE  version_len (0 = no version)
+    #   uint16 LE  etag_len (0 = сервер не прислал)
+    #   uint16 LE  last_modified_len (0 = сервер не прислал)
     #   bytes      name
     #   bytes      version
+    #   bytes      etag
+    #   bytes      last_modified
+
+    # v3 - без etag и last_modified
+    # v2 - ещё и без checked_at в записях (берётся cache_time)
+    # v1 (без magic):
+    #   uint8      modules_len
+    #   uint64 LE  cache_time
+    #   BODY как в v2
+    # Старые версии читаются и сразу переписываются в текущую
+
+    _HEADER = struct.Struct("<4sHHIIQI")
+    _SLOT = struct.Struct("<I")
+    _RECORD_V2 = struct.Struct("<HH")
+    _RECORD_V3 = struct.Struct("<QHH")
+    _RECORD = struct.Struct("<QHHHH")
 
     @classmethod
-    def load(cls) -> tuple[datetime, dict[str, str]]:
-        if not cls._path.exists():
+    def path(cls) -> Path:
+        if cls._path is None:
+            cls._path = Config.sdk_path() / "cache/pip_modules.bin"
+
+        return cls._path
+
+    # region v1
+    @classmethod
+    def _load_v1(cls, data: bytes) -> tuple[datetime, dict[str, CacheEntry]]:
+        if len(data) < 9:
             return cls.NO_DATA
 
-        data = cls._path.read_bytes()
-        pos = 0
-        length = len(data)
+        count = data[0]
+        timestamp = int.from_bytes(data[1:9], "little")
+        cache_time = datetime.fromtimestamp(timestamp, timezone.utc)
+
+        modules: dict[str, CacheEntry] = {}
+        pos = 9
+        for _ in range(count):
+            if pos + cls._RECORD_V2.size > len(data):
+                return cls.NO_DATA
+
+            name_len, version_len = cls._RECORD_V2.unpack_from(data, pos)
+            pos += cls._RECORD_V2.size
+            if pos + name_len + version_len > len(data):
+                return cls.NO_DATA
+
+            name = data[pos : pos + name_len].decode("utf-8")
+            pos += name_len
+            version = data[pos : pos + version_len].decode("utf-8")
+            modules[name] = CacheEntry(version, cache_time)
+            pos += version_len
+
+        return cache_time, modules
+
+    # endregion
+
+    # region v2/v3
+    @staticmethod
+    def _slot_of(name_b: bytes, slots: int) -> int:
+        return zlib.crc32(name_b) & (slots - 1)
 
-        def read(n: int) -> bytes:
-            nonlocal pos
-            if pos + n > length:
-                return b""
+    @classmethod
+    def _read_header(cls, data) -> tuple[int, int, int, int, int] | None:
+        if len(data) < cls._HEADER.size:
+            return None
+
+        magic, version, _, count, slots, timestamp, crc = cls._HEADER.unpack_from(
+            data, 0
+        )
+        if magic != cls.MAGIC or version not in (2, 3, cls.VERSION):
+            return None
+
+        if slots & (slots - 1) or count > slots:
+            return None
+
+        # Обрезанный файл: таблица слотов не влезает
+        if len(data) < cls._HEADER.size + slots * cls._SLOT.size:
+            return None
+
+        return version, count, slots, timestamp, crc
+
+    @classmethod
+    def _read_record(
+        cls,
+        data,
+        offset: int,
+        version: int,
+        cache_time: int,
+    ) -> tuple[str, CacheEntry] | None:
+        record = {2: cls._RECORD_V2, 3: cls._RECORD_V3}.get(version, cls._RECORD)
+        if offset + record.size > len(data):
+            return None
 
-            out = data[pos : pos + n]
-            pos += n
-            return out
+        fields = record.unpack_from(data, offset)
+        offset += record.size
 
-        # region header
+        if version == 2:
+            fields = (cache_time, *fields)
 
-        # region modules_len
-        count_b = read(1)
-        if not count_b:
+        checked_at, *lengths = fields
+        if offset + sum(lengths) > len(data):
+            return None
+
+        values = []
+        for length in lengths:
+            values.append(bytes(data[offset : offset + length]).decode("utf-8"))
+            offset += length
+
+        values += [""] * (4 - len(values))
+        name, value, etag, last_modified = values
+        return name, CacheEntry(
+            value,
+            datetime.fromtimestamp(checked_at, timezone.utc),
+            etag,
+            last_modified,
+        )
+
+    # endregion
+
+    @classmethod
+    def load(cls) -> tuple[datetime, dict[str, CacheEntry]]:
+        if not cls.path().exists():
+            return cls.NO_DATA
+
+        data = cls.path().read_bytes()
+        if not data.startswith(cls.MAGIC):
+            cache_time, modules = cls._load_v1(data)
+            if modules:
+                cls.save(cache_time, modules)
+
+            return cache_time, modules
+
+        header = cls._read_header(data)
+        if header is None:
+            return cls.NO_DATA
+
+        version, count, slots, timestamp, crc = header
+        if zlib.crc32(memoryview(data)[cls._HEADER.size :]) != crc:
             return cls.NO_DATA
 
-        count = int.from_bytes(count_b, "little")
-        # endregion
+        modules: dict[str, CacheEntry] = {}
+        for i in range(slots):
+            (offset,) = cls._SLOT.unpack_from(data, cls._HEADER.size + i * 4)
+            if not offset:
+                continue
+
+            record = cls._read_record(data, offset, version, timestamp)
+            if record is None:
+                return cls.NO_DATA
+
+            modules[record[0]] = record[1]
 
-        # region cache_time
-        ts_b = read(8)
-        if not ts_b:
+        if len(modules) != count:
             return cls.NO_DATA
 
-        timestamp = int.from_bytes(ts_b, "little")
         cache_time = datetime.fromtimestamp(timestamp, timezone.utc)
-        # endregion
+        if version != cls.VERSION:
+            cls.save(cache_time, modules)
 
-        # endregion
+        return cache_time, modules
 
-        # region body
-        modules: dict[str, str] = {}
+    @classmethod
+    def lookup(cls, name: str) -> CacheEntry | None:
+        # Точечное чтение через mmap без разбора всего файла.
+        # CRC тут не проверяется, это работа load
+        try:
+            with cls.path().open("rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    header = cls._read_header(data)
+                    if header is None:
+                        return None
 
-        for _ in range(count):
-            name_len_b = read(2)
-            version_len_b = read(2)
-            if not name_len_b or not version_len_b:
-                return cls.NO_DATA
+                    version, _, slots, timestamp, _ = header
+                    name_b = name.encode("utf-8")
+                    slot = cls._slot_of(name_b, slots)
 
-            name_len = int.from_bytes(name_len_b, "little")
-            version_len = int.from_bytes(version_len_b, "little")
+                    for _ in range(slots):
+                        (offset,) = cls._SLOT.unpack_from(
+                            data, cls._HEADER.size + slot * 4
+                        )
+                        if not offset:
+                            return None
 
-            name_b = read(name_len)
-            version_b = read(version_len)
+                        record = cls._read_record(data, offset, version, timestamp)
+                        if record is None:
+                            return None
 
-            if len(name_b) != name_len or len(version_b) != version_len:
-                return cls.NO_DATA
+                        if record[0] == name:
+                            return record[1]
 
-            name = name_b.decode("utf-8")
-            version = version_b.decode("utf-8") if version_len > 0 else ""
+                        slot = (slot + 1) & (slots - 1)
 
-            modules[name] = version
-        # endregion
+        except (OSError, ValueError, struct.error):
+            # Нет файла или он пустой (mmap не умеет в нулевую длину),
+            # или файл обрезан посреди записи
+            return None
 
-        return cache_time, modules
+        return None
 
     @classmethod
-    def save(cls, cache_time: datetime, modules_version: dict[str, str]) -> None:
-        cls._path.parent.mkdir(parents=True, exist_ok=True)
-
-        items = list(modules_version.items())
-        count = len(items)
-        time = int(cache_time.timestamp())
-
-        with cls._path.open("wb") as file:
-            # header
-            file.write(count.to_bytes(1, "little"))
-            file.write(time.to_bytes(8, "little"))
-
-            # body
-            for name, version in items:
-                name_b = name.encode(encoding="utf-8")
-                version_b = (
-                    version.encode(encoding="utf-8") if version is not None else b""
-                )
-
-                file.write(len(name_b).to_bytes(2, "little"))
-                file.write(len(version_b).to_bytes(2, "little"))
-
-                file.write(name_b)
-                file.write(version_b)
+    def save(
+        cls,
+        cache_time: datetime,
+        modules_version: dict[str, CacheEntry],
+    ) -> None:
+        cls.path().parent.mkdir(parents=True, exist_ok=True)
+
+        count = len(modules_version)
+        slots = 1
+        while slots < count * 2:
+            slots *= 2
+
+        table = [0] * slots
+        body = bytearray()
+        body_start = cls._HEADER.size + slots * cls._SLOT.size
+
+        for name, entry in modules_version.items():
+            name_b = name.encode("utf-8")
+            version_b = entry.version.encode("utf-8")
+            etag_b = entry.etag.encode("utf-8")
+            last_modified_b = entry.last_modified.encode("utf-8")
+
+            slot = cls._slot_of(name_b, slots)
+            while table[slot]:
+                slot = (slot + 1) & (slots - 1)
+
+            table[slot] = body_start + len(body)
+            body += cls._RECORD.pack(
+                int(entry.checked_at.timestamp()),
+                len(name_b),
+                len(version_b),
+                len(etag_b),
+                len(last_modified_b),
+            )
+            body += name_b
+            body += version_b
+            body += etag_b
+            body += last_modified_b
+
+        payload = struct.pack(f"<{slots}I", *table) + body
+        header = cls._HEADER.pack(
+            cls.MAGIC,
+            cls.VERSION,
+            0,
+            count,
+            slots,
+            int(cache_time.timestamp()),
+            zlib.crc32(payload),
+        )
+
+        tmp = cls.path().with_suffix(".tmp")
+        tmp.write_bytes(header + payload)
+        os.replace(tmp, cls.path())
@@ -1,26 +1,51 @@
-import concurrent.futures
-import importlib.metadata
-import json
+import importlib.util
 import logging
 import subprocess
-import sys
-import urllib.request
+from datetime import datetime, timezone
+
+from ..core import Config
+from ..core.trace import Tracer
+from .install_planner import InstallPlan, installer_command, plan_install
+from .local_index import LocalIndex
+from .module_cache import CacheEntry
+from .pypi_client import PyPIClientPool
+from .resolver import AsyncResolver
+from .version_cache import VersionCache
 
 logger = logging.getLogger("plg-sdk")
 
 
 class ModuleManager:
     _modules: set[str] = set()
+    _clients: PyPIClientPool | None = None
+    _resolver = AsyncResolver(limit=8, request_timeout=5.0, budget=15.0)
 
     # region get module version
-    @staticmethod
-    def _get_version_via_pip_api(module: str) -> str | None:
+    @classmethod
+    def _client_pool(cls) -> PyPIClientPool:
+        # keep-alive соединения живут между проходами resolver
+        index_url = str(Config.get("config.plg-sdk.index_url", "https://pypi.org"))
+        if cls._clients is None or cls._clients.base_url != index_url:
+            if cls._clients is not None:
+                cls._clients.close()
+
+            cls._clients = PyPIClientPool(index_url, cls._resolver.limit)
+
+        return cls._clients
+
+    @classmethod
+    def _get_version_via_pip_api(
+        cls,
+        module: str,
+        known: CacheEntry | None = None,
+    ) -> CacheEntry | None:
         try:
-            with urllib.request.urlopen(
-                f"https://pypi.org/pypi/{module}/json",
-                timeout=5,
-            ) as resp:
-                return json.load(resp)["info"]["version"]
+            with cls._client_pool().client() as client:
+                result = client.get_version(
+                    module,
+                    known.etag if known is not None else "",
+                    known.last_modified if known is not None else "",
+                )
 
         except Exception as err:
             # Я не считаю что это должно быть именно error
@@ -29,13 +54,19 @@ class ModuleManager:
             logger.debug(f"Обращение к апи pip для модуля {module} не удалось\n{err}")
             return None
 
+        now = datetime.now(timezone.utc)
+        if result.not_modified and known is not None:
+            return CacheEntry(known.version, now, result.etag, result.last_modified)
+
+        if result.version is None:
+            return None
+
+        return CacheEntry(result.version, now, result.etag, result.last_modified)
+
     @staticmethod
     def _get_version_via_local_api(module: str) -> str | None:
         try:
-            return importlib.metadata.version(module)
-
-        except importlib.metadata.PackageNotFoundError:
-            return None
+            return LocalIndex.version(module)
 
         except Exception as err:
             # Аналогично тому что выше
@@ -43,6 +74,16 @@ class ModuleManager:
             logger.debug(f"Обращение к локали для модуля {module} не удалось\n{err}")
             return None
 
+    @staticmethod
+    def _importable(module: str) -> bool:
+        # Модуль без dist-info (PYTHONPATH, editable без метаданных, вендоринг)
+        # всё равно импортируется - ставить его заново на каждой сборке незачем
+        try:
+            return importlib.util.find_spec(module.replace("-", "_")) is not None
+
+        except (ImportError, ValueError):
+            return False
+
     # endregion
 
     @classmethod
@@ -50,42 +91,117 @@ class ModuleManager:
         cls._modules = modules.copy()
 
     @classmethod
-    def update_install_modules(cls, modules: set[str]) -> None:
+    def update_install_modules(cls, modules: set[str]) -> bool:
+        if not modules:
+            return True
+
+        backend = str(Config.get("config.plg-sdk.installer", "auto"))
+        cmd = [*installer_command(backend), "-U", *sorted(modules)]
+        logger.info(f"Установка модулей: {', '.join(sorted(modules))}")
+        logger.debug(" ".join(cmd))
+
         try:
-            subprocess.run(
-                [sys.executable, "-m", "pip", "install", "-U", *modules],
-                check=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
+            with Tracer.span("modules.install", backend=backend, modules=sorted(modules)):
+                proc = subprocess.run(cmd, check=False, capture_output=True, text=True)
 
         except Exception as err:
-            logger.debug(f"pip install для модулей {modules} не удался\n{err}")
-            return
+            logger.error(f"Установка модулей {modules} не удалась\n{err}")
+            return False
+
+        if proc.returncode != 0:
+            logger.error(
+                f"Установщик завершился с кодом {proc.returncode}\n"
+                f"{(proc.stderr or proc.stdout).strip()}"
+            )
+            return False
 
+        LocalIndex.invalidate()
         cls._modules.update(modules)
+        return True
 
     @classmethod
-    def request_pip_versions(cls) -> dict[str, str | None]:
-        out = {}
+    def plan(cls, update: bool = False) -> InstallPlan:
+        # Без update сеть не трогается: ставятся только отсутствующие модули
+        if update:
+            versions = cls.request_versions()
+
+        else:
+            versions = {
+                m: (local, None) for m, local in cls.request_local_versions().items()
+            }
+
+        # Версию такого модуля не узнать, поэтому он не обновляется
+        present = {
+            m
+            for m, (local, _) in versions.items()
+            if local is None and cls._importable(m)
+        }
+        if present:
+            logger.debug(
+                f"Модули без метаданных, но импортируются: {', '.join(sorted(present))}"
+            )
 
-        def _thread_func(module):
-            return module, cls._get_version_via_pip_api(module)
+        plan = plan_install(
+            {m: v for m, v in versions.items() if m not in present},
+            bool(Config.get("config.plg-sdk.auto_install", True)),
+            bool(Config.get("config.plg-sdk.auto_update", True)),
+        )
+        return InstallPlan(
+            plan.install, plan.upgrade, tuple(sorted((*plan.current, *present)))
+        )
 
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=min(4, len(cls._modules))
-        ) as pool:
-            futures = [pool.submit(_thread_func, module) for module in cls._modules]
-            for future in concurrent.futures.as_completed(futures):
-                module, version = future.result()
-                out[module] = version
+    @classmethod
+    def sync_modules(cls, update: bool = False) -> bool:
+        # Ставим только то, чего нет или что устарело, одним вызовом установщика
+        plan = cls.plan(update)
+        logger.debug(
+            "План установки модулей\n"
+            f"Установить: {', '.join(plan.install) or '-'}\n"
+            f"Обновить  : {', '.join(plan.upgrade) or '-'}\n"
+            f"Актуальны : {', '.join(plan.current) or '-'}"
+        )
+        return cls.update_install_modules(set(plan.targets))
+
+    @classmethod
+    def _fetch_pip_versions(
+        cls,
+        known: dict[str, CacheEntry | None],
+    ) -> dict[str, CacheEntry | None]:
+        return cls._resolver.run(
+            {
+                module: lambda m=module: cls._get_version_via_pip_api(m, known[m])
+                for module in known
+            }
+        )  # pyright: ignore[reportReturnType]
 
-        return out
+    @classmethod
+    def request_pip_versions(cls, force: bool = False) -> dict[str, str | None]:
+        return VersionCache.get(cls._modules, cls._fetch_pip_versions, force)
 
     @classmethod
     def request_local_versions(cls) -> dict[str, str | None]:
-        out = {}
-        for module in cls._modules:
-            out[module] = cls._get_version_via_local_api(module)
+        # Индекс строится один раз за проход, дальше это просто словарь
+        return {m: cls._get_version_via_local_api(m) for m in cls._modules}
+
+    @classmethod
+    def request_versions(
+        cls,
+        force: bool = False,
+    ) -> dict[str, tuple[str | None, str | None]]:
+        # Локальные и удалённые версии одновременно: (local, pip)
+        def _local():
+            with Tracer.span("modules.versions.local"):
+                return cls.request_local_versions()
+
+        def _pip():
+            with Tracer.span("modules.versions.pip", force=force):
+                return cls.request_pip_versions(force)
+
+        with Tracer.span("modules.versions"):
+            both = AsyncResolver(limit=2, request_timeout=cls._resolver.budget).run(
+                {"local": _local, "pip": _pip}
+            )
 
-        return out
+        local = both["local"] or {}
+        pip = both["pip"] or {}
+        return {module: (local.get(module), pip.get(module)) for module in cls._modules}
@@ -0,0 +1,156 @@
+import contextlib
+import gzip
+import http.client
+import json
+import queue
+import urllib.parse
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class LookupResult:
+    version: str | None  # None при 304 - версия та же что была
+    etag: str
+    last_modified: str
+    not_modified: bool = False
+
+
+class PyPIClient:
+    # Одно keep-alive соединение к индексу на клиента.
+    # Клиент не потокобезопасный, на каждый поток нужен свой
+
+    def __init__(self, base_url: str = "https://pypi.org", timeout: float = 5):
+        url = urllib.parse.urlsplit(base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"Некорректный адрес индекса: {base_url}")
+
+        self._https = url.scheme == "https"
+        self._host = url.hostname
+        self._port = url.port
+        self._prefix = url.path.rstrip("/")
+        self._timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            if self._https:
+                conn_cls = http.client.HTTPSConnection
+
+            else:
+                conn_cls = http.client.HTTPConnection
+
+            self._conn = conn_cls(self._host, self._port, timeout=self._timeout)
+
+        return self._conn
+
+    def _request(
+        self,
+        path: str,
+        headers: dict[str, str],
+    ) -> tuple[int, dict[str, str], bytes]:
+        # Сервер мог закрыть простаивающее соединение - одна попытка на переподключение
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                # Тело читаем целиком, иначе соединение нельзя переиспользовать
+                body = resp.read()
+                return resp.status, dict(resp.getheaders()), body
+
+            except (
+                http.client.RemoteDisconnected,
+                http.client.CannotSendRequest,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                self.close()
+                if attempt:
+                    raise
+
+            except Exception:
+                # Таймаут посреди ответа: соединение в неизвестном состоянии
+                self.close()
+                raise
+
+        raise RuntimeError("unreachable")
+
+    def get_version(
+        self,
+        module: str,
+        etag: str = "",
+        last_modified: str = "",
+    ) -> LookupResult:
+        headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive",
+        }
+        if etag:
+            headers["If-None-Match"] = etag
+
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        path = f"{self._prefix}/pypi/{urllib.parse.quote(module)}/json"
+        status, resp_headers, body = self._request(path, headers)
+        resp_headers = {k.lower(): v for k, v in resp_headers.items()}
+
+        new_etag = resp_headers.get("etag", etag)
+        new_last_modified = resp_headers.get("last-modified", last_modified)
+
+        if status == 304:
+            return LookupResult(None, new_etag, new_last_modified, True)
+
+        if status != 200:
+            raise http.client.HTTPException(f"HTTP {status} для {path}")
+
+        if resp_headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        version = json.loads(body)["info"]["version"]
+        return LookupResult(version, new_etag, new_last_modified)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class PyPIClientPool:
+    # Общие клиенты для всех потоков. Пул потоков у AsyncResolver свой на
+    # каждый проход, а соединения должны переживать его: клиент берётся
+    # из очереди на один запрос и возвращается обратно.
+    # LIFO - первым отдаётся самое свежее соединение, сервер его ещё не закрыл
+
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 5):
+        self.base_url = base_url
+        self._timeout = timeout
+        self._idle: queue.LifoQueue[PyPIClient] = queue.LifoQueue(maxsize=size)
+
+    @contextlib.contextmanager
+    def client(self) -> Iterator[PyPIClient]:
+        try:
+            client = self._idle.get_nowait()
+
+        except queue.Empty:
+            client = PyPIClient(self.base_url, self._timeout)
+
+        try:
+            yield client
+
+        finally:
+            try:
+                self._idle.put_nowait(client)
+
+            except queue.Full:
+                client.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+
+            except queue.Empty:
+                return
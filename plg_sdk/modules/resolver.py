@@ -0,0 +1,77 @@
+import asyncio
+import concurrent.futures
+import logging
+from collections.abc import Callable, Hashable
+from typing import Any
+
+logger = logging.getLogger("plg-sdk")
+
+
+class AsyncResolver:
+    # Гоняет блокирующие вызовы (http.client, importlib.metadata) на asyncio.
+    #   limit           - сколько вызовов идёт одновременно
+    #   request_timeout - дедлайн одного вызова
+    #   budget          - дедлайн на всё сразу, что не успело - None
+
+    def __init__(
+        self,
+        limit: int = 8,
+        request_timeout: float = 5.0,
+        budget: float = 15.0,
+    ):
+        self.limit = max(1, limit)
+        self.request_timeout = request_timeout
+        self.budget = budget
+
+    async def _resolve(
+        self,
+        calls: dict[Hashable, Callable[[], Any]],
+        pool: concurrent.futures.Executor,
+    ) -> dict[Hashable, Any]:
+        loop = asyncio.get_running_loop()
+        sem = asyncio.Semaphore(self.limit)
+        out: dict[Hashable, Any] = {key: None for key in calls}
+
+        async def _one(key: Hashable, call: Callable[[], Any]) -> None:
+            async with sem:
+                try:
+                    out[key] = await asyncio.wait_for(
+                        loop.run_in_executor(pool, call),
+                        self.request_timeout,
+                    )
+
+                except TimeoutError:
+                    logger.debug(f"{key}: превышен таймаут {self.request_timeout}с")
+
+                except Exception as err:
+                    logger.debug(f"{key}: {err}")
+
+        tasks = [asyncio.create_task(_one(key, call)) for key, call in calls.items()]
+        _, pending = await asyncio.wait(tasks, timeout=self.budget)
+
+        if pending:
+            logger.debug(
+                f"Бюджет {self.budget}с исчерпан, не дождались {len(pending)} запросов"
+            )
+            for task in pending:
+                task.cancel()
+
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return out
+
+    def run(self, calls: dict[Hashable, Callable[[], Any]]) -> dict[Hashable, Any]:
+        if not calls:
+            return {}
+
+        # Свой пул, а не дефолтный у loop: asyncio.run ждёт дефолтный пул при
+        # закрытии, и зависший запрос съел бы весь бюджет
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.limit, len(calls)),
+            thread_name_prefix="plg-sdk-resolve",
+        )
+        try:
+            return asyncio.run(self._resolve(calls, pool))
+
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,153 @@
+import logging
+import threading
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from ..core import Config
+from .module_cache import CacheEntry, ModulesCache
+
+logger = logging.getLogger("plg-sdk")
+
+# Получает известные записи кэша (для условных запросов), отдаёт новые.
+# None - получить версию не удалось
+Fetcher = Callable[[dict[str, CacheEntry | None]], dict[str, CacheEntry | None]]
+
+
+class VersionCache:
+    # Слой между ModuleManager и PyPI поверх ModulesCache.
+    #   age <= ttl          - отдаём из кэша, сеть не трогаем
+    #   age <= ttl + stale  - отдаём из кэша и обновляем в фоне
+    #   дальше / нет записи - запрашиваем синхронно
+
+    _entries: dict[str, CacheEntry] | None = None
+    _lock = threading.Lock()
+    _revalidating: set[str] = set()
+    _threads: list[threading.Thread] = []
+
+    @staticmethod
+    def ttl() -> int:
+        return int(Config.get("config.plg-sdk.version_cache_ttl", 3600))  # pyright: ignore[reportArgumentType]
+
+    @staticmethod
+    def stale() -> int:
+        return int(Config.get("config.plg-sdk.version_cache_stale", 86400))  # pyright: ignore[reportArgumentType]
+
+    @classmethod
+    def _load(cls) -> dict[str, CacheEntry]:
+        if cls._entries is None:
+            _, cls._entries = ModulesCache.load()
+
+        return cls._entries
+
+    @classmethod
+    def _store(cls, fetched: dict[str, CacheEntry | None]) -> None:
+        now = datetime.now(timezone.utc)
+
+        with cls._lock:
+            entries = dict(cls._load())
+            for module, entry in fetched.items():
+                # Неудачный запрос не кэшируем, иначе сетевой сбой залипнет на ttl
+                if entry is not None:
+                    entries[module] = entry
+
+            cls._entries = entries
+            ModulesCache.save(now, entries)
+
+    @classmethod
+    def invalidate(cls, modules: set[str] | None = None) -> None:
+        with cls._lock:
+            entries = dict(cls._load())
+            for module in list(entries) if modules is None else modules:
+                entries.pop(module, None)
+
+            cls._entries = entries
+            ModulesCache.save(datetime.now(timezone.utc), entries)
+
+    @classmethod
+    def get(
+        cls,
+        modules: set[str],
+        fetch: Fetcher,
+        force: bool = False,
+    ) -> dict[str, str | None]:
+        now = datetime.now(timezone.utc)
+        ttl = cls.ttl()
+        stale = cls.stale()
+        entries = cls._load()
+
+        out: dict[str, str | None] = {}
+        missing: set[str] = set()
+        revalidate: set[str] = set()
+
+        for module in modules:
+            entry = entries.get(module)
+            if force or entry is None:
+                missing.add(module)
+                continue
+
+            age = (now - entry.checked_at).total_seconds()
+            if age <= ttl:
+                out[module] = entry.version
+
+            elif age <= ttl + stale:
+                out[module] = entry.version
+                revalidate.add(module)
+
+            else:
+                missing.add(module)
+
+        logger.debug(
+            "Кэш версий модулей\n"
+            f"Свежие    : {len(out) - len(revalidate)}\n"
+            f"Устаревшие: {len(revalidate)}\n"
+            f"Запрос    : {len(missing)}"
+        )
+
+        if missing:
+            fetched = fetch({m: entries.get(m) for m in missing})
+            cls._store(fetched)
+            out.update(
+                {m: e.version if e is not None else None for m, e in fetched.items()}
+            )
+
+        if revalidate:
+            cls._revalidate({m: entries.get(m) for m in revalidate}, fetch)
+
+        return out
+
+    @classmethod
+    def _revalidate(
+        cls,
+        known: dict[str, CacheEntry | None],
+        fetch: Fetcher,
+    ) -> None:
+        with cls._lock:
+            modules = known.keys() - cls._revalidating
+            if not modules:
+                return
+
+            cls._revalidating |= modules
+
+        def _worker():
+            try:
+                cls._store(fetch({m: known[m] for m in modules}))
+
+            except Exception as err:
+                logger.debug(f"Фоновое обновление версий {modules} не удалось\n{err}")
+
+            finally:
+                with cls._lock:
+                    cls._revalidating -= modules
+
+        # Не daemon: процесс дождётся записи кэша перед выходом,
+        # но вызывающий код получает ответ сразу
+        thread = threading.Thread(target=_worker, name="plg-sdk-revalidate")
+        cls._threads.append(thread)
+        thread.start()
+
+    @classmethod
+    def join(cls, timeout: float | None = None) -> None:
+        for thread in cls._threads:
+            thread.join(timeout)
+
+        cls._threads = [t for t in cls._threads if t.is_alive()]
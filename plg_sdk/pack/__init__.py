@@ -0,0 +1,2 @@
+from .gma import GmaEntry, GmaMeta, PackError, crc32_combine
+from .packer import PackEntry, Packer, PackIndex, PackStats
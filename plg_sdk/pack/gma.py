@@ -0,0 +1,267 @@
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+# Формат аддона Garry's Mod, как его пишет gmad.
+#
+# HEADER:
+#   4 bytes    magic (GMAD)
+#   uint8      version (3)
+#   uint64 LE  steamid (0)
+#   uint64 LE  timestamp (unix)
+#   cstr[]     required content, список строк до пустой строки
+#   cstr       name
+#   cstr       description (JSON: description, type, tags)
+#   cstr       author
+#   int32 LE   addon version (1)
+
+# TABLE (repeat, до file_number = 0):
+#   uint32 LE  file_number (с 1)
+#   cstr       name (utf-8, posix, в нижнем регистре)
+#   int64 LE   size
+#   uint32 LE  crc32 содержимого
+
+# BODY:
+#   содержимое файлов подряд в порядке таблицы
+#   uint32 LE  crc32 всего, что выше
+
+MAGIC = b"GMAD"
+VERSION = 3
+CHUNK = 1 << 20
+
+_HEAD = struct.Struct("<4sBQQ")
+_ENTRY = struct.Struct("<qI")
+
+
+class PackError(Exception):
+    pass
+
+
+@dataclass(slots=True, frozen=True)
+class GmaMeta:
+    name: str
+    description: str
+    author: str
+    timestamp: int = 0
+    steamid: int = 0
+    addon_version: int = 1
+    required: tuple[str, ...] = ()
+
+
+@dataclass(slots=True, frozen=True)
+class GmaEntry:
+    name: str
+    size: int
+    crc: int
+
+
+# region crc
+# crc32(a + b) из crc32(a), crc32(b) и len(b) без чтения данных, как crc32_combine
+# в zlib: crc(a) умножается на x^(8 * len(b)) по модулю полинома
+_POLY = 0xEDB88320
+
+
+def _multmodp(a: int, b: int) -> int:
+    m = 1 << 31
+    p = 0
+    while True:
+        if a & m:
+            p ^= b
+            if not a & (m - 1):
+                break
+
+        m >>= 1
+        b = (b >> 1) ^ _POLY if b & 1 else b >> 1
+
+    return p
+
+
+# x^(2^n) по модулю полинома
+_X2N = [1 << 30]
+for _ in range(31):
+    _X2N.append(_multmodp(_X2N[-1], _X2N[-1]))
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    # x^(8 * len2): начинаем с x^(2^3) и идём по битам len2
+    p = 1 << 31
+    k = 3
+    while len2:
+        if len2 & 1:
+            p = _multmodp(_X2N[k & 31], p)
+
+        len2 >>= 1
+        k += 1
+
+    return _multmodp(p, crc1) ^ crc2
+
+
+# endregion
+
+
+# region encode
+def _cstr(value: str) -> bytes:
+    data = value.encode("utf-8")
+    if b"\0" in data:
+        raise PackError(f"Нулевой байт в строке заголовка: {value!r}")
+
+    return data + b"\0"
+
+
+def encode_head(meta: GmaMeta) -> bytes:
+    chunks = [_HEAD.pack(MAGIC, VERSION, meta.steamid, meta.timestamp)]
+    chunks += (_cstr(r) for r in meta.required)
+    chunks.append(b"\0")
+    chunks += (_cstr(meta.name), _cstr(meta.description), _cstr(meta.author))
+    chunks.append(struct.pack("<i", meta.addon_version))
+    return b"".join(chunks)
+
+
+def encode_table(entries: list[GmaEntry]) -> bytes:
+    chunks = []
+    for number, entry in enumerate(entries, 1):
+        chunks.append(struct.pack("<I", number))
+        chunks.append(_cstr(entry.name))
+        chunks.append(_ENTRY.pack(entry.size, entry.crc))
+
+    chunks.append(struct.pack("<I", 0))
+    return b"".join(chunks)
+
+
+def table_size(names: list[str]) -> int:
+    # Длина таблицы без её сборки: размер известен до crc файлов
+    return sum(4 + len(n.encode("utf-8")) + 1 + _ENTRY.size for n in names) + 4
+
+
+def archive_crc(head: bytes, entries: list[GmaEntry]) -> int:
+    crc = zlib.crc32(head)
+    for entry in entries:
+        crc = crc32_combine(crc, entry.crc, entry.size)
+
+    return crc
+
+
+# endregion
+
+
+# region decode
+def _read_cstr(f: BinaryIO) -> str:
+    out = bytearray()
+    while (c := f.read(1)) != b"\0":
+        if not c:
+            raise PackError("Архив оборван посреди строки")
+
+        out += c
+
+    return out.decode("utf-8", errors="replace")
+
+
+def read(path: Path) -> tuple[GmaMeta, list[GmaEntry], int]:
+    # Заголовок и таблица без содержимого. Третье значение - смещение данных
+    with open(path, "rb") as f:
+        head = f.read(_HEAD.size)
+        if len(head) < _HEAD.size:
+            raise PackError(f"Не архив gma: {path}")
+
+        magic, version, steamid, timestamp = _HEAD.unpack(head)
+        if magic != MAGIC:
+            raise PackError(f"Не архив gma: {path}")
+
+        if version > VERSION:
+            raise PackError(f"Версия gma {version} не поддерживается: {path}")
+
+        required = []
+        if version > 1:
+            while value := _read_cstr(f):
+                required.append(value)
+
+        name = _read_cstr(f)
+        description = _read_cstr(f)
+        author = _read_cstr(f)
+        (addon_version,) = struct.unpack("<i", f.read(4))
+
+        entries = []
+        while True:
+            (number,) = struct.unpack("<I", f.read(4))
+            if number == 0:
+                break
+
+            entry_name = _read_cstr(f)
+            size, crc = _ENTRY.unpack(f.read(_ENTRY.size))
+            entries.append(GmaEntry(entry_name, size, crc))
+
+        meta = GmaMeta(
+            name,
+            description,
+            author,
+            timestamp,
+            steamid,
+            addon_version,
+            tuple(required),
+        )
+        return meta, entries, f.tell()
+
+
+# endregion
+
+
+# region stream
+def stream_file(src: Path, out: BinaryIO, size: int) -> int:
+    # Ровно size байт из src в out кусками по CHUNK, crc считается по пути.
+    # Файл мог вырасти после stat - хвост не берём, в таблице уже size
+    crc = 0
+    left = size
+    with open(src, "rb") as f:
+        while left:
+            chunk = f.read(min(CHUNK, left))
+            if not chunk:
+                raise PackError(f"Файл укоротился во время упаковки: {src}")
+
+            crc = zlib.crc32(chunk, crc)
+            out.write(chunk)
+            left -= len(chunk)
+
+    return crc
+
+
+def copy_range(src: BinaryIO, out: BinaryIO, offset: int, size: int) -> None:
+    # Кусок старого архива в новый. copy_file_range копирует внутри ядра,
+    # а на btrfs/xfs просто разделяет экстенты. Позиция out - конец куска
+    out.flush()
+    dst_offset = out.tell()
+    done = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while done < size:
+                n = os.copy_file_range(
+                    src.fileno(),
+                    out.fileno(),
+                    size - done,
+                    offset + done,
+                    dst_offset + done,
+                )
+                if n == 0:
+                    break
+
+                done += n
+
+        except OSError:
+            # EXDEV на старых ядрах, EINVAL на части ФС - копируем сами
+            pass
+
+    src.seek(offset + done)
+    out.seek(dst_offset + done)
+    left = size - done
+    while left:
+        chunk = src.read(min(CHUNK, left))
+        if not chunk:
+            raise PackError("Старый архив короче своей таблицы")
+
+        out.write(chunk)
+        left -= len(chunk)
+
+
+# endregion
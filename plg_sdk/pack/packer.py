@@ -0,0 +1,402 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from ..build.ignore import IgnoreRules
+from ..build.scanner import SourceTree
+from ..core import Config, ConfigSnapshot
+from ..core.trace import Tracer
+from . import gma
+from .gma import GmaEntry, GmaMeta, PackError
+
+logger = logging.getLogger("plg-sdk")
+
+
+@dataclass(slots=True, frozen=True)
+class PackEntry:
+    name: str  # путь внутри архива
+    source: str  # откуда взят
+    size: int
+    mtime_ns: int
+    crc: int
+
+
+@dataclass(slots=True, frozen=True)
+class PackStats:
+    mode: str  # actual, patch, rebuild, full
+    files: int
+    streamed: int  # прочитано из источников
+    copied: int  # взято из старого архива
+    size: int
+
+
+class PackIndex:
+    # Что лежит в .gma и откуда взято. Файлы с тем же size + mtime источника
+    # не перечитываются: их байты и crc берутся из старого архива.
+    # Индекс действует, только пока архив не трогали снаружи
+
+    MAGIC = b"PLGP"
+    VERSION = 1
+
+    # HEADER:
+    #   4 bytes    magic (PLGP)
+    #   uint16 LE  version
+    #   uint32 LE  entries_len
+    #   16 bytes   digest пути архива
+    #   uint64 LE  размер архива
+    #   int64 LE   mtime_ns архива
+    #   uint32 LE  длина заголовка gma до таблицы
+
+    # BODY (repeat entries_len, в порядке таблицы архива):
+    #   uint16 LE  name_len
+    #   uint16 LE  source_len
+    #   int64 LE   size
+    #   int64 LE   mtime_ns источника
+    #   uint32 LE  crc32
+    #   bytes      name (utf-8)
+    #   bytes      source (utf-8)
+
+    _HEADER = struct.Struct("<4sHI16sQqI")
+    _ENTRY = struct.Struct("<HHqqI")
+
+    @staticmethod
+    def path() -> Path:
+        return Config.sdk_path() / "cache/pack_index.bin"
+
+    @staticmethod
+    def _target_digest(target: Path) -> bytes:
+        return hashlib.blake2b(str(target).encode("utf-8"), digest_size=16).digest()
+
+    @classmethod
+    def load(cls, target: Path) -> tuple[list[PackEntry], int] | None:
+        # (записи, длина заголовка gma) или None, если индекс не про этот архив
+        try:
+            data = cls.path().read_bytes()
+            st = target.stat()
+
+        except OSError:
+            return None
+
+        if len(data) < cls._HEADER.size:
+            return None
+
+        magic, version, count, digest, size, mtime_ns, head_len = (
+            cls._HEADER.unpack_from(data, 0)
+        )
+        if (
+            magic != cls.MAGIC
+            or version != cls.VERSION
+            or digest != cls._target_digest(target)
+            or (size, mtime_ns) != (st.st_size, st.st_mtime_ns)
+        ):
+            return None
+
+        entries = []
+        pos = cls._HEADER.size
+        for _ in range(count):
+            if pos + cls._ENTRY.size > len(data):
+                return None
+
+            name_len, source_len, e_size, e_mtime, crc = cls._ENTRY.unpack_from(
+                data, pos
+            )
+            pos += cls._ENTRY.size
+            end = pos + name_len + source_len
+            if end > len(data):
+                return None
+
+            name = data[pos : pos + name_len].decode("utf-8")
+            source = data[pos + name_len : end].decode("utf-8")
+            pos = end
+            entries.append(PackEntry(name, source, e_size, e_mtime, crc))
+
+        return entries, head_len
+
+    @classmethod
+    def save(cls, target: Path, entries: list[PackEntry], head_len: int) -> None:
+        path = cls.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        st = target.stat()
+
+        chunks = [
+            cls._HEADER.pack(
+                cls.MAGIC,
+                cls.VERSION,
+                len(entries),
+                cls._target_digest(target),
+                st.st_size,
+                st.st_mtime_ns,
+                head_len,
+            )
+        ]
+        for entry in entries:
+            name_b = entry.name.encode("utf-8")
+            source_b = entry.source.encode("utf-8")
+            chunks.append(
+                cls._ENTRY.pack(
+                    len(name_b), len(source_b), entry.size, entry.mtime_ns, entry.crc
+                )
+            )
+            chunks += (name_b, source_b)
+
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(chunks))
+        os.replace(tmp, path)
+
+    @classmethod
+    def drop(cls) -> None:
+        cls.path().unlink(missing_ok=True)
+
+
+def _offsets(head_len: int, entries: list[PackEntry]) -> dict[str, int]:
+    offset = head_len + gma.table_size([e.name for e in entries])
+    out = {}
+    for entry in entries:
+        out[entry.name] = offset
+        offset += entry.size
+
+    return out
+
+
+class Packer:
+    # Упаковка PATHS.out_dir и PACK.assets в .gma.
+    # Файлы идут в архив кусками, crc считается по пути, таблица
+    # дописывается в конце перемоткой назад. Повторная упаковка:
+    #   patch   - набор и размеры файлов те же: изменённые файлы
+    #             переписываются на своих местах прямо в архиве
+    #   rebuild - новый архив, но неизменённые файлы копируются
+    #             из старого (copy_file_range), а не читаются заново
+
+    @staticmethod
+    def _meta(snapshot: ConfigSnapshot) -> GmaMeta:
+        # description - JSON как у gmad из addon.json
+        description = json.dumps(
+            {
+                "description": snapshot.pack_description,
+                "type": snapshot.pack_type,
+                "tags": list(snapshot.pack_tags),
+            },
+            ensure_ascii=False,
+            indent=4,
+        )
+        return GmaMeta(
+            snapshot.name or "",
+            description,
+            snapshot.author or "",
+            int(time.time()),
+        )
+
+    @staticmethod
+    def collect(snapshot: ConfigSnapshot) -> dict[str, tuple[Path, int, int]]:
+        # имя в архиве -> (источник, size, mtime_ns)
+        if not snapshot.out_dir.is_dir():
+            raise PackError(
+                f"PATHS.out_dir не найдена: {snapshot.out_dir}\n"
+                "Сначала соберите проект: plg-sdk build"
+            )
+
+        rules = IgnoreRules(list(snapshot.pack_ignore))
+        files: dict[str, tuple[Path, int, int]] = {}
+        clashes: list[str] = []
+        for root in (snapshot.out_dir, *snapshot.pack_assets):
+            if not root.is_dir():
+                raise PackError(f"PACK.assets: папка не найдена: {root}")
+
+            for rel, _ in SourceTree(root, rules).walk():
+                full = root / rel
+                if full == snapshot.pack_file:
+                    continue
+
+                # gmad приводит пути к нижнему регистру, сервера на linux
+                # иначе не находят файлы
+                name = rel.lower()
+                if name in files:
+                    clashes.append(f"{name}: {files[name][0]} и {full}")
+                    continue
+
+                try:
+                    st = full.stat()
+
+                except FileNotFoundError:
+                    continue
+
+                files[name] = (full, st.st_size, st.st_mtime_ns)
+
+        if clashes:
+            raise PackError(
+                "В архив попадают файлы с одинаковыми путями:\n" + "\n".join(clashes)
+            )
+
+        return files
+
+    @classmethod
+    def pack(cls, full: bool = False) -> PackStats:
+        snapshot = Config.snapshot()
+        target = snapshot.pack_file
+
+        with Tracer.span("pack.scan"):
+            files = cls.collect(snapshot)
+
+        previous = None if full else PackIndex.load(target)
+        old_entries, old_head_len = previous or ([], 0)
+        old = {e.name: e for e in old_entries}
+
+        # Порядок старого архива сохраняется, новые файлы идут в конец
+        order = [e.name for e in old_entries if e.name in files]
+        order += sorted(files.keys() - old.keys())
+
+        entries: list[PackEntry] = []
+        fresh: set[str] = set()
+        for name in order:
+            path, size, mtime_ns = files[name]
+            prev = old.get(name)
+            if (
+                prev is not None
+                and prev.source == str(path)
+                and (prev.size, prev.mtime_ns) == (size, mtime_ns)
+            ):
+                entries.append(prev)
+
+            else:
+                entries.append(PackEntry(name, str(path), size, mtime_ns, 0))
+                fresh.add(name)
+
+        meta = cls._meta(snapshot)
+        head = gma.encode_head(meta)
+        same_layout = (
+            previous is not None
+            and len(head) == old_head_len
+            and [(e.name, e.size) for e in entries]
+            == [(e.name, e.size) for e in old_entries]
+        )
+
+        if same_layout and not fresh and cls._same_head(target, head):
+            return PackStats("actual", len(entries), 0, 0, target.stat().st_size)
+
+        mode = "patch" if same_layout else ("rebuild" if previous else "full")
+        logger.debug(
+            f"Файлов в архиве: {len(entries)}\n"
+            f"Изменено       : {len(fresh)}\n"
+            f"Режим          : {mode}"
+        )
+        with Tracer.span("pack.write", mode=mode, files=len(entries)):
+            if mode == "patch":
+                entries = cls._patch(target, head, entries, fresh)
+
+            else:
+                entries = cls._rebuild(
+                    target, head, entries, fresh, old_entries, old_head_len
+                )
+
+        PackIndex.save(target, entries, len(head))
+        copied = len(entries) - len(fresh) if mode == "rebuild" else 0
+        return PackStats(mode, len(entries), len(fresh), copied, target.stat().st_size)
+
+    @staticmethod
+    def _same_head(target: Path, head: bytes) -> bool:
+        # Заголовок тот же с точностью до timestamp (байты 13..21)
+        try:
+            with open(target, "rb") as f:
+                old = f.read(len(head))
+
+        except OSError:
+            return False
+
+        return old[:13] + old[21:] == head[:13] + head[21:]
+
+    @staticmethod
+    def _finish(
+        out: BinaryIO,
+        head: bytes,
+        entries: list[PackEntry],
+        end: int,
+    ) -> None:
+        # Таблица с готовыми crc поверх заглушки, crc архива без перечитывания
+        gma_entries = [GmaEntry(e.name, e.size, e.crc) for e in entries]
+        table = gma.encode_table(gma_entries)
+        out.seek(0)
+        out.write(head)
+        out.write(table)
+
+        out.seek(end)
+        out.write(struct.pack("<I", gma.archive_crc(head + table, gma_entries)))
+        out.truncate()
+
+    @classmethod
+    def _patch(
+        cls,
+        target: Path,
+        head: bytes,
+        entries: list[PackEntry],
+        fresh: set[str],
+    ) -> list[PackEntry]:
+        # Прерванная правка оставит архив без индекса - следующая упаковка полная
+        PackIndex.drop()
+        offsets = _offsets(len(head), entries)
+        out_entries = []
+        with open(target, "r+b") as out:
+            for entry in entries:
+                if entry.name in fresh:
+                    out.seek(offsets[entry.name])
+                    crc = gma.stream_file(Path(entry.source), out, entry.size)
+                    entry = PackEntry(
+                        entry.name, entry.source, entry.size, entry.mtime_ns, crc
+                    )
+
+                out_entries.append(entry)
+
+            end = len(head) + gma.table_size([e.name for e in entries])
+            end += sum(e.size for e in entries)
+            cls._finish(out, head, out_entries, end)
+
+        return out_entries
+
+    @classmethod
+    def _rebuild(
+        cls,
+        target: Path,
+        head: bytes,
+        entries: list[PackEntry],
+        fresh: set[str],
+        old_entries: list[PackEntry],
+        old_head_len: int,
+    ) -> list[PackEntry]:
+        # Новый архив рядом со старым и атомарная подмена в конце
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".plg-tmp")
+        old_offsets = _offsets(old_head_len, old_entries)
+        reuse = open(target, "rb") if old_entries else contextlib.nullcontext()
+        out_entries = []
+        try:
+            with open(tmp, "wb") as out, reuse as src:
+                out.write(head)
+                out.write(b"\0" * gma.table_size([e.name for e in entries]))
+
+                for entry in entries:
+                    if entry.name in fresh:
+                        crc = gma.stream_file(Path(entry.source), out, entry.size)
+                        entry = PackEntry(
+                            entry.name, entry.source, entry.size, entry.mtime_ns, crc
+                        )
+
+                    else:
+                        gma.copy_range(src, out, old_offsets[entry.name], entry.size)
+
+                    out_entries.append(entry)
+
+                cls._finish(out, head, out_entries, out.tell())
+
+            os.replace(tmp, target)
+
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        return out_entries
@@ -0,0 +1,129 @@
+import os
+
+from plg_sdk.build.builder import Builder
+from plg_sdk.build.store import ArtifactStore, artifact_key
+
+
+def _stage(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    return {rel: root / rel for rel in files}
+
+
+def test_store_roundtrip_and_materialize(tmp_path):
+    store = ArtifactStore(tmp_path / "store", 1 << 20)
+    key = artifact_key("py2glua", "1.0", b"c" * 16, "a.py", b"s" * 16)
+
+    assert store.get(key) is None
+
+    staged = _stage(tmp_path / "stage", {"lua/a.lua": b"print(1)"})
+    store.put(key, staged)
+
+    artifact = store.get(key)
+    assert artifact is not None
+    assert [f.path for f in artifact] == ["lua/a.lua"]
+
+    out = tmp_path / "out"
+    store.materialize(artifact, out)
+    store.materialize(artifact, out)
+    assert (out / "lua/a.lua").read_bytes() == b"print(1)"
+    assert sorted(os.listdir(out / "lua")) == ["a.lua"]
+
+
+def test_materialize_never_shares_blob_with_outputs(tmp_path):
+    store = ArtifactStore(tmp_path / "store", 1 << 20)
+    key = artifact_key("py2glua", "1.0", b"c" * 16, "a.py", b"s" * 16)
+    (artifact,) = store.put(key, _stage(tmp_path / "stage", {"a.lua": b"print(1)"}))
+    blob = store._blob(artifact.digest)
+    out = tmp_path / "out"
+
+    # hardlink на блоб из старой сборки развязывается
+    out.mkdir()
+    os.link(blob, out / "a.lua")
+    assert store.materialize([artifact], out) == 1
+    assert not os.path.samefile(blob, out / "a.lua")
+    assert os.access(out / "a.lua", os.W_OK)
+
+    # Запись в вывод на месте не трогает кэш
+    with open(out / "a.lua", "r+b") as f:
+        f.write(b"PWNED!!!")
+
+    assert blob.read_bytes() == b"print(1)"
+    assert store.materialize([artifact], out) == 1
+    assert (out / "a.lua").read_bytes() == b"print(1)"
+
+
+def test_key_depends_on_path_and_imports():
+    base = artifact_key("m", "1", b"c" * 16, "a.py", b"s" * 16, [b"d" * 16])
+
+    assert base != artifact_key("m", "1", b"c" * 16, "b.py", b"s" * 16, [b"d" * 16])
+    assert base != artifact_key("m", "1", b"c" * 16, "a.py", b"s" * 16, [b"e" * 16])
+    assert base != artifact_key("m", "2", b"c" * 16, "a.py", b"s" * 16, [b"d" * 16])
+
+
+def test_evict_drops_least_recently_used(tmp_path):
+    store = ArtifactStore(tmp_path / "store", 10)
+
+    keys = []
+    for i in range(3):
+        key = artifact_key("m", "1", b"c" * 16, f"{i}.py", b"s" * 16)
+        staged = _stage(tmp_path / f"stage{i}", {f"{i}.lua": bytes([i]) * 4})
+        store.put(key, staged)
+
+        record = store._record(key)
+        os.utime(record, ns=(i * 10**9, i * 10**9))
+        keys.append(key)
+
+    # Старый артефакт использовали последним
+    store.get(keys[0])
+
+    assert store.evict() == 4
+    assert store.get(keys[0]) is not None
+    assert store.get(keys[1]) is None
+    assert store.get(keys[2]) is not None
+
+
+def test_evict_scans_only_over_budget(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path / "store", 10)
+    assert store.size() is None
+
+    def _put(i):
+        key = artifact_key("m", "1", b"c" * 16, f"{i}.py", b"s" * 16)
+        store.put(key, _stage(tmp_path / f"stage{i}", {f"{i}.lua": bytes([i]) * 4}))
+
+    # Счётчика нет - первый evict обходит стор и создаёт его
+    _put(0)
+    assert store.evict() == 0
+    assert store.size() == 4
+
+    scans = []
+    prune = store.prune
+    monkeypatch.setattr(store, "prune", lambda: scans.append(1) or prune())
+
+    # В бюджете - только счётчик, без обхода
+    _put(1)
+    assert store.size() == 8
+    assert store.evict() == 0
+    assert scans == []
+
+    # Новый экземпляр (следующая сборка) видит сохранённый счётчик
+    assert ArtifactStore(tmp_path / "store", 10).size() == 8
+
+    # Вылезли за max_bytes - полный обход, счётчик снова точный
+    _put(2)
+    assert store.evict() == 4
+    assert scans == [1]
+    assert store.size() == 8
+
+
+def test_attribute_outputs_to_sources():
+    out = Builder._attribute(
+        ["lua/ns/pkg/a.lua", "lua/ns/b.lua", "lua/ns/runtime.lua"],
+        ["pkg/a.py", "b.py"],
+    )
+
+    assert out["pkg/a.py"] == ["lua/ns/pkg/a.lua", "lua/ns/runtime.lua"]
+    assert out["b.py"] == ["lua/ns/b.lua", "lua/ns/runtime.lua"]
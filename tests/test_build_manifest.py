@@ -0,0 +1,77 @@
+import os
+
+from plg_sdk.build.deps import ImportIndex, build_graph, dependents
+from plg_sdk.build.manifest import BuildManifest
+
+
+def test_manifest_roundtrip_and_diff(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "source"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg/__init__.py").write_text("")
+    (src / "pkg/a.py").write_text("x = 1\n")
+    (src / "b.py").write_text("from pkg import a\n")
+
+    first = BuildManifest.scan(src, {})
+    outputs = {"b.py": {"py2glua": ("lua/b.lua", "lua/b_cl.lua")}}
+    BuildManifest.save(first, b"c" * 16, outputs)
+    assert BuildManifest.load() == (first, b"c" * 16, outputs)
+
+    # touch без изменения контента не считается изменением
+    st = (src / "b.py").stat()
+    os.utime(src / "b.py", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    (src / "pkg/a.py").write_text("x = 2\n")
+    (src / "c.py").write_text("")
+
+    second = BuildManifest.scan(src, first)
+    diff = BuildManifest.diff(first, second)
+    assert diff.changed == {"pkg/a.py"}
+    assert diff.added == {"c.py"}
+    assert diff.removed == set()
+
+
+def test_dependents_follow_imports(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg/__init__.py").write_text("")
+    (tmp_path / "pkg/a.py").write_text("")
+    (tmp_path / "pkg/b.py").write_text("from . import a\n")
+    (tmp_path / "c.py").write_text("import pkg.b\n")
+    (tmp_path / "d.py").write_text("")
+
+    files = {"pkg/__init__.py", "pkg/a.py", "pkg/b.py", "c.py", "d.py"}
+    graph = build_graph(tmp_path, files)
+
+    assert dependents(graph, {"pkg/a.py"}) == {"pkg/b.py", "c.py"}
+    assert dependents(graph, {"d.py"}) == set()
+
+
+def test_import_index_parses_only_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "source"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg/__init__.py").write_text("")
+    (src / "pkg/a.py").write_text("x = 1\n")
+    (src / "b.py").write_text('"""doc"""\nfrom pkg import (\n    a,\n)\n')
+    (src / "c.py").write_text("import b\n")
+    (src / "data.json").write_text("{}")
+
+    def edges(rel, data):
+        return ["data.json"] if rel == "pkg/a.py" else []
+
+    entries = BuildManifest.scan(src, {})
+    index = ImportIndex.load({"mod": edges}, b"t" * 16)
+    assert index.update(src, entries) == 5
+    index.save()
+
+    graph = index.graph()
+    assert graph.imports["b.py"] == {"pkg/__init__.py", "pkg/a.py"}
+    assert graph.dependents({"data.json"}) == {"pkg/a.py", "b.py", "c.py"}
+    assert graph.closure("c.py") == {"b.py", "pkg/__init__.py", "pkg/a.py", "data.json"}
+
+    (src / "c.py").write_text("import pkg\n")
+    index = ImportIndex.load({"mod": edges}, b"t" * 16)
+    assert index.update(src, BuildManifest.scan(src, entries)) == 1
+    assert index.graph().dependents({"b.py"}) == set()
+
+    # Другой набор провайдеров - индекс строится заново
+    assert ImportIndex.load({}, b"u" * 16).entries == {}
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from plg_sdk.build import builder
+from plg_sdk.build.pipeline import IOPool
+from plg_sdk.build.scheduler import BuildScheduler
+from plg_sdk.core import Config, Tracer
+
+
+def _square(x):
+    return x * x
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_scheduler_runs_dag(jobs):
+    scheduler = BuildScheduler(jobs)
+    scheduler.add("root", _square, 2)
+    scheduler.add("a", _square, 3, deps=("root",))
+    scheduler.add("b", _square, 4, deps=("root",))
+    scheduler.add("bad", _fail)
+    scheduler.add("after_bad", _square, 5, deps=("bad",))
+
+    result = scheduler.run()
+
+    assert result.results == {"root": 4, "a": 9, "b": 16}
+    assert set(result.errors) == {"bad"}
+    assert result.skipped == {"after_bad"}
+    assert not result.ok
+
+
+def test_scheduler_rejects_cycle():
+    scheduler = BuildScheduler()
+    scheduler.add("a", _square, 1, deps=("b",))
+    scheduler.add("b", _square, 1, deps=("a",))
+
+    with pytest.raises(ValueError):
+        scheduler.run()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_scheduler_traces_units(tmp_path, jobs):
+    Tracer.enable()
+    try:
+        scheduler = BuildScheduler(jobs)
+        scheduler.add("a", _square, 3)
+        scheduler.add("b", _square, 4, deps=("a",))
+        scheduler.add("bad", _fail)
+
+        with Tracer.span("build"):
+            result = scheduler.run()
+
+        # Обёртка трейса не видна в результатах
+        assert result.results == {"a": 9, "b": 16}
+        assert {name for name, _, _ in Tracer.slowest(cat="unit")} == {"a", "b"}
+
+        path = Tracer.save(tmp_path, "build")
+
+    finally:
+        Tracer.disable()
+
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert spans["b"]["ts"] >= spans["a"]["ts"] + spans["a"]["dur"]
+    assert spans["build"]["cat"] == "sdk"
+    assert "wait_ms" in spans["a"]["args"]
+    assert [e["name"] for e in events if e["ph"] == "i"] == ["bad"]
+
+
+def _nothing():
+    return None
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_scheduler_passes_none_results(jobs):
+    scheduler = BuildScheduler(jobs)
+    scheduler.add("check", _nothing)
+    scheduler.add("a", _square, 3, deps=("check",))
+
+    seen = []
+    result = scheduler.run(lambda key, value: seen.append((key, value)))
+
+    assert sorted(seen, key=str) == [("a", 9), ("check", None)]
+    assert result.results == {"check": None, "a": 9}
+    assert result.ok
+
+
+def test_compile_collects_failed_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Config.init()
+
+    def _run(module, batch, digest, out_dir):
+        if "bad.py" in batch:
+            return False, "bad.py: ошибка компиляции"
+
+        return True, ""
+
+    # check_module возвращает None, как настоящий
+    monkeypatch.setattr(builder, "check_module", lambda module: None)
+    monkeypatch.setattr(builder, "run_compiler", _run)
+    monkeypatch.setattr(builder, "runs_in_process", lambda module, snapshot: True)
+
+    io = IOPool(1)
+    failed, batches = builder.Builder._compile(
+        {"fake": ["bad.py", "ok.py"]},
+        Config.snapshot(),
+        1,
+        None,
+        io,
+    )
+    io.close()
+
+    assert failed == {"bad.py", "ok.py"}
+    assert list(batches) == ["compile:fake:0"]
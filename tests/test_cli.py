@@ -0,0 +1,75 @@
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+from plg_sdk.cli.main import _build_parser
+
+# Команда -> то, что main импортирует лениво внутри её ветки
+_TARGETS = {
+    "init": [("plg_sdk.cli.init_cmd", "init_cmd")],
+    "version": [],
+    "config-validate": [("plg_sdk.core", "ConfigValidator")],
+    "build": [
+        ("plg_sdk.cli.build_cmd", "build_cmd"),
+        ("plg_sdk.build.compiler", "compiler_modules"),
+        ("plg_sdk.modules.module_manager", "ModuleManager"),
+    ],
+    "watch": [("plg_sdk.cli.watch_cmd", "watch_cmd")],
+    "pack": [("plg_sdk.cli.pack_cmd", "pack_cmd")],
+    "cache-prune": [("plg_sdk.cli.cache_cmd", "cache_prune_cmd")],
+}
+
+_HEAVY = (
+    "colorama",
+    "tomllib",
+    "plg_sdk.core",
+    "plg_sdk.build",
+    "plg_sdk.modules",
+    "plg_sdk.pack",
+    "plg_sdk.cli.log",
+)
+
+
+def test_parser_knows_every_command():
+    sub = next(a for a in _build_parser()._actions if a.dest == "cmd")
+    assert set(sub.choices) == set(_TARGETS)
+
+
+@pytest.mark.parametrize("cmd", sorted(_TARGETS))
+def test_command_resolves(cmd):
+    assert _build_parser().parse_args([cmd]).cmd == cmd
+    for module, attr in _TARGETS[cmd]:
+        assert callable(getattr(importlib.import_module(module), attr))
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["build", "--help"], ["version"]])
+def test_light_commands_skip_heavy_imports(argv):
+    code = (
+        "import sys\n"
+        "from plg_sdk.cli.main import main\n"
+        f"sys.argv = ['plg-sdk', *{argv!r}]\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"heavy = {_HEAVY!r}\n"
+        "print(sorted(m for m in sys.modules if m.startswith(heavy)), file=sys.stderr)\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert proc.stderr.strip() == "[]"
+
+
+def test_main_module_runs():
+    proc = subprocess.run(
+        [sys.executable, "-m", "plg_sdk.cli.main", "version"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert proc.returncode == 0
+    assert proc.stdout.strip()
@@ -0,0 +1,90 @@
+from importlib.metadata import EntryPoint
+
+import pytest
+
+from plg_sdk.build import compiler
+from plg_sdk.core import Config
+
+
+def compile_batch(source_dir, out_dir, files):
+    for rel in files:
+        out = out_dir / "lua" / (rel[:-3] + ".lua")
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text("-- " + (source_dir / rel).read_text())
+
+    print("batch", len(files))
+    return "ok"
+
+
+def broken(source_dir, out_dir, files):
+    raise ValueError("boom")
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source").mkdir()
+    (tmp_path / "source/a.py").write_text("x = 1\n")
+
+    # Тот же модуль без точки входа: python -m fake из cwd
+    (tmp_path / "fake").mkdir()
+    (tmp_path / "fake/__main__.py").write_text("print('subprocess')\n")
+
+    monkeypatch.setattr(
+        compiler,
+        "_entry_points",
+        {
+            name: EntryPoint(name, f"{__name__}:{fn}", compiler.ENTRY_POINT_GROUP)
+            for name, fn in (("fake", "compile_batch"), ("broken", "broken"))
+        },
+    )
+    monkeypatch.setattr(compiler, "_runners", {})
+
+    Config.init()
+    return tmp_path
+
+
+def test_runner_loaded_once_and_called_in_process(project):
+    snapshot = Config.snapshot()
+    compiler.init_worker(snapshot)
+    assert compiler.runs_in_process("fake", snapshot)
+
+    for i in range(2):
+        ok, output = compiler.run_compiler(
+            "fake", ["a.py"], snapshot.full_digest, str(project / f"out{i}")
+        )
+        assert ok
+        assert output == "batch 1\nok"
+        assert (project / f"out{i}/lua/a.lua").read_text() == "-- x = 1\n"
+
+    assert list(compiler._runners) == ["fake"]
+
+    ok, output = compiler.run_compiler("broken", ["a.py"], snapshot.full_digest, "out")
+    assert not ok
+    assert "ValueError: boom" in output
+
+
+def test_isolated_falls_back_to_subprocess(project):
+    Config.set("config.build.isolated", True)
+    snapshot = Config.snapshot()
+    compiler.init_worker(snapshot)
+    assert not compiler.runs_in_process("fake", snapshot)
+
+    ok, output = compiler.run_compiler("fake", ["a.py"], snapshot.full_digest, "out")
+    assert ok
+    assert output == "subprocess"
+    assert compiler._runners == {}
+
+
+def test_worker_rejects_snapshot_differing_only_in_isolated(project):
+    snapshot = Config.snapshot()
+    compiler.init_worker(snapshot)
+
+    Config.set("config.build.isolated", True)
+    isolated = Config.snapshot()
+    # На вывод isolated не влияет, но воркеру нужен именно новый снимок
+    assert isolated.digest == snapshot.digest
+    assert isolated != snapshot
+
+    with pytest.raises(RuntimeError):
+        compiler.run_compiler("fake", ["a.py"], isolated.full_digest, "out")
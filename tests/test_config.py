@@ -0,0 +1,151 @@
+import os
+import pickle
+
+import pytest
+
+from plg_sdk.core import Config, ConfigSnapshot, ConfigValidator, RuleRegistry
+
+
+def test_flat_store_and_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "plg-sdk-config.toml").write_text(
+        '[PROJECT]\nname = "demo"\nauthor = "me"\n\n[BUILD]\nparallel = false\n',
+        encoding="utf-8",
+    )
+    Config.init()
+
+    assert Config.get("config.project.name") == "demo"
+    assert Config.get("config.PROJECT.name") == "demo"
+    assert Config.get("config.build.parallel") is False
+    assert Config.get("config.nope.key", 1) == 1
+
+    # Не лист отдаётся вложенным видом
+    project = Config.get("config.project")
+    assert project["name"] == "demo"
+
+    snapshot = Config.snapshot()
+    assert isinstance(snapshot, ConfigSnapshot)
+    assert snapshot.namespace == "demo_me"
+    assert snapshot.source_dir.is_absolute()
+    assert snapshot.parallel is False
+
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert restored.name == "demo"
+    assert restored.allowed_modules == snapshot.allowed_modules
+
+
+def test_snapshot_frozen_and_digest_stable(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Config.init()
+    snapshot = Config.snapshot()
+
+    with pytest.raises(AttributeError):
+        snapshot.name = "other"
+
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert restored == snapshot
+    assert restored.digest == snapshot.digest
+    assert len(pickle.dumps(snapshot)) < 512
+
+    # parallel не влияет на артефакты, name влияет
+    Config.set("config.build.parallel", not snapshot.parallel)
+    assert Config.snapshot().digest == snapshot.digest
+
+    # out_dir пересобирает вывод, но ключи артефактов не трогает
+    Config.set("config.paths.out_dir", "./elsewhere")
+    moved = Config.snapshot()
+    assert moved.digest != snapshot.digest
+    assert moved.artifact_digest == snapshot.artifact_digest
+    assert restored.artifact_digest == snapshot.artifact_digest
+
+    Config.set("config.project.name", "other")
+    assert Config.snapshot().digest != moved.digest
+    assert Config.snapshot().artifact_digest != snapshot.artifact_digest
+
+
+def test_reload_reports_changed_keys_and_modules(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config_file = tmp_path / "plg-sdk-config.toml"
+    config_file.write_text(
+        '[PROJECT]\nname = "demo"\nauthor = "me"\nversion = "1.0"\n\n'
+        '[MODULES]\nallowed = ["py2glua"]\n',
+        encoding="utf-8",
+    )
+    Config.init()
+    ConfigValidator.validate()
+    assert not ConfigValidator.errors()
+
+    # touch без изменения содержимого
+    st = config_file.stat()
+    os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert Config.reload() is None
+
+    config_file.write_text(
+        '[PROJECT]\nname = "de mo"\nauthor = "me"\nversion = "1.0"\n\n'
+        '[MODULES]\nallowed = ["py2glua"]\n\n[BUILD]\nparallel = false\n',
+        encoding="utf-8",
+    )
+    change = Config.reload()
+    assert change is not None
+    assert change.keys == {"config.project.name", "config.build.parallel"}
+    assert change.modules == {"py2glua"}
+
+    before = ConfigValidator._results["plg-sdk.installer"]
+    ConfigValidator.validate(change.keys)
+    assert ConfigValidator._results["plg-sdk.installer"] is before
+    assert any("namespace" in err for err in ConfigValidator.errors())
+
+    config_file.write_text(
+        '[PROJECT]\nname = "de mo"\nauthor = "me"\nversion = "1.0"\n\n'
+        '[MODULES]\nallowed = ["py2glua"]\n',
+        encoding="utf-8",
+    )
+    change = Config.reload()
+    assert change is not None
+    assert change.keys == {"config.build.parallel"}
+    assert not change.rebuild
+
+
+def test_registered_rule_runs_with_timing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Config.init()
+
+    def check(get, errors, warnings):
+        if get("config.project.name") is None:
+            warnings.append("TEST: имя не задано")
+
+    RuleRegistry.register("test.name", ["config.PROJECT.name"], check, "test")
+    try:
+        assert RuleRegistry.affected({"config.project.name"}) == [
+            "project.required",
+            "project.namespace",
+            "test.name",
+        ]
+
+        ConfigValidator.validate(workers=4)
+        assert "TEST: имя не задано" in ConfigValidator.warnings()
+        assert ConfigValidator.timings()["test.name"] >= 0
+
+        with pytest.raises(ValueError):
+            RuleRegistry.register("test.name", [], check)
+
+    finally:
+        RuleRegistry.unregister("test.name")
+
+    ConfigValidator.validate(set())
+    assert "TEST: имя не задано" not in ConfigValidator.warnings()
+
+
+def test_schema_compiled_once_without_disk_cache(tmp_path, monkeypatch):
+    from plg_sdk.core.schema import ConfigSchema
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ConfigSchema, "_compiled", None)
+    Config.init()
+    compiled = ConfigSchema.compiled()
+
+    # Повторные вызовы не разбирают схему заново и ничего не пишут на диск
+    monkeypatch.setattr(ConfigSchema, "_compile", None)
+    Config.init()
+    assert ConfigSchema.compiled() is compiled
+    assert not list(tmp_path.rglob("config_schema.*"))
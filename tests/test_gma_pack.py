@@ -0,0 +1,83 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from plg_sdk.core import Config
+from plg_sdk.pack import Packer, gma
+from plg_sdk.pack.gma import crc32_combine
+
+
+def test_crc32_combine_matches_zlib():
+    a = os.urandom(1000)
+    for b in (b"", b"x", os.urandom(4097)):
+        assert crc32_combine(zlib.crc32(a), zlib.crc32(b), len(b)) == zlib.crc32(a + b)
+
+
+def _unpack(path):
+    # Содержимое архива с проверкой crc файлов и всего архива
+    _, entries, start = gma.read(path)
+    data = path.read_bytes()
+    files = {}
+    for entry in entries:
+        body = data[start : start + entry.size]
+        assert zlib.crc32(body) == entry.crc
+        files[entry.name] = body
+        start += entry.size
+
+    assert data[start:] == struct.pack("<I", zlib.crc32(data[:start]))
+    return files
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for rel, body in (
+        ("build/lua/autorun/init.lua", b"print(1)"),
+        ("build/lua/Shared.lua", b"x = 1"),
+        ("assets/materials/a.vtf", os.urandom(3000)),
+        ("assets/materials/a.psd", b"layers"),
+    ):
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(body)
+
+    Config.init()
+    Config.set("config.pack.assets", ["./assets"])
+    Config.set("config.pack.ignore", ["*.psd"])
+    return tmp_path
+
+
+def test_pack_patches_in_place_and_reuses_archive(project):
+    target = project / "addon.gma"
+    assert Packer.pack().mode == "full"
+    files = _unpack(target)
+    assert sorted(files) == [
+        "lua/autorun/init.lua",
+        "lua/shared.lua",
+        "materials/a.vtf",
+    ]
+    assert Packer.pack().mode == "actual"
+
+    # Тот же размер - правка на месте, тот же inode
+    inode = target.stat().st_ino
+    (project / "build/lua/Shared.lua").write_bytes(b"x = 2")
+    stats = Packer.pack()
+    assert (stats.mode, stats.streamed) == ("patch", 1)
+    assert target.stat().st_ino == inode
+    assert _unpack(target)["lua/shared.lua"] == b"x = 2"
+
+    # Другой заголовок и набор файлов - новый архив из кусков старого
+    Config.set("config.pack.description", "Длинное описание аддона")
+    (project / "build/lua/autorun/init.lua").unlink()
+    (project / "assets/materials/b.vmt").write_bytes(b"{}")
+    stats = Packer.pack()
+    assert (stats.mode, stats.streamed, stats.copied) == ("rebuild", 1, 2)
+
+    files = _unpack(target)
+    assert files == {
+        "lua/shared.lua": b"x = 2",
+        "materials/a.vtf": (project / "assets/materials/a.vtf").read_bytes(),
+        "materials/b.vmt": b"{}",
+    }
+    assert "Длинное описание" in gma.read(target)[0].description
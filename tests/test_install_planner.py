@@ -0,0 +1,83 @@
+from plg_sdk.modules.install_planner import plan_install
+from plg_sdk.modules.module_manager import ModuleManager
+
+
+def test_plan_only_touches_missing_and_outdated():
+    plan = plan_install(
+        {
+            "missing": (None, "1.0"),
+            "outdated": ("1.0", "1.0.post1"),
+            "current": ("2.0.0", "2.0"),
+            "pre": ("1.0", "1.1a1"),
+            "offline": ("1.0", None),
+        }
+    )
+
+    assert plan.install == ("missing",)
+    assert plan.upgrade == ("outdated",)
+    # Pre-релиз из индекса без разрешающего ограничения не ставится
+    assert plan.current == ("current", "offline", "pre")
+
+
+def test_plan_respects_flags():
+    versions = {"missing": (None, "1.0"), "outdated": ("1.0", "2.0")}
+
+    plan = plan_install(versions, auto_install=False, auto_update=False)
+
+    assert plan.targets == ()
+
+
+def test_plan_respects_specifiers():
+    versions = {
+        "pre": ("1.0", "1.1a1"),
+        "capped": ("1.0", "2.0"),
+        "bumped": ("1.0", "1.5"),
+    }
+
+    plan = plan_install(
+        versions,
+        specifiers={"pre": ">=1.1a1", "capped": "<2", "bumped": ">=1,<2"},
+    )
+
+    assert plan.upgrade == ("bumped", "pre")
+    assert plan.current == ("capped",)
+
+
+def test_sync_without_update_skips_index(monkeypatch):
+    monkeypatch.setattr(ModuleManager, "_modules", {"present", "missing"})
+    monkeypatch.setattr(
+        ModuleManager,
+        "request_local_versions",
+        classmethod(lambda cls: {"present": "1.0", "missing": None}),
+    )
+
+    def _no_network(cls, force=False):
+        raise AssertionError("индекс не должен запрашиваться")
+
+    installed = []
+    monkeypatch.setattr(ModuleManager, "request_pip_versions", classmethod(_no_network))
+    monkeypatch.setattr(
+        ModuleManager,
+        "update_install_modules",
+        classmethod(lambda cls, modules: installed.append(modules) or True),
+    )
+
+    assert ModuleManager.sync_modules()
+    assert installed == [{"missing"}]
+
+
+def test_importable_module_without_metadata_is_not_installed(monkeypatch):
+    # json есть в stdlib, но dist-info у него нет
+    monkeypatch.setattr(ModuleManager, "_modules", {"json", "missing"})
+    monkeypatch.setattr(
+        ModuleManager,
+        "request_versions",
+        classmethod(
+            lambda cls, force=False: {"json": (None, "2.0"), "missing": (None, "1.0")}
+        ),
+    )
+
+    plan = ModuleManager.plan(update=True)
+
+    assert plan.install == ("missing",)
+    assert plan.current == ("json",)
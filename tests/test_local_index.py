@@ -0,0 +1,26 @@
+import os
+import sys
+
+from plg_sdk.modules.local_index import LocalIndex
+
+
+def test_local_index_tracks_site_packages(tmp_path, monkeypatch):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    (first / "Py2Glua-1.0.dist-info").mkdir(parents=True)
+    (second / "py2glua-0.5.dist-info").mkdir(parents=True)
+    (second / "legacy.egg-info").mkdir()
+    (second / "legacy.egg-info/PKG-INFO").write_text("Name: Legacy_Pkg\nVersion: 2.1\n")
+
+    monkeypatch.setattr(sys, "path", [str(first), str(second)])
+    LocalIndex.invalidate()
+
+    assert LocalIndex.version("py2glua") == "1.0"
+    assert LocalIndex.version("legacy.pkg") == "2.1"
+    assert LocalIndex.version("missing") is None
+
+    (first / "new_module-3.0.dist-info").mkdir()
+    st = first.stat()
+    os.utime(first, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert LocalIndex.version("New-Module") == "3.0"
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+from plg_sdk.modules.module_cache import CacheEntry, ModulesCache
+from plg_sdk.modules.version_cache import VersionCache
+
+
+def test_cache_roundtrip_past_255_modules(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModulesCache, "_path", tmp_path / "pip_modules.bin")
+    now = datetime.fromtimestamp(1_700_000_000, timezone.utc)
+    modules = {f"module-{i}": CacheEntry(f"1.{i}", now) for i in range(300)}
+    modules["no-version"] = CacheEntry("", now)
+
+    ModulesCache.save(now, modules)
+
+    assert ModulesCache.load() == (now, modules)
+    assert ModulesCache.lookup("module-299") == CacheEntry("1.299", now)
+    assert ModulesCache.lookup("no-version") == CacheEntry("", now)
+    assert ModulesCache.lookup("missing") is None
+
+
+def test_cache_rejects_corruption(tmp_path, monkeypatch):
+    path = tmp_path / "pip_modules.bin"
+    monkeypatch.setattr(ModulesCache, "_path", path)
+    now = datetime.now(timezone.utc)
+    ModulesCache.save(now, {"py2glua": CacheEntry("0.1", now)})
+
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    assert ModulesCache.load() == ModulesCache.NO_DATA
+
+
+def test_cache_migrates_v1(tmp_path, monkeypatch):
+    path = tmp_path / "pip_modules.bin"
+    monkeypatch.setattr(ModulesCache, "_path", path)
+
+    body = b""
+    for name, version in (("py2glua", "0.1"), ("colorama", "")):
+        body += len(name).to_bytes(2, "little") + len(version).to_bytes(2, "little")
+        body += name.encode() + version.encode()
+
+    path.write_bytes(b"\x02" + (1_700_000_000).to_bytes(8, "little") + body)
+
+    cache_time, modules = ModulesCache.load()
+    assert int(cache_time.timestamp()) == 1_700_000_000
+    assert modules == {
+        "py2glua": CacheEntry("0.1", cache_time),
+        "colorama": CacheEntry("", cache_time),
+    }
+    assert path.read_bytes().startswith(ModulesCache.MAGIC)
+
+
+def test_version_cache_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModulesCache, "_path", tmp_path / "pip_modules.bin")
+    monkeypatch.setattr(VersionCache, "_entries", None)
+    monkeypatch.setattr(VersionCache, "ttl", staticmethod(lambda: 60))
+    monkeypatch.setattr(VersionCache, "stale", staticmethod(lambda: 60))
+
+    calls = []
+
+    def fetch(known):
+        calls.append(set(known))
+        now = datetime.now(timezone.utc)
+        return {m: CacheEntry("2.0", now) for m in known}
+
+    old = datetime.now(timezone.utc) - timedelta(seconds=90)
+    ModulesCache.save(old, {"stale": CacheEntry("1.0", old)})
+
+    assert VersionCache.get({"stale", "cold"}, fetch) == {
+        "stale": "1.0",
+        "cold": "2.0",
+    }
+    VersionCache.join()
+    assert calls == [{"cold"}, {"stale"}]
+
+    # Всё свежее - сеть не трогаем
+    assert VersionCache.get({"stale", "cold"}, fetch) == {
+        "stale": "2.0",
+        "cold": "2.0",
+    }
+    assert len(calls) == 2
+
+
+def test_lookup_survives_truncated_file(tmp_path, monkeypatch):
+    path = tmp_path / "pip_modules.bin"
+    monkeypatch.setattr(ModulesCache, "_path", path)
+    now = datetime.fromtimestamp(1_700_000_000, timezone.utc)
+    modules = {f"module-{i}": CacheEntry("1.0", now) for i in range(20)}
+    ModulesCache.save(now, modules)
+
+    data = path.read_bytes()
+    header = ModulesCache._HEADER.size
+    # Обрезан в заголовке, в таблице слотов и в последней записи
+    for size in (1, header, header + 6, len(data) - 3):
+        path.write_bytes(data[:size])
+        for name in modules:
+            assert ModulesCache.lookup(name) in (None, modules[name])
+
+        assert ModulesCache.load() == ModulesCache.NO_DATA
@@ -0,0 +1,41 @@
+from plg_sdk.build.store import ArtifactStore, artifact_key
+from plg_sdk.build.sync import clone_file, prune_dir
+
+
+def test_materialize_writes_only_changes(tmp_path):
+    stage = tmp_path / "stage"
+    stage.mkdir()
+    (stage / "a.lua").write_text("a")
+    (stage / "b.lua").write_text("b2")
+
+    store = ArtifactStore(tmp_path / "store", 1 << 20)
+    key = artifact_key("py2glua", "1.0", b"c" * 16, "a.py", b"s" * 16)
+    files = store.put(key, {"a.lua": stage / "a.lua", "b.lua": stage / "b.lua"})
+
+    out = tmp_path / "out"
+    (out / "lua/old").mkdir(parents=True)
+    (out / "a.lua").write_text("a")
+    (out / "b.lua").write_text("b1")
+    (out / "lua/old/stale.lua").write_text("x")
+    a_ino = (out / "a.lua").stat().st_ino
+
+    # Совпавший файл не трогается, изменившийся переписывается
+    assert store.materialize(files, out) == 1
+    assert (out / "a.lua").stat().st_ino == a_ino
+    assert (out / "b.lua").read_text() == "b2"
+
+    assert prune_dir(out, {f.path for f in files}) == 1
+    assert sorted(p.name for p in out.iterdir()) == ["a.lua", "b.lua"]
+
+    assert store.materialize(files, out) == 0
+
+
+def test_clone_file_makes_independent_copy(tmp_path):
+    src = tmp_path / "src.lua"
+    src.write_bytes(b"print(1)")
+    dst = tmp_path / "dst.lua"
+
+    clone_file(src, dst)
+    dst.write_bytes(b"print(2)")
+
+    assert src.read_bytes() == b"print(1)"
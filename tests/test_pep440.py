@@ -0,0 +1,74 @@
+import pytest
+
+from plg_sdk.core.pep440 import (
+    InvalidSpecifier,
+    InvalidVersion,
+    SpecifierSet,
+    latest,
+    parse_version,
+)
+
+
+def test_version_ordering():
+    ordered = [
+        "1.0.dev0",
+        "1.0a1",
+        "1.0a2.dev1",
+        "1.0a2",
+        "1.0b1",
+        "1.0rc1",
+        "1.0",
+        "1.0+abc",
+        "1.0+1",
+        "1.0.post1.dev0",
+        "1.0.post1",
+        "1.1",
+        "1!0.1",
+    ]
+
+    assert sorted(reversed(ordered), key=parse_version) == ordered
+    assert parse_version("1.0") == parse_version("1.0.0")
+    assert parse_version("v1.0-ALPHA") is parse_version("v1.0-ALPHA")
+
+    with pytest.raises(InvalidVersion):
+        parse_version("not a version")
+
+
+def test_local_segment_separators_are_normalised():
+    assert str(parse_version("1.0+ubuntu-1")) == "1.0+ubuntu.1"
+    assert parse_version("1.0+Ubuntu_1") == parse_version("1.0+ubuntu.1")
+    assert parse_version("1.0+ubuntu-1").local == "ubuntu.1"
+
+
+@pytest.mark.parametrize(
+    "spec, version, expected",
+    [
+        (">=1.0", "1.0", True),
+        (">=1.0", "0.9", False),
+        ("~=1.4.2", "1.4.5", True),
+        ("~=1.4.2", "1.5.0", False),
+        ("~=2.2", "2.9", True),
+        ("==1.4.*", "1.4.7", True),
+        ("==1.4.*", "1.40", False),
+        ("!=1.4.*", "1.5", True),
+        ("==1.0", "1.0+local", True),
+        (">1.7", "1.7.post1", False),
+        ("<1.7", "1.7a1", False),
+        (">=1.0,!=1.3", "1.3", False),
+        (">=1.0", "2.0a1", False),
+        (">=2.0a1", "2.0a2", True),
+    ],
+)
+def test_specifier_set(spec, version, expected):
+    assert SpecifierSet(spec).contains(version) is expected
+
+
+def test_filter_and_latest():
+    releases = ["0.9", "1.0", "1.1", "1.2a1", "2.0"]
+
+    assert SpecifierSet(">=1.0,<2").filter(releases) == ["1.0", "1.1"]
+    assert latest(releases, "<2") == "1.1"
+    assert latest(["1.2a1"], ">=1.0") == "1.2a1"
+
+    with pytest.raises(InvalidSpecifier):
+        SpecifierSet("~=1")
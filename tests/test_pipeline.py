@@ -0,0 +1,148 @@
+import threading
+import time
+from importlib.metadata import EntryPoint
+
+import pytest
+
+from plg_sdk.build import compiler
+from plg_sdk.build.builder import Builder
+from plg_sdk.build.pipeline import IOPool
+from plg_sdk.core import Config
+
+
+def test_io_pool_bounds_queue_and_collects_errors():
+    io = IOPool(2, limit=3)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _task(i):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+
+        if i == 3:
+            raise OSError("disk full")
+
+        return [f"{i}.lua"]
+
+    for i in range(8):
+        io.submit(f"batch{i}", _task, i)
+
+    assert list(io.map(lambda x: x * 2, range(10))) == [x * 2 for x in range(10)]
+
+    errors = io.close()
+    assert peak <= 2
+    assert list(errors) == ["batch3"]
+    assert sorted(io.results) == [f"batch{i}" for i in range(8) if i != 3]
+
+
+compiled: list[str] = []
+
+
+def compile_batch(source_dir, out_dir, files):
+    compiled.extend(files)
+    for rel in files:
+        out = out_dir / "lua" / (rel[:-3] + ".lua")
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text("-- " + (source_dir / rel).read_text())
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "py2glua").mkdir()
+    (tmp_path / "py2glua/__init__.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(
+        compiler,
+        "_entry_points",
+        {
+            "py2glua": EntryPoint(
+                "py2glua", f"{__name__}:compile_batch", compiler.ENTRY_POINT_GROUP
+            )
+        },
+    )
+    monkeypatch.setattr(compiler, "_runners", {})
+
+    src = tmp_path / "source"
+    (src / "pkg").mkdir(parents=True)
+    for i in range(6):
+        (src / f"pkg/m{i}.py").write_text(f"x = {i}\n")
+
+    Config.init()
+    return tmp_path
+
+
+@pytest.mark.parametrize("cache_size_mb", [0, 16])
+def test_build_streams_outputs_and_prunes(project, cache_size_mb):
+    Config.set("config.build.cache_size_mb", cache_size_mb)
+    out = project / "build/lua/pkg"
+    out.mkdir(parents=True)
+    (out / "stale.lua").write_text("old")
+
+    assert Builder.build(jobs=1)
+    assert sorted(p.name for p in out.iterdir()) == [f"m{i}.lua" for i in range(6)]
+    assert (out / "m3.lua").read_text() == "-- x = 3\n"
+    assert not Builder.staging_dir().exists()
+
+    # Удалённый исходник пропадает из out_dir, остальное берётся из кэша или пропускается
+    (project / "source/pkg/m5.py").unlink()
+    (project / "source/pkg/m0.py").write_text("x = 10\n")
+    assert Builder.build(jobs=1)
+    assert sorted(p.name for p in out.iterdir()) == [f"m{i}.lua" for i in range(5)]
+    assert (out / "m0.lua").read_text() == "-- x = 10\n"
+
+
+@pytest.mark.parametrize("clean", [False, True])
+def test_build_is_incremental_and_removes_outputs_of_deleted_sources(project, clean):
+    Config.set("config.build.cache_size_mb", 0)
+    Config.set("config.build.clean_before", clean)
+    out = project / "build/lua/pkg"
+    (project / "build").mkdir()
+    (project / "build/readme.txt").write_text("руками")
+
+    assert Builder.build(jobs=1)
+    compiled.clear()
+
+    (project / "source/pkg/m5.py").unlink()
+    (project / "source/pkg/m0.py").write_text("x = 10\n")
+    assert Builder.build(jobs=1)
+
+    # clean_before не делает сборку полной
+    assert compiled == ["pkg/m0.py"]
+    assert sorted(p.name for p in out.iterdir()) == [f"m{i}.lua" for i in range(5)]
+    # Чужие файлы в out_dir трогает только clean_before
+    assert (project / "build/readme.txt").exists() is not clean
+
+
+def test_remote_cache_hits_across_checkouts(project, monkeypatch):
+    # Два checkout'а одного проекта по разным путям и один общий кэш
+    shared = project / "shared"
+    for name in ("a", "b"):
+        src = project / name / "source/pkg"
+        src.mkdir(parents=True)
+        for i in range(3):
+            (src / f"m{i}.py").write_text(f"x = {i}\n")
+
+    def _build(name):
+        monkeypatch.chdir(project / name)
+        Config.init()
+        Config.set("config.build.cache_size_mb", 16)
+        Config.set("config.cache.remote", str(shared))
+        compiled.clear()
+        assert Builder.build(jobs=1)
+
+    _build("a")
+    assert sorted(compiled) == [f"pkg/m{i}.py" for i in range(3)]
+
+    _build("b")
+    assert compiled == []
+    out = project / "b/build/lua/pkg"
+    assert sorted(p.name for p in out.iterdir()) == [f"m{i}.lua" for i in range(3)]
+    assert (out / "m1.lua").read_text() == "-- x = 1\n"
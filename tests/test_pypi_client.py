@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from plg_sdk.modules.pypi_client import PyPIClient, PyPIClientPool
+from plg_sdk.modules.resolver import AsyncResolver
+
+
+class _IndexHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        if self.path != "/pypi/py2glua/json":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps({"info": {"version": "1.2.3"}}).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Last-Modified", "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def index_url():
+    _IndexHandler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _IndexHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_conditional_requests_reuse_connection(index_url):
+    client = PyPIClient(index_url)
+
+    first = client.get_version("py2glua")
+    assert first.version == "1.2.3"
+    assert first.etag == '"v1"'
+    assert not first.not_modified
+
+    second = client.get_version("py2glua", first.etag, first.last_modified)
+    assert second.not_modified
+    assert second.version is None
+
+    with pytest.raises(Exception):
+        client.get_version("missing")
+
+    client.close()
+    assert _IndexHandler.connections == 1
+
+
+def test_pool_reuses_connections_across_resolver_runs(index_url):
+    pool = PyPIClientPool(index_url, size=4)
+    resolver = AsyncResolver(limit=4)
+
+    def _get():
+        with pool.client() as client:
+            return client.get_version("py2glua").version
+
+    # У resolver новый пул потоков на каждый проход, соединения - общие
+    for _ in range(3):
+        result = resolver.run({i: _get for i in range(8)})
+        assert result == {i: "1.2.3" for i in range(8)}
+
+    pool.close()
+    assert _IndexHandler.connections <= 4
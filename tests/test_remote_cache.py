@@ -0,0 +1,154 @@
+import hashlib
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from plg_sdk.build.remote import DirectoryRemote, HttpRemote, RemoteCache
+from plg_sdk.build.store import ArtifactFile, ArtifactStore, artifact_key
+
+
+class _CacheHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    blobs: dict[str, bytes] = {}
+
+    def _reply(self, status: int, body: bytes = b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        body = self.blobs.get(self.path)
+        if body is None:
+            self._reply(404)
+
+        else:
+            self._reply(200, body)
+
+    def do_PUT(self):
+        length = int(self.headers["Content-Length"])
+        self.blobs[self.path] = self.rfile.read(length)
+        self._reply(201)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cache_url():
+    _CacheHandler.blobs = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CacheHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/cache"
+    server.shutdown()
+    server.server_close()
+
+
+def _artifact(tmp_path, store):
+    key = artifact_key("py2glua", "1.0", b"c" * 16, "a.py", b"s" * 16)
+    stage = tmp_path / "stage/lua/a.lua"
+    stage.parent.mkdir(parents=True)
+    stage.write_bytes(b"print(1)")
+    store.put(key, {"lua/a.lua": stage})
+    return key
+
+
+@pytest.mark.parametrize("kind", ["http", "dir"])
+def test_bundle_roundtrip_through_remote(tmp_path, cache_url, kind):
+    if kind == "http":
+        backend = HttpRemote(cache_url)
+
+    else:
+        backend = DirectoryRemote(tmp_path / "shared")
+
+    producer = ArtifactStore(tmp_path / "a", 1 << 20)
+    key = _artifact(tmp_path, producer)
+
+    remote = RemoteCache(backend)
+    remote.push(key, producer.export(key))  # pyright: ignore[reportArgumentType]
+    remote.close()
+
+    consumer = ArtifactStore(tmp_path / "b", 1 << 20)
+    remote = RemoteCache(backend)
+    fetched = dict(remote.fetch([key, b"x" * 16]))
+    remote.close()
+
+    assert list(fetched) == [key]
+    artifact = consumer.import_bundle(key, fetched[key])
+    assert artifact is not None
+    assert consumer.get(key) == artifact
+
+    consumer.materialize(artifact, tmp_path / "out")
+    assert (tmp_path / "out/lua/a.lua").read_bytes() == b"print(1)"
+
+    # Подменённые байты не принимаются
+    broken = fetched[key][:-1] + b"X"
+    assert ArtifactStore(tmp_path / "c", 1 << 20).import_bundle(key, broken) is None
+
+
+def test_unreachable_remote_degrades(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    remote = RemoteCache(HttpRemote(f"http://127.0.0.1:{port}", timeout=1))
+    assert list(remote.fetch([b"k" * 16, b"j" * 16])) == []
+    assert not remote.available
+
+    # Выключенный кэш больше не ходит в сеть
+    remote.push(b"k" * 16, b"data")
+    remote.close()
+
+
+def _bundle(path, body):
+    # Пакет с одним файлом по произвольному пути, как его собрал бы чужой кэш
+    path_b = path.encode("utf-8")
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    record = ArtifactStore._HEADER.pack(
+        ArtifactStore.MAGIC, ArtifactStore.VERSION, 1
+    )
+    record += ArtifactStore._ENTRY.pack(len(path_b), len(body), digest) + path_b
+    head = ArtifactStore._BUNDLE.pack(
+        ArtifactStore.BUNDLE_MAGIC, ArtifactStore.VERSION, len(record)
+    )
+    return head + record + body
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "../../escaped.txt",
+        "lua/../../x.lua",
+        "/tmp/abs.lua",
+        "C:/x.lua",
+        "a\\..\\b",
+        "",
+    ],
+)
+def test_bundle_with_escaping_path_is_rejected(tmp_path, path):
+    store = ArtifactStore(tmp_path / "store", 1 << 20)
+    key = b"k" * 16
+
+    assert store.import_bundle(key, _bundle(path, b"pwned")) is None
+    assert store.get(key) is None
+    assert not (tmp_path / "store/objects").exists()
+
+    with pytest.raises(ValueError):
+        store.materialize([ArtifactFile(path, b"d" * 16, 1)], tmp_path / "out")
+
+
+def test_fetch_streams_bundles(tmp_path):
+    backend = DirectoryRemote(tmp_path / "shared")
+    keys = [bytes([i]) * 16 for i in range(40)]
+    for key in keys[::2]:
+        backend.put(key, key)
+
+    remote = RemoteCache(backend, workers=2)
+    fetched = remote.fetch(keys)
+    # Генератор: ничего не качается, пока не начали читать
+    assert remote._pool is None
+    assert dict(fetched) == {key: key for key in keys[::2]}
+    remote.close()
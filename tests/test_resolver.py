@@ -0,0 +1,82 @@
+import threading
+import time
+
+from plg_sdk.modules.resolver import AsyncResolver
+
+
+class _FakeFetch:
+    # Запрос к индексу: считает одновременные вызовы, спит delay секунд
+    def __init__(self, delays=None, errors=()):
+        self.delays = delays or {}
+        self.errors = set(errors)
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, module):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+        try:
+            time.sleep(self.delays.get(module, 0.02))
+            if module in self.errors:
+                raise ConnectionError(f"{module}: сброс соединения")
+
+            return f"{module}-1.0"
+
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def calls(self, modules):
+        return {m: lambda m=m: self(m) for m in modules}
+
+
+def test_resolver_limits_in_flight_calls():
+    fetch = _FakeFetch()
+    modules = [f"m{i}" for i in range(12)]
+
+    result = AsyncResolver(limit=3).run(fetch.calls(modules))
+
+    assert result == {m: f"{m}-1.0" for m in modules}
+    assert fetch.peak == 3
+
+
+def test_resolver_request_timeout_keeps_partial_results():
+    fetch = _FakeFetch({"slow": 1.0})
+
+    started = time.monotonic()
+    result = AsyncResolver(limit=4, request_timeout=0.2).run(
+        fetch.calls(["a", "slow", "b"])
+    )
+
+    assert result == {"a": "a-1.0", "slow": None, "b": "b-1.0"}
+    # Зависший вызов не держит весь проход
+    assert time.monotonic() - started < 0.8
+
+
+def test_resolver_budget_keeps_partial_results():
+    fetch = _FakeFetch({"slow-1": 1.0, "slow-2": 1.0})
+
+    started = time.monotonic()
+    result = AsyncResolver(limit=4, request_timeout=5.0, budget=0.2).run(
+        fetch.calls(["a", "slow-1", "slow-2"])
+    )
+
+    assert result == {"a": "a-1.0", "slow-1": None, "slow-2": None}
+    assert time.monotonic() - started < 0.8
+
+
+def test_resolver_isolates_errors():
+    fetch = _FakeFetch(errors={"broken"})
+
+    result = AsyncResolver(limit=2).run(fetch.calls(["a", "broken", "b"]))
+
+    # Ошибка одного вызова - None только для него, остальные не страдают
+    assert result == {"a": "a-1.0", "broken": None, "b": "b-1.0"}
+    assert fetch.active == 0
+
+
+def test_resolver_empty_calls():
+    assert AsyncResolver().run({}) == {}
@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+from plg_sdk.build.ignore import IgnoreRules
+from plg_sdk.build.manifest import BuildManifest
+from plg_sdk.build.scanner import SourceTree
+
+
+@pytest.mark.parametrize(
+    "rel, is_dir, expected",
+    [
+        ("__pycache__", True, True),
+        ("pkg/__pycache__", True, True),
+        ("pkg/mod.pyc", False, True),
+        ("assets", True, True),
+        ("assets", False, False),
+        ("pkg/assets", True, False),
+        ("docs/a/b/notes.md", False, True),
+        ("notes.md", False, False),
+        ("keep.pyc", False, False),
+        ("pkg/keep.pyc", False, False),
+        ("tmp_1.py", False, True),
+        ("tmp_12.py", False, False),
+    ],
+)
+def test_ignore_rules(rel, is_dir, expected):
+    rules = IgnoreRules(
+        [
+            "# комментарий",
+            "__pycache__/",
+            "*.pyc",
+            "!keep.pyc",
+            "/assets/",
+            "docs/**/*.md",
+            "tmp_[0-9].py",
+        ]
+    )
+    assert rules.ignored(rel, is_dir) is expected
+
+
+def _age(root, seconds=10):
+    # Старые mtime папок, чтобы листинги не считались "свежими"
+    past = time.time_ns() - seconds * 1_000_000_000
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(past, past))
+
+
+@pytest.fixture
+def src(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "source"
+    for rel in ("pkg/a.py", "pkg/b.py", "other/c.py", "assets/big.vtf", "d.py"):
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_text("x = 1\n")
+
+    (src / ".plgignore").write_text("/assets/\n")
+    _age(src)
+    return src
+
+
+def test_scanner_prunes_and_reuses_listings(src):
+    tree = SourceTree.load(src)
+    files = [rel for rel, _ in tree.walk()]
+    assert files == ["d.py", "other/c.py", "pkg/a.py", "pkg/b.py"]
+    assert tree.listed == 3
+    tree.save()
+
+    # Папки не менялись - readdir не нужен ни для одной
+    tree = SourceTree.load(src)
+    assert [rel for rel, _ in tree.walk()] == files
+    assert (tree.listed, tree.reused) == (0, 3)
+
+    (src / "pkg/e.py").write_text("")
+    tree = SourceTree.load(src)
+    assert "pkg/e.py" in [rel for rel, _ in tree.walk()]
+    assert (tree.listed, tree.reused) == (1, 2)
+
+    # Новые правила сбрасывают кэш
+    tree.save()
+    (src / ".plgignore").write_text("/assets/\nother/\n")
+    tree = SourceTree.load(src)
+    assert "other/c.py" not in [rel for rel, _ in tree.walk()]
+    assert tree.listed == 2
+
+
+def test_scan_trusts_watcher_hints(src):
+    tree = SourceTree.load(src)
+    first = BuildManifest.scan(src, {}, tree=tree)
+    tree.save()
+
+    # Файл вне подсказок не перечитывается, даже если изменён
+    (src / "pkg/a.py").write_text("x = 2\n")
+    (src / "other/c.py").write_text("x = 3\n")
+    (src / "other/new.py").write_text("")
+    tree = SourceTree.load(src)
+    second = BuildManifest.scan(src, first, tree=tree, changed={"pkg/a.py"})
+
+    assert BuildManifest.diff(first, second).dirty == {"pkg/a.py"}
+    assert (tree.listed, tree.reused) == (0, 3)
+
+    third = BuildManifest.scan(src, second, tree=SourceTree.load(src))
+    assert BuildManifest.diff(second, third).dirty == {"other/c.py", "other/new.py"}
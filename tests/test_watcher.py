@@ -0,0 +1,251 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from plg_sdk.build import IgnoreRules
+from plg_sdk.build.watcher import InotifyWatcher, PollingWatcher
+from plg_sdk.cli import watch_cmd as watch_mod
+from plg_sdk.core import Config, ConfigValidator
+
+
+def _inotify(root, ignore=None):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("inotify есть только в linux")
+
+    try:
+        return InotifyWatcher(root, ignore)
+
+    except (OSError, AttributeError) as err:
+        pytest.skip(f"inotify недоступен: {err}")
+
+
+def _polling(root, ignore=None):
+    return PollingWatcher(root, interval=0.01, ignore=ignore)
+
+
+def _drain(watcher, timeout=1.0):
+    changed = watcher.wait(timeout)
+    while more := watcher.wait(0.05):
+        changed |= more
+
+    return changed
+
+
+@pytest.fixture(params=["polling", "inotify"])
+def make_watcher(request):
+    factory = _polling if request.param == "polling" else _inotify
+    created = []
+
+    def _make(root, ignore=None):
+        watcher = factory(root, ignore)
+        created.append(watcher)
+        return watcher
+
+    yield _make
+    for watcher in created:
+        watcher.close()
+
+
+def test_watcher_reports_create_modify_delete(tmp_path, make_watcher):
+    (tmp_path / "lib").mkdir()
+    old = tmp_path / "lib/old.py"
+    old.write_text("x = 1")
+    watcher = make_watcher(tmp_path)
+
+    new = tmp_path / "lib/new.py"
+    new.write_text("y = 1")
+    assert new in _drain(watcher)
+
+    old.write_text("x = 22")
+    assert old in _drain(watcher)
+
+    new.unlink()
+    assert new in _drain(watcher)
+
+    assert watcher.wait(0.05) == set()
+
+
+def test_watcher_sees_files_in_new_dirs(tmp_path, make_watcher):
+    watcher = make_watcher(tmp_path)
+
+    (tmp_path / "pkg/sub").mkdir(parents=True)
+    (tmp_path / "pkg/sub/a.py").write_text("a = 1")
+
+    assert tmp_path / "pkg/sub/a.py" in _drain(watcher)
+
+
+def test_watcher_skips_ignored(tmp_path, make_watcher):
+    (tmp_path / "gen").mkdir()
+    rules = IgnoreRules(["gen/", "*.tmp"])
+    watcher = make_watcher(tmp_path, rules)
+
+    (tmp_path / "gen/a.py").write_text("a = 1")
+    (tmp_path / "b.tmp").write_text("tmp")
+    (tmp_path / "c.py").write_text("c = 1")
+
+    assert _drain(watcher) == {tmp_path / "c.py"}
+
+
+def test_inotify_skips_ignored_dirs(tmp_path):
+    (tmp_path / "gen/deep").mkdir(parents=True)
+    (tmp_path / "src").mkdir()
+    watcher = _inotify(tmp_path, IgnoreRules(["gen/"]))
+    try:
+        # На исключённые папки watch не вешается
+        assert set(watcher._wd.values()) == {tmp_path, tmp_path / "src"}
+
+    finally:
+        watcher.close()
+
+
+def test_inotify_survives_vanished_dir(tmp_path, monkeypatch):
+    watcher = _inotify(tmp_path)
+    try:
+        add_watch = watcher._add_watch
+
+        def _add(path):
+            # Папка удаляется между событием и установкой watch
+            if path.name == "tmpdir":
+                path.rmdir()
+
+            add_watch(path)
+
+        monkeypatch.setattr(watcher, "_add_watch", _add)
+        (tmp_path / "tmpdir").mkdir()
+        (tmp_path / "a.py").write_text("a = 1")
+
+        changed = _drain(watcher)
+        assert tmp_path / "a.py" in changed
+
+        # Наблюдатель продолжает работать
+        (tmp_path / "b.py").write_text("b = 1")
+        assert tmp_path / "b.py" in _drain(watcher)
+
+    finally:
+        watcher.close()
+
+
+def test_inotify_survives_vanished_subdir(tmp_path, monkeypatch):
+    watcher = _inotify(tmp_path)
+    try:
+        add_watch = watcher._add_watch
+
+        def _add(path):
+            if path.name == "gone":
+                path.rmdir()
+
+            add_watch(path)
+
+        monkeypatch.setattr(watcher, "_add_watch", _add)
+        (tmp_path / "pkg/gone").mkdir(parents=True)
+        (tmp_path / "pkg/keep").mkdir()
+
+        _drain(watcher)
+        assert tmp_path / "pkg/keep" in set(watcher._wd.values())
+
+    finally:
+        watcher.close()
+
+
+def test_hints_are_relative_to_source(tmp_path):
+    src = tmp_path / "src"
+    assert watch_mod._hints({src / "a.py", src / "lib/b.py"}, src) == {
+        "a.py",
+        "lib/b.py",
+    }
+    # Переполнение очереди и пути вне source_dir - полный скан
+    assert watch_mod._hints({src}, src) is None
+    assert watch_mod._hints({tmp_path / "other.py"}, src) is None
+
+
+class _FakeWatcher:
+    def __init__(self, events):
+        self.events = list(events)
+        self.closed = False
+
+    def wait(self, timeout=None):
+        if not self.events:
+            raise KeyboardInterrupt
+
+        return self.events.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_watch_cmd_rebuilds_on_events(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Config.init()
+    src = Config.snapshot().source_dir
+
+    # Пачка событий склеивается до пустого wait, потом правка .plgignore
+    batches = [
+        {src / "a.py"},
+        {src / "lib/b.py"},
+        set(),
+        {src / ".plgignore"},
+        set(),
+    ]
+    watchers = [_FakeWatcher(batches), _FakeWatcher([])]
+    created = []
+
+    def _create(root, poll, rules):
+        created.append(root)
+        return watchers[len(created) - 1]
+
+    calls = []
+
+    def _build(clean, jobs, executor, modules=None, changed=None):
+        calls.append(changed)
+
+    monkeypatch.setattr(watch_mod, "create_watcher", _create)
+    monkeypatch.setattr(watch_mod, "build_cmd", _build)
+    monkeypatch.setattr(watch_mod, "_reload_config", lambda: None)
+
+    with pytest.raises(KeyboardInterrupt):
+        watch_mod.watch_cmd(jobs=1)
+
+    assert calls == [None, {"a.py", "lib/b.py"}, None]
+    assert created == [src, src]
+    assert all(w.closed for w in watchers)
+    assert Path(src).is_dir()
+
+
+def _rewrite(path, text):
+    # Другой размер или mtime, чтобы reload увидел правку
+    path.write_text(text, encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_reload_keeps_previous_config_on_bad_values(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config_file = tmp_path / "plg-sdk-config.toml"
+    base = '[PROJECT]\nname = "demo"\nauthor = "me"\nversion = "1.0"\n'
+    config_file.write_text(
+        base + "\n[BUILD]\ncache_size_mb = 16\n", encoding="utf-8"
+    )
+    Config.init()
+    Config.override("config.plg-sdk.debug", True)
+    ConfigValidator.validate()
+
+    # Значение не того типа: ошибка в лог, watch живёт на прежнем конфиге
+    _rewrite(config_file, base + '\n[BUILD]\ncache_size_mb = "big"\n')
+    assert watch_mod._reload_config() is None
+    assert Config.snapshot().cache_size_mb == 16
+
+    # Не прошёл правила - тоже откат
+    _rewrite(config_file, '[PROJECT]\nname = "de mo"\nauthor = "me"\n')
+    assert watch_mod._reload_config() is None
+    assert Config.snapshot().name == "demo"
+    assert not ConfigValidator.errors()
+
+    # Нормальная правка применяется, -d из командной строки не теряется
+    _rewrite(config_file, base + "\n[BUILD]\ncache_size_mb = 32\n")
+    change = watch_mod._reload_config()
+    assert change is not None
+    assert change.keys == {"config.build.cache_size_mb"}
+    assert Config.snapshot().cache_size_mb == 32
+    assert Config.snapshot().debug is True